@@ -0,0 +1,100 @@
+from collections import deque
+from typing import Callable, Dict, Optional
+import time
+
+from config import settings
+
+class ServiceSchedule:
+    __slots__ = ("interval", "next_due", "consecutive_up", "recent")
+
+    def __init__(self, interval: float, flap_window: int):
+        self.interval = interval
+        self.next_due = 0.0
+        self.consecutive_up = 0
+        self.recent = deque(maxlen=flap_window)
+
+class AdaptiveScheduler:
+    """Tracks a per-service probe interval that adapts to recent results.
+
+    A failing service, or one that failed within the last ``flap_window``
+    checks, is probed every ``min_interval`` seconds. A healthy service is
+    probed every ``base_interval`` seconds, and once it has been up for
+    ``stable_checks`` consecutive checks its interval doubles on every further
+    success until it reaches ``max_interval``.
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        base_interval: float,
+        max_interval: float,
+        stable_checks: int,
+        flap_window: int,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval, base_interval)
+        self.stable_checks = stable_checks
+        self.flap_window = flap_window
+        self.clock = clock
+        self._services: Dict[int, ServiceSchedule] = {}
+
+    @classmethod
+    def from_settings(cls) -> "AdaptiveScheduler":
+        return cls(
+            min_interval=settings.MIN_CHECK_INTERVAL,
+            base_interval=settings.CHECK_INTERVAL,
+            max_interval=settings.MAX_CHECK_INTERVAL,
+            stable_checks=settings.STABLE_CHECKS_BEFORE_BACKOFF,
+            flap_window=settings.FLAP_WINDOW
+        )
+
+    def _get(self, service_id: int) -> ServiceSchedule:
+        state = self._services.get(service_id)
+        if state is None:
+            state = ServiceSchedule(self.base_interval, self.flap_window)
+            self._services[service_id] = state
+        return state
+
+    def is_due(self, service_id: int, now: Optional[float] = None) -> bool:
+        state = self._services.get(service_id)
+        if state is None:
+            return True
+        if now is None:
+            now = self.clock()
+        # The sweep ticks every min_interval, so allow half a tick of slack to
+        # avoid pushing a probe a whole tick late because the last one ran long
+        return now >= state.next_due - self.min_interval / 2
+
+    def interval_for(self, service_id: int) -> float:
+        return self._get(service_id).interval
+
+    def record(self, service_id: int, status: str, now: Optional[float] = None) -> float:
+        """Record a check result and return the interval until the next probe"""
+        if now is None:
+            now = self.clock()
+
+        state = self._get(service_id)
+        state.recent.append(status)
+
+        if status != "up":
+            state.consecutive_up = 0
+            state.interval = self.min_interval
+        else:
+            state.consecutive_up += 1
+            if any(s != "up" for s in state.recent):
+                # Recovering or flapping: keep watching closely
+                state.interval = self.min_interval
+            elif state.consecutive_up > self.stable_checks:
+                state.interval = min(max(state.interval, self.base_interval) * 2, self.max_interval)
+            else:
+                state.interval = self.base_interval
+
+        state.next_due = now + state.interval
+        return state.interval
+
+    def forget(self, service_id: int):
+        self._services.pop(service_id, None)
+
+check_schedule = AdaptiveScheduler.from_settings()
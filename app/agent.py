@@ -0,0 +1,131 @@
+"""Probe agent: runs health checks and pushes the results to a central instance.
+
+    CENTRAL_URL=https://status.example.com AGENT_NAME=agent-1 AGENT_TOKEN=... python agent.py
+
+The central instance needs the same AGENT_TOKEN and combines every agent's
+latest result into a quorum status (see QUORUM_DOWN).
+"""
+import argparse
+import asyncio
+import signal
+import logging
+from collections import deque
+from typing import List, Optional
+
+import httpx
+
+from config import settings
+from database import Service
+from monitor import perform_health_check, confirm_health_check
+from sweep_planner import SweepPlanner
+
+logger = logging.getLogger(__name__)
+
+class ProbeAgent:
+    def __init__(
+        self,
+        central_url: str,
+        name: str,
+        token: str,
+        interval: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        buffer_size: int = 10000
+    ):
+        self.name = name
+        self.interval = interval or settings.CHECK_INTERVAL
+        self.client = httpx.AsyncClient(
+            base_url=central_url.rstrip("/") + settings.API_PREFIX,
+            headers={"X-Agent-Token": token},
+            timeout=settings.TIMEOUT,
+            transport=transport
+        )
+        # Results that couldn't be delivered yet; the oldest are dropped first
+        self.pending = deque(maxlen=buffer_size)
+        self.services: List[Service] = []
+
+    async def refresh_services(self):
+        try:
+            response = await self.client.get("/agents/services")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.error(f"Could not fetch services from central, keeping {len(self.services)} known: {e}")
+            return
+
+        self.services = [Service(**definition) for definition in response.json()]
+
+    async def probe(self):
+        planner = SweepPlanner()
+        for service in self.services:
+            check = await perform_health_check(service, planner=planner)
+            check = await confirm_health_check(service, check, planner=planner)
+            self.pending.append({
+                "service_id": service.id,
+                "timestamp": check.timestamp.isoformat(),
+                "status": check.status,
+                "response_time": check.response_time,
+                "status_code": check.status_code,
+                "error_message": check.error_message
+            })
+
+    async def push(self) -> bool:
+        if not self.pending:
+            return True
+
+        batch = list(self.pending)
+        try:
+            response = await self.client.post(f"/agents/{self.name}/results", json={"results": batch})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.error(f"Could not push {len(batch)} results, will retry: {e}")
+            return False
+
+        for _ in batch:
+            self.pending.popleft()
+        logger.info(f"Pushed {len(batch)} results: {response.json()}")
+        return True
+
+    async def run_once(self):
+        await self.refresh_services()
+        await self.probe()
+        await self.push()
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            await self.run_once()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        await self.client.aclose()
+
+async def run_agent(once: bool = False):
+    if not settings.CENTRAL_URL or not settings.AGENT_TOKEN:
+        raise SystemExit("CENTRAL_URL and AGENT_TOKEN must be set to run an agent")
+
+    agent = ProbeAgent(settings.CENTRAL_URL, settings.AGENT_NAME, settings.AGENT_TOKEN)
+    try:
+        if once:
+            await agent.run_once()
+            return
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        await agent.run(stop)
+    finally:
+        await agent.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a probe agent that reports to a central status service")
+    parser.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_agent(once=args.once))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare the history endpoint's response formats on a synthetic history.
+
+    python bench_serialization.py --rows 50000 --repeat 5
+
+Loads the rows into an in-memory SQLite database and times each ?format=
+through the ASGI app, so query, serialization and response handling are all
+included.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from config import settings
+from database import Base, Service, HealthCheck, get_db
+from fast_json import orjson
+from routes import router
+
+async def seed(session_factory, rows: int) -> int:
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        service = Service(name="bench", url="https://bench.invalid", check_type="http", expected_status="200")
+        db.add(service)
+        await db.flush()
+        await db.execute(insert(HealthCheck.__table__), [
+            {
+                "service_id": service.id,
+                "timestamp": now - timedelta(seconds=i),
+                "status": "up" if i % 50 else "down",
+                "response_time": 50.0 + i % 200,
+                "status_code": 200 if i % 50 else None,
+                "error_message": None if i % 50 else "Connection refused"
+            }
+            for i in range(rows)
+        ])
+        await db.commit()
+        return service.id
+
+async def run_benchmark(rows: int, repeat: int):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    service_id = await seed(session_factory, rows)
+
+    app = FastAPI()
+    app.include_router(router, prefix=settings.API_PREFIX)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    print(f"{rows} rows, best of {repeat}, encoder: {'orjson' if orjson else 'json (stdlib)'}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        baseline = None
+        for response_format in ("model", "fast", "columnar"):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get(
+                    f"{settings.API_PREFIX}/services/{service_id}/history",
+                    params={"hours": 24 * 365, "format": response_format}
+                )
+                timings.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+            best = min(timings)
+            baseline = baseline or best
+            print(
+                f"  {response_format:<9} {best * 1000:8.1f} ms  {len(response.content) / 1024:8.0f} KiB"
+                f"  {baseline / best:5.1f}x"
+            )
+
+    await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history response formats")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.rows, args.repeat))
+
+if __name__ == "__main__":
+    main()
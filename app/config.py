@@ -3,9 +3,86 @@ from typing import List, Dict
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite+aiosqlite:///./status.db"
+    # GET requests read through a separate engine: READ_DATABASE_URL (e.g. a
+    # PostgreSQL replica) or, for SQLite, a read-only pool on the WAL database
+    USE_READ_ENGINE: bool = True
+    READ_DATABASE_URL: str = ""
+    # Connection pool for server databases (postgresql+asyncpg://...), ignored for SQLite
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    # Monthly health_checks partitions created ahead of time on PostgreSQL
+    PARTITION_MONTHS_AHEAD: int = 2
     API_PREFIX: str = "/api"
     CHECK_INTERVAL: int = 60
     TIMEOUT: int = 10
+    # Days of history kept by the daily cleanup (checks, sketches, delivered
+    # notifications, SLO alerts, ingest batches and agent reports)
+    DATA_RETENTION_DAYS: int = 30
+
+    # Seconds before an API worker reloads its in-memory domain -> services map
+    DOMAIN_INDEX_TTL: int = 60
+
+    # Run the monitor scheduler in this process. Every process that runs it
+    # competes for a lease in the database and only the holder probes, so it is
+    # safe with several uvicorn workers; set to false for API-only workers.
+    RUN_SCHEDULER: bool = True
+    LEADER_LEASE_TTL: int = 30
+
+    # Distributed probing: agents push results to a central instance that marks a
+    # service down only when QUORUM_DOWN fresh probes (this one included) agree;
+    # 0 means a majority of the fresh probes
+    AGENT_NAME: str = "local"
+    AGENT_TOKEN: str = ""
+    CENTRAL_URL: str = ""
+    QUORUM_DOWN: int = 0
+    AGENT_REPORT_MAX_AGE: int = 180
+
+    # Largest batch accepted by the bulk ingest endpoint (also uses AGENT_TOKEN)
+    INGEST_MAX_ROWS: int = 100000
+
+    # Adaptive scheduling: failing or flapping services are probed every
+    # MIN_CHECK_INTERVAL seconds, stable ones back off towards MAX_CHECK_INTERVAL.
+    # Each check is weighted by its interval, so uptime and SLO rates stay
+    # time-based however often a service is probed
+    ADAPTIVE_SCHEDULING: bool = True
+    MIN_CHECK_INTERVAL: int = 10
+    MAX_CHECK_INTERVAL: int = 300
+    STABLE_CHECKS_BEFORE_BACKOFF: int = 10
+    FLAP_WINDOW: int = 5
+
+    # Failure confirmation: a down check is re-probed CONFIRM_RETRIES times
+    # (timeout starts at CONFIRM_TIMEOUT and grows by CONFIRM_TIMEOUT_ESCALATION
+    # each time, capped at TIMEOUT) and an incident is only opened after
+    # CONFIRM_CONSECUTIVE_FAILURES confirmed failing checks
+    CONFIRM_RETRIES: int = 2
+    CONFIRM_RETRY_DELAY: float = 0.5
+    CONFIRM_TIMEOUT: float = 3
+    CONFIRM_TIMEOUT_ESCALATION: float = 1.5
+    CONFIRM_CONSECUTIVE_FAILURES: int = 1
+
+    # A failure is rolled into an upstream's or group peer's incident only if
+    # that incident started at most this many seconds before it
+    INCIDENT_CORRELATION_WINDOW: int = 300
+
+    # Sweeps probe up to SWEEP_CONCURRENCY services at once, at most
+    # PROBE_HOST_CONCURRENCY of them against the same host; services with an
+    # identical probe (URL, check type, probe mode, body cap) share one request
+    SWEEP_CONCURRENCY: int = 10
+    PROBE_HOST_CONCURRENCY: int = 2
+
+    # Availability objective (percent) for services without their own "slo_target";
+    # each sweep evaluates multi-window burn-rate alerts against it
+    SLO_TARGET: float = 99.9
+    # Burn-rate rules only fire once their long window holds this many checks
+    SLO_MIN_CHECKS: int = 10
+
+    # Default probe mode for services that don't set their own "probe_mode":
+    # "get" downloads the full body, "head" sends a HEAD request and "stream"
+    # closes the connection after the headers (or after MAX_BODY_BYTES).
+    PROBE_MODE: str = "get"
+    MAX_BODY_BYTES: int = 0
 
     SERVICES: List[Dict[str, str]] = [
         {
@@ -13,6 +90,7 @@ class Settings(BaseSettings):
             "url": "https://kadenbilyeu.com",
             "check_type": "http",
             "expected_status": "200",
+            "group": "website",
             "domains": "kadenbilyeu.com,bikatr7.com"
         },
         {
@@ -20,6 +98,7 @@ class Settings(BaseSettings):
             "url": "https://bikatr7.com",
             "check_type": "http",
             "expected_status": "200",
+            "group": "website",
             "domains": "kadenbilyeu.com,bikatr7.com"
         },
         {
@@ -34,6 +113,7 @@ class Settings(BaseSettings):
             "url": "https://git.kadenbilyeu.com",
             "check_type": "http",
             "expected_status": "200",
+            "group": "git",
             "domains": "kadenbilyeu.com,bikatr7.com"
         },
         {
@@ -41,6 +121,7 @@ class Settings(BaseSettings):
             "url": "https://git.bikatr7.com",
             "check_type": "http",
             "expected_status": "200",
+            "group": "git",
             "domains": "kadenbilyeu.com,bikatr7.com"
         },
         {
@@ -55,6 +136,7 @@ class Settings(BaseSettings):
             "url": "https://easytl.org",
             "check_type": "http",
             "expected_status": "200",
+            "probe_mode": "stream",
             "domains": "kadenbilyeu.com,bikatr7.com,easytl.org"
         },
         {
@@ -73,6 +155,60 @@ class Settings(BaseSettings):
         },
     ]
 
+    # Health endpoints answer from state refreshed every HEALTH_PROBE_INTERVAL
+    # seconds. Liveness fails when the loop lags more than HEALTH_MAX_LOOP_LAG_MS
+    # or no sweep finished within HEALTH_SWEEP_STALE_FACTOR scheduler ticks;
+    # readiness fails when the database probe errors or exceeds its latency limit
+    HEALTH_PROBE_INTERVAL: float = 5
+    HEALTH_DB_TIMEOUT: float = 2
+    HEALTH_MAX_DB_LATENCY_MS: float = 1000
+    HEALTH_MAX_LOOP_LAG_MS: float = 2000
+    HEALTH_SWEEP_STALE_FACTOR: float = 3
+    HEALTH_MAX_SWEEP_SECONDS: int = 600
+    # Response-time percentiles come from quantile sketches kept per service per
+    # LATENCY_SKETCH_BUCKET_MINUTES bucket (must divide a day), accurate to within
+    # LATENCY_SKETCH_ACCURACY relative error
+    LATENCY_SKETCH_BUCKET_MINUTES: int = 60
+    LATENCY_SKETCH_ACCURACY: float = 0.01
+
+    # Responses larger than COMPRESS_MIN_SIZE bytes are gzip (or brotli, when
+    # brotli-asgi is installed) compressed
+    COMPRESS_MIN_SIZE: int = 1000
+    # Seconds before an API worker reloads service data versions (ETags) written
+    # by another process
+    DATA_VERSION_TTL: float = 5
+
+    # Event loop monitor: samples scheduling delay every LOOP_SAMPLE_INTERVAL
+    # seconds and logs a stack snapshot when a callback blocks the loop for
+    # longer than LOOP_BLOCK_THRESHOLD seconds
+    LOOP_MONITOR: bool = True
+    LOOP_SAMPLE_INTERVAL: float = 0.1
+    LOOP_BLOCK_THRESHOLD: float = 0.25
+
+    # Notification sinks for incident and SLO alert events, e.g.
+    # {"name": "ops", "type": "webhook", "url": "https://hooks.example.com/x"}
+    # {"name": "mail", "type": "smtp", "host": "smtp.example.com", "port": "587",
+    #  "sender": "status@example.com", "recipients": "a@example.com,b@example.com",
+    #  "username": "...", "password": "...", "starttls": "true"}
+    # {"name": "pager", "type": "script", "command": "/usr/local/bin/page"}
+    # Events for a sink within NOTIFY_COALESCE_SECONDS are sent as one batch;
+    # failed sends retry with exponential backoff from NOTIFY_RETRY_BASE seconds
+    NOTIFY_SINKS: List[Dict[str, str]] = []
+    NOTIFY_COALESCE_SECONDS: float = 5
+    NOTIFY_MAX_BATCH: int = 50
+    NOTIFY_SEND_TIMEOUT: float = 10
+    NOTIFY_MAX_ATTEMPTS: int = 8
+    NOTIFY_RETRY_BASE: float = 5
+    NOTIFY_RETRY_MAX: float = 900
+    NOTIFY_POLL_INTERVAL: int = 15
+
+    # Optional JSON file with the same structure as SERVICES; when set it replaces
+    # SERVICES and is reloaded without a restart whenever it changes
+    SERVICES_FILE: str = ""
+    SERVICES_RELOAD_INTERVAL: int = 5
+    # Token for /api/admin endpoints; they are disabled when empty
+    ADMIN_TOKEN: str = ""
+
     class Config:
         env_file = ".env"
         case_sensitive = False
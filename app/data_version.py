@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, Optional
+import hashlib
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import Service
+
+async def bump_data_versions(db: AsyncSession, service_ids: Iterable[int]):
+    """Mark services' data as changed, in the caller's transaction.
+
+    Increments in SQL so concurrent writers (the sweep, bulk ingest) never hand
+    out the same version twice. Call data_versions.invalidate() after commit.
+    """
+    service_ids = list(service_ids)
+    if service_ids:
+        await db.execute(
+            update(Service)
+            .where(Service.id.in_(service_ids))
+            .values(data_version=Service.data_version + 1)
+        )
+
+class DataVersions:
+    """In-memory service id -> data version map used to build ETags.
+
+    Answering a conditional GET only needs this map, so unchanged polls cost no
+    queries. It is reloaded (one query for every service) after a write in this
+    process, or after DATA_VERSION_TTL seconds so API workers notice writes
+    made by the monitor process.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = settings.DATA_VERSION_TTL if ttl is None else ttl
+        self._versions: Dict[int, int] = {}
+        self._loaded_at: Optional[float] = None
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def load(self, db: AsyncSession):
+        result = await db.execute(select(Service.id, Service.data_version))
+        self._versions = {service_id: version or 0 for service_id, version in result.all()}
+        self._loaded_at = time.monotonic()
+
+    async def versions(self, db: AsyncSession) -> Dict[int, int]:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            await self.load(db)
+        return self._versions
+
+    async def etag(self, db: AsyncSession, key: str, service_ids: Optional[Iterable[int]] = None) -> str:
+        """Strong ETag for ``key`` (path and query) over the given services' data, or all services"""
+        versions = await self.versions(db)
+        ids = sorted(versions if service_ids is None else set(service_ids))
+        digest = hashlib.sha1(key.encode())
+        for service_id in ids:
+            digest.update(f"|{service_id}:{versions.get(service_id, -1)}".encode())
+        return f'"{digest.hexdigest()[:20]}"'
+
+data_versions = DataVersions()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
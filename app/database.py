@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, Index, text, true, inspect, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
+from typing import Optional
+from fastapi import Request
+import re
 from config import settings
 
 Base = declarative_base()
@@ -15,11 +19,29 @@ class Service(Base):
     check_type = Column(String, nullable=False)
     expected_status = Column(String, nullable=False)
     domains = Column(Text, nullable=True)
+    probe_mode = Column(String, nullable=True)
+    max_body_bytes = Column(Integer, nullable=True)
+    # Availability objective in percent; settings.SLO_TARGET when unset
+    slo_target = Column(Float, nullable=True)
+    # Services sharing group_name run on the same infrastructure; depends_on
+    # lists the names or URLs of upstream services (comma-separated)
+    group_name = Column(String, nullable=True)
+    depends_on = Column(Text, nullable=True)
+    # Bumped whenever the service's checks or incidents change; feeds API ETags
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     enabled = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     checks = relationship("HealthCheck", back_populates="service", cascade="all, delete-orphan")
     incidents = relationship("Incident", back_populates="service", cascade="all, delete-orphan")
+    domain_entries = relationship("ServiceDomain", cascade="all, delete-orphan")
+
+class ServiceDomain(Base):
+    """Normalized copy of Service.domains, kept in sync by initialize_services"""
+    __tablename__ = "service_domains"
+
+    service_id = Column(Integer, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    domain = Column(String, primary_key=True, index=True)
 
 class HealthCheck(Base):
     __tablename__ = "health_checks"
@@ -31,9 +53,17 @@ class HealthCheck(Base):
     response_time = Column(Float, nullable=True)
     status_code = Column(Integer, nullable=True)
     error_message = Column(Text, nullable=True)
+    # Seconds until the next scheduled probe, i.e. how long this result stands
+    # for in time-weighted uptime; None (e.g. ingested) counts as CHECK_INTERVAL
+    interval_seconds = Column(Float, nullable=True)
 
     service = relationship("Service", back_populates="checks")
 
+    __table_args__ = (
+        # Keyset pagination of a service's history on (timestamp, id)
+        Index("ix_health_checks_service_timestamp_id", "service_id", "timestamp", "id"),
+    )
+
 class Incident(Base):
     __tablename__ = "incidents"
 
@@ -44,35 +74,325 @@ class Incident(Base):
     duration = Column(Integer, nullable=True)
     status = Column(String, nullable=False)
     description = Column(Text, nullable=True)
+    # Set when the outage was caused by another service's incident (an upstream
+    # or group peer that failed first); only root incidents are notified
+    root_incident_id = Column(Integer, nullable=True, index=True)
 
     service = relationship("Service", back_populates="incidents")
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+    __table_args__ = (
+        # Keyset pagination of incidents on (started_at, id)
+        Index("ix_incidents_started_at_id", "started_at", "id"),
+    )
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)
+
+class AgentReport(Base):
+    """Latest result a remote probe agent reported for a service"""
+    __tablename__ = "agent_reports"
+
+    service_id = Column(Integer, ForeignKey("services.id"), primary_key=True)
+    agent = Column(String, primary_key=True)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    status = Column(String, nullable=False)
+    response_time = Column(Float, nullable=True)
+    status_code = Column(Integer, nullable=True)
+    error_message = Column(Text, nullable=True)
+
+class LatencySketch(Base):
+    """Response-time quantile sketch for one service over one time bucket"""
+    __tablename__ = "latency_sketches"
+
+    service_id = Column(Integer, ForeignKey("services.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True, index=True)
+    count = Column(Integer, nullable=False)
+    sketch = Column(Text, nullable=False)
+
+class IncidentDaily(Base):
+    """Per-service, per-day incident totals, added to as incidents resolve"""
+    __tablename__ = "incident_daily"
+
+    service_id = Column(Integer, ForeignKey("services.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    # Resolved incidents that started / ended on this day
+    started = Column(Integer, nullable=False, default=0)
+    resolved = Column(Integer, nullable=False, default=0)
+    # Summed duration of the incidents that ended on this day
+    repair_seconds = Column(Integer, nullable=False, default=0)
+    # Outage time falling on this day; outages under a minute are left out, as in uptime
+    downtime_seconds = Column(Integer, nullable=False, default=0)
+
+class SloAlert(Base):
+    """A burn-rate alert starting or stopping to fire"""
+    __tablename__ = "slo_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    service_id = Column(Integer, ForeignKey("services.id"), nullable=False, index=True)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    severity = Column(String, nullable=False)
+    rule = Column(String, nullable=False)
+    state = Column(String, nullable=False)
+    burn_rate = Column(Float, nullable=False)
+    threshold = Column(Float, nullable=False)
+    slo_target = Column(Float, nullable=False)
+    # False when the alert belonged to an outage rolled into another service's
+    # root incident and was therefore not sent to the notification sinks
+    notified = Column(Boolean, nullable=False, default=True, server_default=true())
+
+class NotificationOutbox(Base):
+    """One event waiting to be (or already) delivered to one notification sink.
+
+    Rows are written in the transaction that changes the incident, so a crash
+    can't lose a notification; the dispatcher delivers them afterwards.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sink = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    event = Column(Text, nullable=False)
+    # "pending", "sent" or "failed" (gave up after NOTIFY_MAX_ATTEMPTS)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
+
+class IngestBatch(Base):
+    """Idempotency record for a bulk-ingested batch, written in the batch's transaction"""
+    __tablename__ = "ingest_batches"
+
+    key = Column(String, primary_key=True)
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    accepted = Column(Integer, nullable=False)
+    rejected = Column(Integer, nullable=False)
+
+def engine_options(url: str) -> dict:
+    """Connection pool settings; SQLite keeps SQLAlchemy's defaults"""
+    if url.startswith("sqlite"):
+        return {}
+
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+def read_database_url(url: str) -> Optional[str]:
+    """URL for the read-only engine, or None to read through the main engine.
+
+    READ_DATABASE_URL wins (e.g. a PostgreSQL replica); otherwise a SQLite file
+    database gets a second pool opened with mode=ro, which in WAL mode reads
+    without waiting on the writer.
+    """
+    if not settings.USE_READ_ENGINE:
+        return None
+    if settings.READ_DATABASE_URL:
+        return settings.READ_DATABASE_URL
+    if not is_sqlite_file(url):
+        return None
+
+    parsed = make_url(url)
+    database = parsed.database
+    if not database.startswith("file:"):
+        database = f"file:{database}"
+    return parsed.set(database=database, query={**parsed.query, "mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+def enable_sqlite_wal(async_engine):
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+engine = create_async_engine(settings.DATABASE_URL, echo=False, **engine_options(settings.DATABASE_URL))
+if is_sqlite_file(settings.DATABASE_URL):
+    enable_sqlite_wal(engine)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+_read_url = read_database_url(settings.DATABASE_URL)
+if _read_url:
+    read_engine = create_async_engine(_read_url, echo=False, **engine_options(_read_url))
+    ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+else:
+    read_engine = engine
+    ReadSessionLocal = AsyncSessionLocal
+
+# Columns added to services after the initial schema, in the order they were introduced
+SERVICE_COLUMN_MIGRATIONS = [
+    ("domains", "TEXT"),
+    ("probe_mode", "VARCHAR"),
+    ("max_body_bytes", "INTEGER"),
+    ("data_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("slo_target", "FLOAT"),
+    ("group_name", "VARCHAR"),
+    ("depends_on", "TEXT"),
+]
+
+INCIDENT_COLUMN_MIGRATIONS = [
+    ("root_incident_id", "INTEGER"),
+]
+
+HEALTH_CHECK_COLUMN_MIGRATIONS = [
+    ("interval_seconds", "FLOAT"),
+]
+
+SLO_ALERT_COLUMN_MIGRATIONS = [
+    ("notified", "BOOLEAN NOT NULL DEFAULT TRUE"),
+]
+
+# Indexes added after the first release; create_all skips them on existing tables
+INDEX_MIGRATIONS = ("ix_health_checks_service_timestamp_id", "ix_incidents_started_at_id", "ix_incidents_root_incident_id")
+
 async def run_migrations(conn):
     """Run database migrations"""
     def _run_migrations(sync_conn):
         try:
-            result = sync_conn.execute(
-                text("SELECT sql FROM sqlite_master WHERE type='table' AND name='services'")
-            ).fetchone()
+            inspector = inspect(sync_conn)
+            if not inspector.has_table("services"):
+                return
+
+            for table, migrations in (
+                ("services", SERVICE_COLUMN_MIGRATIONS),
+                ("incidents", INCIDENT_COLUMN_MIGRATIONS),
+                ("health_checks", HEALTH_CHECK_COLUMN_MIGRATIONS),
+                ("slo_alerts", SLO_ALERT_COLUMN_MIGRATIONS),
+            ):
+                if not inspector.has_table(table):
+                    continue
+                existing_columns = {column["name"] for column in inspector.get_columns(table)}
+
+                for column, column_type in migrations:
+                    if column not in existing_columns:
+                        sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                        print(f"Migration: Added '{column}' column to {table} table")
 
-            if result and 'domains' not in result[0]:
-                sync_conn.execute(text("ALTER TABLE services ADD COLUMN domains TEXT"))
-                print("Migration: Added 'domains' column to services table")
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    if index.name not in INDEX_MIGRATIONS:
+                        continue
+                    if index.name not in {i["name"] for i in inspector.get_indexes(table.name)}:
+                        index.create(sync_conn)
+                        print(f"Migration: Added index '{index.name}'")
         except Exception as e:
             print(f"Migration error: {e}")
 
     await conn.run_sync(_run_migrations)
 
+# On PostgreSQL health_checks is range-partitioned by month so retention can drop
+# whole partitions. Partitioned tables need the partition key in the primary key,
+# which the SQLite schema can't express, so this table is created by hand there.
+PARTITIONED_HEALTH_CHECKS_DDL = """
+CREATE TABLE IF NOT EXISTS health_checks (
+    id SERIAL,
+    service_id INTEGER NOT NULL REFERENCES services (id),
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    status VARCHAR NOT NULL,
+    response_time DOUBLE PRECISION,
+    status_code INTEGER,
+    error_message TEXT,
+    interval_seconds DOUBLE PRECISION,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+PARTITION_NAME = re.compile(r"^health_checks_p(\d{4})(\d{2})$")
+
+def _month_start(year: int, month: int) -> datetime:
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1)
+
+def _create_partitioned_health_checks(sync_conn):
+    sync_conn.execute(text(PARTITIONED_HEALTH_CHECKS_DDL))
+    sync_conn.execute(text("CREATE INDEX IF NOT EXISTS ix_health_checks_service_id ON health_checks (service_id)"))
+    sync_conn.execute(text("CREATE INDEX IF NOT EXISTS ix_health_checks_timestamp ON health_checks (timestamp)"))
+    sync_conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_health_checks_service_timestamp_id ON health_checks (service_id, timestamp, id)"
+    ))
+    # Catches rows outside the monthly partitions (e.g. backfilled history)
+    sync_conn.execute(text("CREATE TABLE IF NOT EXISTS health_checks_default PARTITION OF health_checks DEFAULT"))
+
+def ensure_partitions(sync_conn, now: Optional[datetime] = None, months_ahead: Optional[int] = None):
+    """Create monthly health_checks partitions from this month to months_ahead"""
+    if sync_conn.dialect.name != "postgresql":
+        return
+
+    now = now or datetime.utcnow()
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+
+    for offset in range(months_ahead + 1):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(start.year, start.month + 1)
+        sync_conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS health_checks_p{start:%Y%m} PARTITION OF health_checks "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+
+def drop_expired_partitions(sync_conn, cutoff: datetime) -> list:
+    """Drop monthly partitions that only hold rows older than cutoff"""
+    if sync_conn.dialect.name != "postgresql":
+        return []
+
+    partitions = sync_conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'health_checks'"
+    )).scalars().all()
+
+    dropped = []
+    for name in sorted(partitions):
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue
+        end = _month_start(int(match.group(1)), int(match.group(2)) + 1)
+        if end <= cutoff:
+            sync_conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+
+    return dropped
+
+async def create_schema(conn):
+    def _create_schema(sync_conn):
+        if sync_conn.dialect.name == "postgresql":
+            tables = [table for name, table in Base.metadata.tables.items() if name != "health_checks"]
+            Base.metadata.create_all(sync_conn, tables=tables)
+            _create_partitioned_health_checks(sync_conn)
+            ensure_partitions(sync_conn)
+        else:
+            Base.metadata.create_all(sync_conn)
+
+    await conn.run_sync(_create_schema)
+    await run_migrations(conn)
+
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        await run_migrations(conn)
+        await create_schema(conn)
+
+READ_METHODS = frozenset(("GET", "HEAD"))
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
+async def get_db(request: Request):
+    # GET routes only read, so they go to the read engine and never queue behind the writer
+    session_factory = ReadSessionLocal if request.method in READ_METHODS else AsyncSessionLocal
+    async with session_factory() as session:
         try:
             yield session
         finally:
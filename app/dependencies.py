@@ -0,0 +1,161 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database import Service, Incident
+
+class DependencyError(ValueError):
+    pass
+
+def parse_depends_on(value: Optional[str]) -> List[str]:
+    return [ref.strip() for ref in (value or "").split(",") if ref.strip()]
+
+def resolve_upstreams(entries: Iterable[Tuple[object, str, str, Optional[str]]], strict: bool = True) -> Dict[object, List[object]]:
+    """Map each (key, name, url, depends_on) entry's key to its upstreams' keys.
+
+    depends_on is a comma-separated list of service names or URLs. With
+    strict, unknown references and cycles raise DependencyError; otherwise
+    unknown references are ignored (e.g. an upstream that was disabled).
+    """
+    entries = list(entries)
+    by_ref = {}
+    for key, name, url, _ in entries:
+        by_ref[name] = key
+        by_ref[url] = key
+
+    upstreams = {}
+    for key, name, _, depends_on in entries:
+        keys = []
+        for ref in parse_depends_on(depends_on):
+            if ref not in by_ref:
+                if strict:
+                    raise DependencyError(f"{name} depends on unknown service {ref!r}")
+                continue
+            if by_ref[ref] == key:
+                raise DependencyError(f"{name} depends on itself")
+            if by_ref[ref] not in keys:
+                keys.append(by_ref[ref])
+        upstreams[key] = keys
+
+    if strict:
+        names = {key: name for key, name, _, _ in entries}
+        visiting, done = set(), set()
+
+        def visit(key, path):
+            if key in done:
+                return
+            if key in visiting:
+                cycle = path[path.index(key):] + [key]
+                raise DependencyError(f"Dependency cycle: {' -> '.join(names[k] for k in cycle)}")
+            visiting.add(key)
+            for upstream in upstreams[key]:
+                visit(upstream, path + [key])
+            visiting.discard(key)
+            done.add(key)
+
+        for key in upstreams:
+            visit(key, [])
+
+    return upstreams
+
+class DependencyGraph:
+    """Declared upstreams (depends_on) and shared-infrastructure groups of services.
+
+    The sweep probes upstreams before the services that depend on them, so a
+    dependent whose upstream is already known to be down needs no probe of its
+    own, and a failure is attributed to the earliest ongoing incident among
+    its upstreams and group peers instead of opening an unrelated one.
+    """
+
+    def __init__(self, services: List[Service]):
+        self.services = {service.id: service for service in services}
+        self.upstreams = resolve_upstreams(
+            ((s.id, s.name, s.url, s.depends_on) for s in services),
+            strict=False
+        )
+        self.groups: Dict[str, List[int]] = {}
+        for service in services:
+            if service.group_name:
+                self.groups.setdefault(service.group_name, []).append(service.id)
+
+    def all_upstreams(self, service_id: int) -> List[int]:
+        """Direct and transitive upstreams, nearest first"""
+        seen = []
+        pending = list(self.upstreams.get(service_id, []))
+        while pending:
+            upstream = pending.pop(0)
+            if upstream in seen or upstream == service_id:
+                continue
+            seen.append(upstream)
+            pending.extend(self.upstreams.get(upstream, []))
+        return seen
+
+    def peers(self, service_id: int) -> List[int]:
+        service = self.services.get(service_id)
+        if service is None or not service.group_name:
+            return []
+        return [peer for peer in self.groups[service.group_name] if peer != service_id]
+
+    def order(self, services: List[Service]) -> List[Service]:
+        """Services with every upstream ahead of its dependents, otherwise in the given order"""
+        ordered, placed = [], set()
+        wanted = {service.id for service in services}
+
+        def place(service: Service, visiting: set):
+            if service.id in placed or service.id in visiting:
+                return
+            visiting.add(service.id)
+            for upstream in self.upstreams.get(service.id, []):
+                if upstream in wanted:
+                    place(self.services[upstream], visiting)
+            placed.add(service.id)
+            ordered.append(service)
+
+        for service in services:
+            place(service, set())
+        return ordered
+
+    def probe_after(self, service_id: int, sweep_order: List[int]) -> List[int]:
+        """Services in this sweep whose results must be known before probing this one.
+
+        That is its upstreams and, in a group, the member probed first: a
+        down upstream makes the probe unnecessary, and a confirmed failure of
+        the first member makes re-probing its peers unnecessary.
+        """
+        in_sweep = set(sweep_order)
+        waits = [upstream for upstream in self.all_upstreams(service_id) if upstream in in_sweep]
+        peers = set(self.peers(service_id))
+        first = next((member for member in sweep_order if member in peers or member == service_id), None)
+        if first is not None and first != service_id and first not in waits:
+            waits.append(first)
+        return waits
+
+    def down_upstream(self, service_id: int, statuses: Dict[int, str], ongoing: Dict[int, Incident]) -> Optional[Service]:
+        """The first upstream that is down: in this sweep, or with an open incident if not probed yet"""
+        for upstream in self.all_upstreams(service_id):
+            status = statuses.get(upstream)
+            if status == "down" or (status is None and upstream in ongoing):
+                return self.services.get(upstream)
+        return None
+
+    def peer_down(self, service_id: int, statuses: Dict[int, str]) -> bool:
+        return any(statuses.get(peer) == "down" for peer in self.peers(service_id))
+
+    def root_incident(
+        self,
+        service_id: int,
+        ongoing: Dict[int, Incident],
+        since: Optional[datetime] = None
+    ) -> Optional[Incident]:
+        """Earliest ongoing incident among the service's upstreams and group peers.
+
+        With since, only incidents that started at or after it count: an outage
+        that began long before this failure is not treated as its cause.
+        """
+        candidates = [
+            ongoing[related]
+            for related in self.all_upstreams(service_id) + self.peers(service_id)
+            if related in ongoing and (since is None or ongoing[related].started_at >= since)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda incident: (incident.started_at, incident.id))
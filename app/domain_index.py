@@ -0,0 +1,90 @@
+from typing import Dict, Optional, Set
+import time
+import logging
+
+from sqlalchemy import select, delete, insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import Service, ServiceDomain
+
+logger = logging.getLogger(__name__)
+
+def parse_domains(domains: Optional[str]) -> Set[str]:
+    if not domains:
+        return set()
+    return {d.strip() for d in domains.split(",") if d.strip()}
+
+async def sync_service_domains(db: AsyncSession) -> tuple[int, int]:
+    """Bring service_domains in line with Service.domains; returns (added, removed).
+
+    Callers commit. Uses one query for each side and a bulk insert/delete for
+    the difference, so an unchanged config costs two SELECTs.
+    """
+    result = await db.execute(select(Service.id, Service.domains))
+    wanted = {
+        (service_id, domain)
+        for service_id, domains in result.all()
+        for domain in parse_domains(domains)
+    }
+
+    result = await db.execute(select(ServiceDomain.service_id, ServiceDomain.domain))
+    existing = set(result.all())
+
+    to_add = wanted - existing
+    to_remove = existing - wanted
+
+    if to_remove:
+        await db.execute(
+            delete(ServiceDomain).where(
+                tuple_(ServiceDomain.service_id, ServiceDomain.domain).in_(list(to_remove))
+            )
+        )
+    if to_add:
+        await db.execute(
+            insert(ServiceDomain),
+            [{"service_id": service_id, "domain": domain} for service_id, domain in to_add]
+        )
+
+    if to_add or to_remove:
+        logger.info(f"Service domains synced: {len(to_add)} added, {len(to_remove)} removed")
+        domain_index.invalidate()
+
+    return len(to_add), len(to_remove)
+
+class DomainIndex:
+    """In-memory domain -> service ids map loaded from service_domains.
+
+    Services without any domains are listed under every domain, matching the
+    original filter. The map is reloaded after a sync in this process, or after
+    DOMAIN_INDEX_TTL seconds so API workers pick up syncs done elsewhere.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = settings.DOMAIN_INDEX_TTL if ttl is None else ttl
+        self._by_domain: Dict[str, Set[int]] = {}
+        self._unscoped: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    async def load(self, db: AsyncSession):
+        result = await db.execute(select(ServiceDomain.service_id, ServiceDomain.domain))
+        by_domain: Dict[str, Set[int]] = {}
+        scoped: Set[int] = set()
+        for service_id, domain in result.all():
+            by_domain.setdefault(domain, set()).add(service_id)
+            scoped.add(service_id)
+
+        result = await db.execute(select(Service.id))
+        self._unscoped = set(result.scalars().all()) - scoped
+        self._by_domain = by_domain
+        self._loaded_at = time.monotonic()
+
+    async def service_ids(self, db: AsyncSession, domain: str) -> Set[int]:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            await self.load(db)
+        return self._by_domain.get(domain, set()) | self._unscoped
+
+domain_index = DomainIndex()
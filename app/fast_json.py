@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used without it
+    orjson = None
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Encode to JSON bytes, with orjson when installed.
+
+    Naive datetimes come out as ISO 8601 without an offset, the same as the
+    Pydantic models produce, so both paths return identical values.
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+def rows_to_records(columns: Sequence[str], rows: Iterable[Sequence]) -> List[dict]:
+    return [dict(zip(columns, row)) for row in rows]
+
+def rows_to_columns(columns: Sequence[str], rows: Iterable[Sequence]) -> dict:
+    """Parallel arrays, one per column: {"id": [1, 2], "status": ["up", "down"]}"""
+    values = list(zip(*rows)) or [()] * len(columns)
+    return {column: list(column_values) for column, column_values in zip(columns, values)}
+
+def fast_response(
+    columns: Sequence[str],
+    rows: Iterable[Sequence],
+    columnar: bool = False,
+    headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    content = rows_to_columns(columns, rows) if columnar else rows_to_records(columns, rows)
+    return Response(content=dumps(content), media_type="application/json", headers=headers)
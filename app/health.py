@@ -0,0 +1,176 @@
+from datetime import datetime
+from typing import Optional
+import asyncio
+import time
+import logging
+
+from sqlalchemy import event, text
+
+from config import settings
+from loop_monitor import loop_monitor
+
+logger = logging.getLogger(__name__)
+
+class HealthState:
+    """Process-local health facts, refreshed in the background.
+
+    The health endpoints only read these fields, so answering them never
+    touches the database or waits on the scheduler.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.db_ready = False
+        # "disabled" (no scheduler here), "standby" (another process holds the
+        # lease), "pending", "running" or "complete"
+        self.initial_sweep = "disabled"
+        # The monitor lease, when this process runs the scheduler; only its
+        # current holder is expected to sweep
+        self.lease = None
+        self.leader_since: Optional[float] = None
+        self.sweep_running = False
+        self.last_sweep_started_at: Optional[float] = None
+        self.last_sweep_finished_at: Optional[float] = None
+        self.last_sweep_completed: Optional[datetime] = None
+
+        self.db_latency_ms: Optional[float] = None
+        self.db_error: Optional[str] = None
+        self.db_checked_at: Optional[float] = None
+        # Connections of the writer engine in use; None until track_connections
+        self.pool_checked_out: Optional[int] = None
+
+        self.loop_lag_ms: Optional[float] = None
+        self.loop_checked_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        # Reads are served from the database, so the last known state is
+        # available as soon as the schema is in place; the first sweep isn't needed
+        return self.db_ready
+
+    def sweep_started(self):
+        self.sweep_running = True
+        self.last_sweep_started_at = time.monotonic()
+        if self.initial_sweep in ("pending", "standby"):
+            self.initial_sweep = "running"
+
+    def sweep_finished(self):
+        self.sweep_running = False
+        self.last_sweep_finished_at = time.monotonic()
+        self.last_sweep_completed = datetime.utcnow()
+        if self.initial_sweep == "running":
+            self.initial_sweep = "complete"
+
+    def leadership_acquired(self):
+        self.leader_since = time.monotonic()
+
+    def scheduler_check(self, now: float) -> tuple[bool, dict]:
+        if self.initial_sweep == "disabled":
+            return True, {"state": "disabled"}
+        # Asked on every call: a process can lose the lease or take it over at any time
+        if self.lease is not None and not self.lease.is_leader:
+            return True, {"state": "standby"}
+        if self.lease is None and self.initial_sweep == "standby":
+            return True, {"state": "standby"}
+
+        tick = settings.MIN_CHECK_INTERVAL if settings.ADAPTIVE_SCHEDULING else settings.CHECK_INTERVAL
+
+        if self.sweep_running:
+            running_for = now - self.last_sweep_started_at
+            return running_for <= settings.HEALTH_MAX_SWEEP_SECONDS, {
+                "state": "running",
+                "running_for_s": round(running_for, 1)
+            }
+
+        # A new leader gets a full allowance from the moment it took over
+        last = self.last_sweep_finished_at or self.started_at
+        if self.leader_since is not None:
+            last = max(last, self.leader_since)
+        age = now - last
+        return age <= tick * settings.HEALTH_SWEEP_STALE_FACTOR, {
+            "state": "idle",
+            "last_run_age_s": round(age, 1),
+            "interval_s": tick
+        }
+
+    def db_check(self, now: float) -> tuple[bool, dict]:
+        fresh = self.db_checked_at is not None and \
+            now - self.db_checked_at <= settings.HEALTH_PROBE_INTERVAL * 3 + settings.HEALTH_DB_TIMEOUT
+        ok = self.db_ready and fresh and self.db_error is None and \
+            self.db_latency_ms is not None and self.db_latency_ms <= settings.HEALTH_MAX_DB_LATENCY_MS
+        return ok, {
+            "latency_ms": self.db_latency_ms,
+            "error": self.db_error,
+            "checked_age_s": round(now - self.db_checked_at, 1) if self.db_checked_at else None,
+            "pool_checked_out": self.pool_checked_out
+        }
+
+    def loop_check(self, now: float) -> tuple[bool, dict]:
+        ok = self.loop_lag_ms is None or self.loop_lag_ms <= settings.HEALTH_MAX_LOOP_LAG_MS
+        return ok, {"lag_ms": self.loop_lag_ms}
+
+    def liveness(self) -> tuple[bool, dict]:
+        """Is the process making progress? Failing means restart it"""
+        now = time.monotonic()
+        scheduler_ok, scheduler = self.scheduler_check(now)
+        loop_ok, loop = self.loop_check(now)
+        return scheduler_ok and loop_ok, {"scheduler": scheduler, "event_loop": loop}
+
+    def readiness(self) -> tuple[bool, dict]:
+        """Can the process serve requests? Failing means take it out of rotation"""
+        now = time.monotonic()
+        db_ok, db = self.db_check(now)
+        return self.ready and db_ok, {
+            "initial_sweep": self.initial_sweep,
+            "database": db,
+            "sweep_running": self.sweep_running
+        }
+
+health_state = HealthState()
+
+async def probe_database(engine, state: HealthState = health_state):
+    started = time.perf_counter()
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=settings.HEALTH_DB_TIMEOUT)
+        state.db_latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        state.db_error = None
+    except Exception as e:
+        state.db_latency_ms = None
+        state.db_error = str(e) or type(e).__name__
+        logger.warning(f"Database health probe failed: {state.db_error}")
+
+    state.db_checked_at = time.monotonic()
+
+def track_connections(engine, state: HealthState = health_state):
+    """Keep state.pool_checked_out current from the engine's pool events.
+
+    Only queue pools have Pool.checkedout(); SQLite's default pools don't, so
+    the count is kept from checkout/checkin events, which every pool sends.
+    SQLite serializes writers, so there it is the depth of the write queue.
+    """
+    state.pool_checked_out = 0
+
+    def checked_out(dbapi_connection, connection_record, connection_proxy):
+        state.pool_checked_out = (state.pool_checked_out or 0) + 1
+
+    def checked_in(dbapi_connection, connection_record):
+        state.pool_checked_out = max(0, (state.pool_checked_out or 0) - 1)
+
+    event.listen(engine.sync_engine, "checkout", checked_out)
+    event.listen(engine.sync_engine, "checkin", checked_in)
+
+async def run_health_probes(engine, state: HealthState = health_state):
+    """Refresh the cached health facts every HEALTH_PROBE_INTERVAL seconds"""
+    interval = settings.HEALTH_PROBE_INTERVAL
+    while True:
+        await probe_database(engine, state)
+
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        if loop_monitor.running:
+            # Worst lag seen by the high-frequency sampler since the last probe
+            state.loop_lag_ms = loop_monitor.recent_max_ms(interval)
+        else:
+            state.loop_lag_ms = round(max(0.0, time.monotonic() - started - interval) * 1000, 2)
+        state.loop_checked_at = time.monotonic()
@@ -0,0 +1,206 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+import logging
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Incident, IncidentDaily
+
+logger = logging.getLogger(__name__)
+
+# Outages shorter than this don't count against uptime, so they don't burn downtime either
+SHORT_INCIDENT_SECONDS = 60
+
+def split_by_day(start: datetime, end: datetime) -> Dict[date, int]:
+    """Seconds of [start, end) falling on each UTC day"""
+    seconds = {}
+    cursor = start
+    while cursor < end:
+        next_midnight = datetime.combine(cursor.date() + timedelta(days=1), time.min)
+        chunk_end = min(end, next_midnight)
+        seconds[cursor.date()] = seconds.get(cursor.date(), 0) + int((chunk_end - cursor).total_seconds())
+        cursor = chunk_end
+    return seconds
+
+def incident_deltas(incident: Incident) -> Dict[date, Dict[str, int]]:
+    """What one resolved incident adds to each day's rollup"""
+    deltas: Dict[date, Dict[str, int]] = {}
+
+    def add(day: date, column: str, amount: int):
+        deltas.setdefault(day, {"started": 0, "resolved": 0, "repair_seconds": 0, "downtime_seconds": 0})
+        deltas[day][column] += amount
+
+    duration = incident.duration
+    if duration is None:
+        duration = int((incident.ended_at - incident.started_at).total_seconds())
+
+    add(incident.started_at.date(), "started", 1)
+    add(incident.ended_at.date(), "resolved", 1)
+    add(incident.ended_at.date(), "repair_seconds", duration)
+    if duration >= SHORT_INCIDENT_SECONDS:
+        for day, seconds in split_by_day(incident.started_at, incident.ended_at).items():
+            add(day, "downtime_seconds", seconds)
+
+    return deltas
+
+async def apply_deltas(db: AsyncSession, service_id: int, deltas: Dict[date, Dict[str, int]]):
+    result = await db.execute(
+        select(IncidentDaily).where(
+            IncidentDaily.service_id == service_id,
+            IncidentDaily.day.in_(list(deltas))
+        )
+    )
+    existing = {row.day: row for row in result.scalars().all()}
+
+    for day, changes in deltas.items():
+        row = existing.get(day)
+        if row is None:
+            db.add(IncidentDaily(service_id=service_id, day=day, **changes))
+            continue
+        for column, amount in changes.items():
+            setattr(row, column, getattr(row, column) + amount)
+
+async def record_resolved_incident(db: AsyncSession, incident: Incident):
+    """Add a just-resolved incident to its service's daily rollups (caller commits)"""
+    await apply_deltas(db, incident.service_id, incident_deltas(incident))
+
+async def backfill_incident_rollups(db: AsyncSession) -> int:
+    """Build rollups from resolved incidents, once, when the rollup table is empty"""
+    result = await db.execute(select(func.count()).select_from(IncidentDaily))
+    if result.scalar_one():
+        return 0
+
+    result = await db.execute(
+        select(Incident).where(Incident.status == "resolved", Incident.ended_at.isnot(None))
+    )
+    incidents = result.scalars().all()
+
+    by_service: Dict[int, Dict[date, Dict[str, int]]] = {}
+    for incident in incidents:
+        merged = by_service.setdefault(incident.service_id, {})
+        for day, changes in incident_deltas(incident).items():
+            totals = merged.setdefault(day, dict.fromkeys(changes, 0))
+            for column, amount in changes.items():
+                totals[column] += amount
+
+    for service_id, deltas in by_service.items():
+        await apply_deltas(db, service_id, deltas)
+    await db.commit()
+
+    if incidents:
+        logger.info(f"Built incident rollups from {len(incidents)} resolved incidents")
+    return len(incidents)
+
+class IncidentWindow:
+    """A service's rollups for the last ``days`` UTC days, plus any ongoing incident.
+
+    Loading it costs one query on the rollup table and one on the (at most one)
+    ongoing incident; every statistic below is arithmetic on that.
+    """
+
+    def __init__(self, days: int, rollups: List[IncidentDaily], ongoing: Optional[Incident], now: datetime):
+        self.days = days
+        self.now = now
+        self.first_day = now.date() - timedelta(days=days - 1)
+        self.start = datetime.combine(self.first_day, time.min)
+        self.rollups = rollups
+        self.ongoing = ongoing
+
+    @classmethod
+    async def load(cls, db: AsyncSession, service_id: int, days: int, now: Optional[datetime] = None) -> "IncidentWindow":
+        now = now or datetime.utcnow()
+        first_day = now.date() - timedelta(days=days - 1)
+
+        result = await db.execute(
+            select(IncidentDaily)
+            .where(IncidentDaily.service_id == service_id, IncidentDaily.day >= first_day)
+            .order_by(IncidentDaily.day)
+        )
+        rollups = result.scalars().all()
+
+        result = await db.execute(
+            select(Incident)
+            .where(Incident.service_id == service_id, Incident.status == "ongoing")
+            .order_by(Incident.started_at)
+            .limit(1)
+        )
+        return cls(days, rollups, result.scalar_one_or_none(), now)
+
+    @property
+    def window_seconds(self) -> int:
+        return int((self.now - self.start).total_seconds())
+
+    def ongoing_downtime(self) -> Dict[date, int]:
+        if not self.ongoing:
+            return {}
+        return split_by_day(max(self.ongoing.started_at, self.start), self.now)
+
+    def downtime_by_day(self) -> Dict[date, int]:
+        downtime = {row.day: row.downtime_seconds for row in self.rollups}
+        for day, seconds in self.ongoing_downtime().items():
+            downtime[day] = downtime.get(day, 0) + seconds
+        return downtime
+
+    @property
+    def downtime_seconds(self) -> int:
+        return sum(self.downtime_by_day().values())
+
+    @property
+    def failures(self) -> int:
+        ongoing = 1 if self.ongoing and self.ongoing.started_at >= self.start else 0
+        return sum(row.started for row in self.rollups) + ongoing
+
+    def reliability(self) -> dict:
+        resolved = sum(row.resolved for row in self.rollups)
+        repair_seconds = sum(row.repair_seconds for row in self.rollups)
+        failures = self.failures
+        return {
+            "period": f"{self.days}d",
+            "incidents": failures,
+            "resolved": resolved,
+            "downtime_seconds": self.downtime_seconds,
+            # Mean time to repair: over incidents resolved in the window
+            "mttr_seconds": repair_seconds / resolved if resolved else None,
+            # Mean time between failures: time up in the window per failure
+            "mtbf_seconds": (self.window_seconds - self.downtime_seconds) / failures if failures else None
+        }
+
+    def calendar(self) -> List[dict]:
+        downtime = self.downtime_by_day()
+        started = {row.day: row.started for row in self.rollups}
+        if self.ongoing and self.ongoing.started_at >= self.start:
+            day = self.ongoing.started_at.date()
+            started[day] = started.get(day, 0) + 1
+
+        return [
+            {
+                "date": day,
+                "downtime_minutes": round(downtime.get(day, 0) / 60, 1),
+                "incidents": started.get(day, 0)
+            }
+            for day in (self.first_day + timedelta(days=offset) for offset in range(self.days))
+        ]
+
+    def sla_budget(self, target: float) -> dict:
+        """Error budget for an availability ``target`` (percent) over the window.
+
+        burn_rate is the rate downtime has been spent relative to the rate that
+        would use exactly the whole budget by the end of the window; above 1
+        the budget runs out early.
+        """
+        allowed_fraction = 1 - target / 100
+        period_seconds = self.days * 86400
+        budget_seconds = period_seconds * allowed_fraction
+        downtime = self.downtime_seconds
+        elapsed = self.window_seconds
+
+        return {
+            "period": f"{self.days}d",
+            "target": target,
+            "budget_seconds": budget_seconds,
+            "downtime_seconds": downtime,
+            "budget_remaining_seconds": budget_seconds - downtime,
+            "budget_consumed_pct": downtime / budget_seconds * 100 if budget_seconds else None,
+            "burn_rate": (downtime / elapsed) / allowed_fraction if elapsed and allowed_fraction else None
+        }
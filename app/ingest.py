@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Set
+import json
+import math
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for application/msgpack batches
+    msgpack = None
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+VALID_STATUSES = frozenset(("up", "degraded", "down"))
+MAX_REPORTED_ERRORS = 20
+
+class IngestFormatError(ValueError):
+    pass
+
+class UnsupportedFormatError(IngestFormatError):
+    pass
+
+def decode_batch(body: bytes, content_type: str) -> Iterable:
+    """Split a request body into raw records.
+
+    NDJSON yields one object per non-empty line (undecodable lines are yielded
+    as the raw bytes so they can be reported per line); msgpack expects a
+    single array of maps.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+
+    if content_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise UnsupportedFormatError("msgpack batches require the 'msgpack' package")
+        try:
+            records = msgpack.unpackb(body, raw=False, timestamp=3)
+        except Exception as e:
+            raise IngestFormatError(f"Invalid msgpack body: {e}")
+        if not isinstance(records, list):
+            raise IngestFormatError("msgpack body must be an array of records")
+        return records
+
+    if content_type and content_type not in NDJSON_TYPES:
+        raise UnsupportedFormatError(f"Unsupported content type '{content_type}'")
+
+    return _decode_ndjson(body)
+
+def _decode_ndjson(body: bytes):
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, datetime):
+        timestamp = value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+        except (OverflowError, OSError):
+            raise ValueError(f"timestamp {value!r} is out of range")
+    elif isinstance(value, str):
+        timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    else:
+        raise ValueError("timestamp must be an ISO 8601 string or epoch seconds")
+
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def validate_record(record, service_ids: Set[int]) -> dict:
+    """Turn one raw record into a health_checks row, raising ValueError if invalid.
+
+    Deliberately hand-rolled instead of a Pydantic model: it runs once per row
+    and large batches are the point of this path.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record must be an object")
+
+    service_id = record.get("service_id")
+    if type(service_id) is not int or service_id not in service_ids:
+        raise ValueError(f"unknown service_id {service_id!r}")
+
+    status = record.get("status")
+    if status not in VALID_STATUSES:
+        raise ValueError(f"invalid status {status!r}")
+
+    response_time = record.get("response_time")
+    if response_time is not None and (isinstance(response_time, bool) or not isinstance(response_time, (int, float))):
+        raise ValueError("response_time must be a number")
+    if response_time is not None and not math.isfinite(response_time):
+        raise ValueError("response_time must be finite")
+
+    status_code = record.get("status_code")
+    if status_code is not None and type(status_code) is not int:
+        raise ValueError("status_code must be an integer")
+    if status_code is not None and not 100 <= status_code <= 599:
+        raise ValueError("status_code must be between 100 and 599")
+
+    error_message = record.get("error_message")
+    if error_message is not None and not isinstance(error_message, str):
+        raise ValueError("error_message must be a string")
+
+    timestamp = record.get("timestamp")
+    return {
+        "service_id": service_id,
+        "timestamp": _parse_timestamp(timestamp) if timestamp is not None else datetime.utcnow(),
+        "status": status,
+        "response_time": response_time,
+        "status_code": status_code,
+        "error_message": error_message
+    }
+
+def validate_batch(records: Iterable, service_ids: Set[int], max_rows: int) -> tuple[List[dict], int, List[dict]]:
+    """Validate every record; returns (rows, rejected count, first few errors)"""
+    rows = []
+    rejected = 0
+    errors = []
+
+    for line, record in enumerate(records, start=1):
+        if line > max_rows:
+            raise IngestFormatError(f"Batch exceeds {max_rows} records")
+        try:
+            rows.append(validate_record(record, service_ids))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": str(e)})
+
+    return rows, rejected, errors
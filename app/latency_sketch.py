@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import json
+import math
+
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import LatencySketch
+
+# Response times at or below this are counted in the zero bucket
+MIN_INDEXABLE = 1e-3
+
+class DDSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch).
+
+    Values land in logarithmic buckets so any quantile is reported within
+    ``relative_accuracy`` of the true value. Two sketches with the same accuracy
+    merge by adding bucket counts, so per-bucket sketches combine into one for
+    any window without touching the raw rows.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1):
+        if value <= MIN_INDEXABLE:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        if not other.count:
+            return
+
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "s": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "b": self.bins
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "DDSketch":
+        raw = json.loads(data)
+        sketch = cls(raw["a"])
+        sketch.bins = {int(key): count for key, count in raw["b"].items()}
+        sketch.zero_count = raw["z"]
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        sketch.sum = raw["s"]
+        sketch.min = raw["min"]
+        sketch.max = raw["max"]
+        return sketch
+
+def bucket_start(timestamp: datetime) -> datetime:
+    minutes = settings.LATENCY_SKETCH_BUCKET_MINUTES
+    start = timestamp.replace(second=0, microsecond=0)
+    minute_of_day = start.hour * 60 + start.minute
+    return start.replace(hour=0, minute=0) + timedelta(minutes=minute_of_day - minute_of_day % minutes)
+
+def parse_percentiles(value: str) -> List[float]:
+    """"50,95,99.9" -> [50.0, 95.0, 99.9]"""
+    percentiles = []
+    for part in value.split(","):
+        part = part.strip().lstrip("pP")
+        if not part:
+            continue
+        try:
+            percentile = float(part)
+        except ValueError:
+            raise ValueError(f"Invalid percentile '{part}'")
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"Percentile {part} must be between 0 and 100")
+        percentiles.append(percentile)
+    return percentiles
+
+async def record_latencies(db: AsyncSession, samples: Iterable[tuple[int, datetime, Optional[float]]]):
+    """Fold (service_id, timestamp, response_time) samples into their bucket sketches.
+
+    Loads the touched buckets with one query and updates them in the caller's
+    transaction, so the sketches commit together with the checks they describe.
+    """
+    sketches: Dict[tuple[int, datetime], DDSketch] = {}
+    for service_id, timestamp, response_time in samples:
+        if response_time is None:
+            continue
+        key = (service_id, bucket_start(timestamp or datetime.utcnow()))
+        if key not in sketches:
+            sketches[key] = DDSketch(settings.LATENCY_SKETCH_ACCURACY)
+        sketches[key].add(response_time)
+
+    if not sketches:
+        return
+
+    result = await db.execute(
+        select(LatencySketch).where(
+            tuple_(LatencySketch.service_id, LatencySketch.bucket_start).in_(list(sketches))
+        )
+    )
+    existing = {(row.service_id, row.bucket_start): row for row in result.scalars().all()}
+
+    for (service_id, start), sketch in sketches.items():
+        row = existing.get((service_id, start))
+        if row is None:
+            db.add(LatencySketch(service_id=service_id, bucket_start=start, count=sketch.count, sketch=sketch.to_json()))
+            continue
+
+        merged = DDSketch.from_json(row.sketch)
+        merged.merge(sketch)
+        row.count = merged.count
+        row.sketch = merged.to_json()
+
+async def load_latency_sketch(db: AsyncSession, service_id: int, since: datetime) -> DDSketch:
+    """Merge a service's bucket sketches from the bucket containing ``since`` onwards"""
+    result = await db.execute(
+        select(LatencySketch.sketch).where(
+            LatencySketch.service_id == service_id,
+            LatencySketch.bucket_start >= bucket_start(since)
+        )
+    )
+
+    merged = DDSketch(settings.LATENCY_SKETCH_ACCURACY)
+    for data in result.scalars().all():
+        sketch = DDSketch.from_json(data)
+        if sketch.relative_accuracy == merged.relative_accuracy:
+            merged.merge(sketch)
+    return merged
+
+async def delete_old_sketches(db: AsyncSession, cutoff: datetime) -> int:
+    result = await db.execute(delete(LatencySketch).where(LatencySketch.bucket_start < bucket_start(cutoff)))
+    return result.rowcount
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import os
+import socket
+import time
+import uuid
+import logging
+
+from sqlalchemy import update, insert
+from sqlalchemy.exc import IntegrityError
+
+from config import settings
+from database import SchedulerLease, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+def make_holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LeaderLease:
+    """A named lease row in the database that at most one process holds.
+
+    The holder renews it every few seconds; anyone may take it over once
+    expires_at has passed. Leadership is also dropped locally once the last
+    successful renewal is older than the TTL, so a process that can't reach
+    the database stops probing before another one takes over.
+    """
+
+    def __init__(
+        self,
+        name: str = "monitor",
+        ttl: Optional[int] = None,
+        session_factory=AsyncSessionLocal,
+        holder: Optional[str] = None
+    ):
+        self.name = name
+        self.ttl = settings.LEADER_LEASE_TTL if ttl is None else ttl
+        self.session_factory = session_factory
+        self.holder = holder or make_holder_id()
+        self._held_until = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._held_until
+
+    async def renew(self) -> bool:
+        """Acquire or extend the lease; returns whether this process holds it"""
+        started = time.monotonic()
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+
+        try:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    update(SchedulerLease)
+                    .where(SchedulerLease.name == self.name)
+                    .where((SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now))
+                    .values(holder=self.holder, expires_at=expires_at, heartbeat_at=now)
+                )
+                acquired = result.rowcount == 1
+
+                if not acquired:
+                    try:
+                        await db.execute(
+                            insert(SchedulerLease).values(
+                                name=self.name,
+                                holder=self.holder,
+                                expires_at=expires_at,
+                                heartbeat_at=now
+                            )
+                        )
+                        acquired = True
+                    except IntegrityError:
+                        await db.rollback()
+                        acquired = False
+
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error renewing '{self.name}' lease: {e}")
+            return self.is_leader
+
+        was_leader = self.is_leader
+        self._held_until = started + self.ttl if acquired else 0.0
+
+        if acquired and not was_leader:
+            logger.info(f"Acquired '{self.name}' lease as {self.holder}")
+        elif was_leader and not acquired:
+            logger.warning(f"Lost '{self.name}' lease")
+
+        return acquired
+
+    async def release(self):
+        if not self.is_leader:
+            return
+
+        self._held_until = 0.0
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(SchedulerLease)
+                    .where(SchedulerLease.name == self.name)
+                    .where(SchedulerLease.holder == self.holder)
+                    .values(expires_at=datetime.utcnow())
+                )
+                await db.commit()
+            logger.info(f"Released '{self.name}' lease")
+        except Exception as e:
+            logger.error(f"Error releasing '{self.name}' lease: {e}")
+
+def leader_only(lease: LeaderLease, job):
+    """Wrap a scheduler job so it only runs while the lease is held"""
+    async def run(*args, **kwargs):
+        if lease.is_leader:
+            await job(*args, **kwargs)
+
+    run.__name__ = job.__name__
+    return run
@@ -0,0 +1,133 @@
+from collections import deque
+from typing import List, Optional
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class LoopMonitor:
+    """Measures asyncio scheduling delay and catches callbacks that block the loop.
+
+    A coroutine wakes every ``interval`` seconds and records how late it woke
+    up. A watchdog thread watches that coroutine's heartbeat; when it hasn't
+    ticked for ``block_threshold`` seconds past its interval the loop is stuck
+    in a callback, so the watchdog snapshots the loop thread's stack to show
+    which one.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        block_threshold: float = 0.25,
+        window: int = 3000,
+        max_snapshots: int = 20
+    ):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.samples = deque(maxlen=window)
+        self.snapshots = deque(maxlen=max_snapshots)
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self._heartbeat: Optional[float] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stall_reported = False
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls) -> "LoopMonitor":
+        return cls(
+            interval=settings.LOOP_SAMPLE_INTERVAL,
+            block_threshold=settings.LOOP_BLOCK_THRESHOLD
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, lag_ms: float, now: Optional[float] = None):
+        self.samples.append((now if now is not None else time.monotonic(), lag_ms))
+        if lag_ms > self.max_lag_ms:
+            self.max_lag_ms = lag_ms
+
+    async def _sample(self):
+        self._loop_thread_id = threading.get_ident()
+        while True:
+            self._heartbeat = time.monotonic()
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, time.perf_counter() - started - self.interval) * 1000
+            self.record(lag_ms)
+            self._stall_reported = False
+
+    def _watch(self):
+        poll = min(self.interval, self.block_threshold / 2)
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            if heartbeat is None or self._stall_reported:
+                continue
+
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for >= self.block_threshold:
+                self._stall_reported = True
+                self.snapshot(blocked_for)
+
+    def snapshot(self, blocked_for: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        self.stalls += 1
+        self.snapshots.append({
+            "at": time.time(),
+            "blocked_ms": round(blocked_for * 1000, 1),
+            "stack": stack
+        })
+        logger.warning(
+            f"Event loop blocked for {blocked_for * 1000:.0f}ms+; loop thread stack:\n{''.join(stack[-15:])}"
+        )
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def recent_max_ms(self, seconds: float) -> Optional[float]:
+        cutoff = time.monotonic() - seconds
+        recent = [lag for at, lag in self.samples if at >= cutoff]
+        return round(max(recent), 2) if recent else None
+
+    def stats(self) -> dict:
+        lags: List[float] = sorted(lag for _, lag in self.samples)
+
+        def percentile(q: float) -> Optional[float]:
+            if not lags:
+                return None
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))], 2)
+
+        return {
+            "running": self.running,
+            "samples": len(lags),
+            "interval_ms": self.interval * 1000,
+            "lag_p50_ms": percentile(0.5),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": round(self.max_lag_ms, 2),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.snapshots)
+        }
+
+loop_monitor = LoopMonitor.from_settings()
@@ -1,53 +1,61 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
 from pathlib import Path
+import asyncio
 
 from config import settings
-from database import init_db, get_db, AsyncSessionLocal, Service
-from monitor import run_health_checks, cleanup_old_checks
+from database import init_db, get_db, AsyncSessionLocal, engine
+from reconcile import reconcile_services
+from incident_rollup import backfill_incident_rollups
+from slo import restore_slo_state
+from health import health_state, run_health_probes, track_connections
+from loop_monitor import loop_monitor
+from leader import LeaderLease
+from worker import start_monitor, stop_monitor
 from routes import router as api_router
-from sqlalchemy import select
 import logging
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional: gzip only without it
+    BrotliMiddleware = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler()
+lease = LeaderLease()
+track_connections(engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
     await init_db()
-
-    logger.info("Initializing services...")
-    await initialize_services()
-
-    logger.info("Starting scheduler...")
-    scheduler.add_job(
-        run_health_checks,
-        trigger=IntervalTrigger(seconds=settings.CHECK_INTERVAL),
-        id="health_checks",
-        replace_existing=True
-    )
-    scheduler.add_job(
-        cleanup_old_checks,
-        trigger=IntervalTrigger(days=1),
-        id="cleanup",
-        replace_existing=True
-    )
-    scheduler.start()
-
-    await run_health_checks()
+    health_state.db_ready = True
+    if settings.LOOP_MONITOR:
+        loop_monitor.start()
+    health_probes = asyncio.create_task(run_health_probes(engine))
+
+    if settings.RUN_SCHEDULER:
+        # Only the process holding the monitor lease syncs services and probes
+        logger.info("Starting scheduler...")
+        await start_monitor(scheduler, lease, initialize_services)
+    else:
+        logger.info("RUN_SCHEDULER is disabled; serving the API only")
 
     yield
 
-    logger.info("Shutting down scheduler...")
-    scheduler.shutdown()
+    if settings.RUN_SCHEDULER:
+        logger.info("Shutting down scheduler...")
+        await stop_monitor(scheduler, lease)
+
+    health_probes.cancel()
+    loop_monitor.stop()
 
 app = FastAPI(title="Homelab Status Service", lifespan=lifespan)
 
@@ -77,8 +85,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Cross-origin status pages read these to paginate and revalidate
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
 
+if BrotliMiddleware:
+    app.add_middleware(BrotliMiddleware, minimum_size=settings.COMPRESS_MIN_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.COMPRESS_MIN_SIZE)
+
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 @app.get("/api")
@@ -87,7 +102,31 @@ async def api_root():
 
 @app.get("/api/health")
 async def health():
-    return {"status": "healthy"}
+    live, liveness_detail = health_state.liveness()
+    ready, readiness_detail = health_state.readiness()
+    return {
+        "status": "healthy" if live and ready else "unhealthy",
+        "live": live,
+        "ready": ready,
+        "initial_sweep": health_state.initial_sweep,
+        **liveness_detail,
+        **readiness_detail
+    }
+
+@app.get("/api/health/live")
+async def liveness():
+    live, detail = health_state.liveness()
+    return JSONResponse({"live": live, **detail}, status_code=200 if live else 503)
+
+@app.get("/api/health/ready")
+async def readiness():
+    ready, detail = health_state.readiness()
+    return JSONResponse({"ready": ready, **detail}, status_code=200 if ready else 503)
+
+@app.get("/api/health/loop")
+async def loop_stats():
+    """Event loop lag percentiles and stack snapshots of recent blocking calls"""
+    return loop_monitor.stats()
 
 # Serve static frontend
 static_dir = Path(__file__).parent / "frontend"
@@ -101,50 +140,10 @@ async def initialize_services():
 
     try:
         async with AsyncSessionLocal() as db:
-            logger.info(f"Processing {len(settings.SERVICES)} services from config")
-
-            for i, service_config in enumerate(settings.SERVICES):
-                # Find existing service by URL (URL is the unique identifier)
-                result = await db.execute(
-                    select(Service).where(Service.url == service_config["url"])
-                )
-                existing = result.scalar_one_or_none()
-
-                if existing:
-                    # Update existing service if name or config has changed
-                    updated = False
-                    if existing.name != service_config["name"]:
-                        old_name = existing.name
-                        existing.name = service_config["name"]
-                        updated = True
-                        logger.info(f"Updated service name: '{old_name}' -> '{service_config['name']}'")
-                    if existing.check_type != service_config["check_type"]:
-                        existing.check_type = service_config["check_type"]
-                        updated = True
-                    if existing.expected_status != service_config["expected_status"]:
-                        existing.expected_status = service_config["expected_status"]
-                        updated = True
-                    if existing.domains != service_config.get("domains"):
-                        existing.domains = service_config.get("domains")
-                        updated = True
-
-                    if updated:
-                        logger.info(f"Updated service: {service_config['name']}")
-                else:
-                    # Create new service
-                    service = Service(
-                        name=service_config["name"],
-                        url=service_config["url"],
-                        check_type=service_config["check_type"],
-                        expected_status=service_config["expected_status"],
-                        domains=service_config.get("domains"),
-                        enabled=True
-                    )
-                    db.add(service)
-                    logger.info(f"Added service: {service_config['name']}")
-
-            await db.commit()
-            logger.info("Service initialization complete")
+            summary = await reconcile_services(db)
+            logger.info(f"Service initialization complete: {summary}")
+            await backfill_incident_rollups(db)
+            await restore_slo_state(db)
 
     except Exception as e:
         logger.error(f"Error in initialize_services: {e}")
@@ -1,27 +1,87 @@
+import asyncio
 import httpx
 import time
 from datetime import datetime, timedelta
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 from config import settings
-from database import Service, HealthCheck, Incident, AsyncSessionLocal
+from database import (
+    Service,
+    HealthCheck,
+    Incident,
+    SloAlert,
+    NotificationOutbox,
+    IngestBatch,
+    AgentReport,
+    AsyncSessionLocal,
+    drop_expired_partitions,
+    ensure_partitions
+)
+from adaptive_schedule import check_schedule
+from health import health_state
+from loop_monitor import loop_monitor
+from latency_sketch import record_latencies, delete_old_sketches
+from data_version import bump_data_versions, data_versions
+from quorum import load_agent_votes, apply_quorum
+from incident_rollup import record_resolved_incident
+from slo import SloEvent, slo_evaluator
+from dependencies import DependencyGraph
+from sweep_planner import SweepPlanner, probe_host, probe_target
+from notifications import enqueue_notification, dispatcher as notification_dispatcher
+from status_rules import StatusMatcher, compile_status_rule
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def check_http_service(url: str, timeout: int = 10) -> tuple[str, float, int, str]:
+PROBE_MODES = ("get", "head", "stream")
+
+async def _read_capped(response: httpx.Response, max_body_bytes: int):
+    """Consume at most max_body_bytes of a streamed body, then stop reading"""
+    if max_body_bytes <= 0:
+        return
+
+    received = 0
+    async for chunk in response.aiter_raw():
+        received += len(chunk)
+        if received >= max_body_bytes:
+            break
+
+async def _probe(client: httpx.AsyncClient, url: str, timeout: int, probe_mode: str, max_body_bytes: int) -> int:
+    """Send the request for the given probe mode and return the status code"""
+    if probe_mode == "head":
+        response = await client.head(url, timeout=timeout)
+        # Some servers don't implement HEAD; fall back to a header-only GET
+        if response.status_code not in (405, 501):
+            return response.status_code
+        probe_mode = "stream"
+
+    if probe_mode == "stream":
+        async with client.stream("GET", url, timeout=timeout) as response:
+            await _read_capped(response, max_body_bytes)
+            return response.status_code
+
+    response = await client.get(url, timeout=timeout)
+    return response.status_code
+
+async def check_http_service(
+    url: str,
+    timeout: int = 10,
+    probe_mode: str = "get",
+    max_body_bytes: int = 0,
+    matcher: StatusMatcher = None
+) -> tuple[str, float, int, str]:
+    if matcher is None:
+        matcher = compile_status_rule(None)
+
     try:
         start_time = time.time()
         async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, timeout=timeout)
+            status_code = await _probe(client, url, timeout, probe_mode, max_body_bytes)
             response_time = (time.time() - start_time) * 1000
 
-            if 200 <= response.status_code < 300:
-                return "up", response_time, response.status_code, None
-            elif 300 <= response.status_code < 400:
-                return "up", response_time, response.status_code, None
-            else:
-                return "degraded", response_time, response.status_code, f"HTTP {response.status_code}"
+            status, error = matcher.classify(status_code, response_time)
+            return status, response_time, status_code, error
     except httpx.TimeoutException:
         return "down", None, None, "Connection timeout"
     except httpx.ConnectError as e:
@@ -29,17 +89,62 @@ async def check_http_service(url: str, timeout: int = 10) -> tuple[str, float, i
     except Exception as e:
         return "down", None, None, f"Error: {str(e)}"
 
-async def perform_health_check(service: Service) -> HealthCheck:
-    if service.check_type == "http":
-        status, response_time, status_code, error = await check_http_service(
-            service.url,
-            settings.TIMEOUT
-        )
+def get_probe_options(service: Service) -> tuple[str, int]:
+    """Resolve a service's probe mode and body cap, falling back to the global defaults"""
+    probe_mode = service.probe_mode or settings.PROBE_MODE
+    if probe_mode not in PROBE_MODES:
+        logger.warning(f"Unknown probe mode '{probe_mode}' for {service.name}, using 'get'")
+        probe_mode = "get"
+
+    max_body_bytes = service.max_body_bytes
+    if max_body_bytes is None:
+        max_body_bytes = settings.MAX_BODY_BYTES
+
+    return probe_mode, max_body_bytes
+
+async def perform_health_check(
+    service: Service,
+    timeout: Optional[float] = None,
+    planner: Optional[SweepPlanner] = None,
+    attempt: int = 0
+) -> HealthCheck:
+    """Probe a service; with a planner, identical probes in the sweep share one request.
+
+    attempt is 0 for the first probe and n for the n-th confirmation re-probe,
+    so a re-probe is always a new request rather than the shared result of
+    an earlier attempt.
+    """
+    probe_mode, max_body_bytes = get_probe_options(service)
+    matcher = compile_status_rule(service.expected_status)
+    if timeout is None:
+        timeout = settings.TIMEOUT
+
+    async def probe():
+        if service.check_type == "http":
+            return await check_http_service(
+                service.url,
+                timeout,
+                probe_mode,
+                max_body_bytes,
+                matcher
+            )
+        else:
+            return await check_http_service(
+                service.url,
+                timeout,
+                probe_mode,
+                max_body_bytes,
+                matcher
+            )
+
+    if planner is None:
+        status, response_time, status_code, error = await probe()
     else:
-        status, response_time, status_code, error = await check_http_service(
-            service.url,
-            settings.TIMEOUT
-        )
+        key = (probe_target(service.url), service.check_type, probe_mode, max_body_bytes, timeout, attempt)
+        status, response_time, status_code, error = await planner.run(key, probe_host(service.url), probe)
+        # The shared result was classified by whichever service sent the probe
+        if status_code is not None:
+            status, error = matcher.classify(status_code, response_time)
 
     check = HealthCheck(
         service_id=service.id,
@@ -52,7 +157,185 @@ async def perform_health_check(service: Service) -> HealthCheck:
 
     return check
 
-async def handle_incident(db: AsyncSession, service: Service, current_status: str):
+async def confirm_health_check(
+    service: Service,
+    check: HealthCheck,
+    planner: Optional[SweepPlanner] = None
+) -> HealthCheck:
+    """Re-probe a failed check before trusting it.
+
+    Up to CONFIRM_RETRIES extra probes are sent CONFIRM_RETRY_DELAY seconds
+    apart. The first uses CONFIRM_TIMEOUT and each later one multiplies it by
+    CONFIRM_TIMEOUT_ESCALATION, never past TIMEOUT, so a hard-down service
+    costs the sweep seconds rather than several full timeouts. The first
+    probe that isn't down replaces the failed check, so a transient blip never
+    reaches the database.
+    """
+    timeout = min(settings.CONFIRM_TIMEOUT, settings.TIMEOUT)
+
+    for attempt in range(1, settings.CONFIRM_RETRIES + 1):
+        if check.status != "down":
+            break
+
+        await asyncio.sleep(settings.CONFIRM_RETRY_DELAY)
+        if attempt > 1:
+            timeout = min(timeout * settings.CONFIRM_TIMEOUT_ESCALATION, settings.TIMEOUT)
+        check = await perform_health_check(service, timeout, planner=planner, attempt=attempt)
+        logger.info(f"Re-probe {attempt}/{settings.CONFIRM_RETRIES} for {service.name}: {check.status}")
+
+    return check
+
+def upstream_down_check(service: Service, upstream: Service) -> HealthCheck:
+    """Result recorded instead of probing a service whose upstream is down"""
+    return HealthCheck(
+        service_id=service.id,
+        timestamp=datetime.utcnow(),
+        status="down",
+        response_time=None,
+        status_code=None,
+        error_message=f"Upstream {upstream.name} is down"
+    )
+
+async def probe_services(
+    services: List[Service],
+    graph: DependencyGraph,
+    agent_votes: Dict[int, list],
+    ongoing: Dict[int, Incident]
+) -> List[HealthCheck]:
+    """Probe services concurrently and return their checks in the same order.
+
+    Up to SWEEP_CONCURRENCY services are probed at once. A service's probe
+    waits for the results it depends on (see DependencyGraph.probe_after), and
+    identical probes share one request through the sweep's planner.
+    """
+    planner = SweepPlanner()
+    slots = asyncio.Semaphore(max(1, settings.SWEEP_CONCURRENCY))
+    sweep_order = [service.id for service in services]
+    statuses: Dict[int, str] = {}
+    tasks: Dict[int, asyncio.Task] = {}
+
+    async def probe(service: Service, waits: List[asyncio.Task]) -> HealthCheck:
+        if waits:
+            await asyncio.gather(*waits)
+
+        upstream = graph.down_upstream(service.id, statuses, ongoing)
+        if upstream is not None:
+            check = upstream_down_check(service, upstream)
+        else:
+            async with slots:
+                check = await perform_health_check(service, planner=planner)
+                # A peer on the same infrastructure already failed confirmed; don't re-probe
+                if not graph.peer_down(service.id, statuses):
+                    check = await confirm_health_check(service, check, planner=planner)
+        check = apply_quorum(check, agent_votes.get(service.id, []))
+        statuses[service.id] = check.status
+        return check
+
+    # services are in dependency order, so every task waited on already exists
+    for service in services:
+        waits = [tasks[other] for other in graph.probe_after(service.id, sweep_order)]
+        tasks[service.id] = asyncio.create_task(probe(service, waits))
+
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    if planner.shared:
+        logger.info(f"Sweep sent {planner.sent} probes for {planner.requested} checks ({planner.shared} shared)")
+    return results
+
+async def slo_firing_notified(db: AsyncSession, event: SloEvent) -> bool:
+    """Whether the alert that is now resolving was notified when it started firing"""
+    result = await db.execute(
+        select(SloAlert.notified)
+        .where(
+            SloAlert.service_id == event.service_id,
+            SloAlert.rule == event.rule,
+            SloAlert.state == "firing"
+        )
+        .order_by(desc(SloAlert.timestamp), desc(SloAlert.id))
+        .limit(1)
+    )
+    notified = result.scalar_one_or_none()
+    return True if notified is None else notified
+
+async def record_slo_alerts(db: AsyncSession, events: List[SloEvent], linked: bool):
+    """Store burn-rate alert transitions and notify them.
+
+    A service whose outage is rolled into another service's root incident
+    doesn't page on its own, and a recovery is only announced if the alert
+    firing was.
+    """
+    for event in events:
+        notify = not linked if event.state == "firing" else await slo_firing_notified(db, event)
+        db.add(SloAlert(
+            service_id=event.service_id,
+            timestamp=event.timestamp,
+            severity=event.severity,
+            rule=event.rule,
+            state=event.state,
+            burn_rate=event.burn_rate,
+            threshold=event.threshold,
+            slo_target=event.slo_target,
+            notified=notify
+        ))
+        if not notify:
+            continue
+        enqueue_notification(db, {
+            "kind": "slo_alert",
+            "state": event.state,
+            "service_id": event.service_id,
+            "service_name": event.service_name,
+            "severity": event.severity,
+            "rule": event.rule,
+            "burn_rate": event.burn_rate,
+            "message": f"SLO {event.severity} {event.state} for {event.service_name}: "
+                       f"{event.burn_rate}x burn over {event.rule}"
+        })
+
+async def load_ongoing_incidents(db: AsyncSession) -> Dict[int, Incident]:
+    result = await db.execute(
+        select(Incident).where(Incident.status == "ongoing").order_by(Incident.started_at)
+    )
+    ongoing = {}
+    for incident in result.scalars().all():
+        ongoing.setdefault(incident.service_id, incident)
+    return ongoing
+
+# service_id -> (consecutive confirmed failures, time of the first one)
+failure_streaks: Dict[int, tuple[int, datetime]] = {}
+
+def record_failure_streak(service_id: int, check: HealthCheck) -> tuple[int, datetime]:
+    if check.status != "down":
+        failure_streaks.pop(service_id, None)
+        return 0, None
+
+    count, first_failed_at = failure_streaks.get(service_id, (0, check.timestamp))
+    failure_streaks[service_id] = (count + 1, first_failed_at)
+    return failure_streaks[service_id]
+
+async def handle_incident(
+    db: AsyncSession,
+    service: Service,
+    current_status: str,
+    confirmed: bool = True,
+    failed_since: Optional[datetime] = None,
+    root_incident: Optional[Incident] = None
+) -> Optional[Incident]:
+    """Open or resolve the service's incident for the latest status.
+
+    A down status only opens an incident once it is confirmed; the incident is
+    backdated to failed_since when the failure spanned several checks. With a
+    root_incident (an upstream's or group peer's ongoing outage) the new
+    incident is linked to it and not notified on its own. Returns the incident
+    opened or resolved, if any.
+    """
+    if current_status == "down" and not confirmed:
+        return None
+
     result = await db.execute(
         select(Incident)
         .where(Incident.service_id == service.id)
@@ -65,58 +348,252 @@ async def handle_incident(db: AsyncSession, service: Service, current_status: st
         if not latest_incident or latest_incident.status == "resolved":
             new_incident = Incident(
                 service_id=service.id,
-                started_at=datetime.utcnow(),
+                started_at=failed_since or datetime.utcnow(),
                 status="ongoing",
                 description=f"{service.name} is down"
             )
+            if root_incident is not None:
+                new_incident.root_incident_id = root_incident.root_incident_id or root_incident.id
+                new_incident.description = f"{service.name} is down (part of incident #{new_incident.root_incident_id})"
             db.add(new_incident)
+            await db.flush()
+            if root_incident is not None:
+                logger.warning(f"{service.name} is down; linked to incident #{new_incident.root_incident_id}")
+                return new_incident
+
+            enqueue_notification(db, {
+                "kind": "incident",
+                "state": "opened",
+                "service_id": service.id,
+                "service_name": service.name,
+                "incident_id": new_incident.id,
+                "started_at": new_incident.started_at.isoformat(),
+                "message": f"{service.name} is down",
+                "dedup_key": f"incident:{new_incident.id}:opened"
+            })
             logger.warning(f"New incident created for {service.name}")
+            return new_incident
     else:
         if latest_incident and latest_incident.status == "ongoing":
             latest_incident.ended_at = datetime.utcnow()
             duration = int((latest_incident.ended_at - latest_incident.started_at).total_seconds())
             latest_incident.duration = duration
             latest_incident.status = "resolved"
+            await record_resolved_incident(db, latest_incident)
+            if latest_incident.root_incident_id is None:
+                enqueue_notification(db, {
+                    "kind": "incident",
+                    "state": "resolved",
+                    "service_id": service.id,
+                    "service_name": service.name,
+                    "incident_id": latest_incident.id,
+                    "started_at": latest_incident.started_at.isoformat(),
+                    "ended_at": latest_incident.ended_at.isoformat(),
+                    "duration": duration,
+                    "message": f"{service.name} is back up after {duration}s",
+                    "dedup_key": f"incident:{latest_incident.id}:resolved"
+                })
 
             if duration >= 60:
                 logger.info(f"Incident resolved for {service.name} (duration: {duration}s)")
             else:
                 logger.info(f"Short incident resolved for {service.name} (duration: {duration}s, won't count against uptime)")
+            return latest_incident
+
+    return None
+
+async def promote_linked_incidents(db: AsyncSession, root: Incident, root_service: Service) -> List[Incident]:
+    """Turn incidents still linked to a just-resolved root into roots of their own.
+
+    Their services are still down although the cause they were attributed to
+    has recovered, so each is notified now instead of staying invisible.
+    """
+    result = await db.execute(
+        select(Incident, Service.name)
+        .join(Service, Service.id == Incident.service_id)
+        .where(Incident.root_incident_id == root.id, Incident.status == "ongoing")
+        .order_by(Incident.started_at, Incident.id)
+    )
+    promoted = []
+    for incident, service_name in result.all():
+        incident.root_incident_id = None
+        incident.description = f"{service_name} is down"
+        enqueue_notification(db, {
+            "kind": "incident",
+            "state": "opened",
+            "service_id": incident.service_id,
+            "service_name": service_name,
+            "incident_id": incident.id,
+            "started_at": incident.started_at.isoformat(),
+            "message": f"{service_name} is still down after {root_service.name} recovered",
+            "dedup_key": f"incident:{incident.id}:opened"
+        })
+        logger.warning(f"{service_name} is still down after {root_service.name} recovered; incident #{incident.id} is now a root")
+        promoted.append(incident)
+    return promoted
 
-async def run_health_checks():
+# Sweeps never overlap: the startup sweep and the scheduler tick share this lock
+sweep_lock = asyncio.Lock()
+
+async def run_health_checks(due_only: bool = False):
+    """Probe enabled services; with due_only, skip those the adaptive schedule isn't due on"""
+    if due_only and sweep_lock.locked():
+        logger.info("Previous sweep still running, skipping this tick")
+        return
+
+    async with sweep_lock:
+        health_state.sweep_started()
+        stalls = loop_monitor.stalls
+        try:
+            await _run_health_checks(due_only)
+        finally:
+            health_state.sweep_finished()
+
+        if loop_monitor.stalls > stalls:
+            logger.warning(
+                f"Event loop blocked {loop_monitor.stalls - stalls} time(s) during this sweep; "
+                f"response times recorded in it may be inflated"
+            )
+
+async def _run_health_checks(due_only: bool):
     async with AsyncSessionLocal() as db:
         try:
             result = await db.execute(
                 select(Service).where(Service.enabled == True)
             )
             services = result.scalars().all()
+            graph = DependencyGraph(services)
+
+            if due_only:
+                services = [s for s in services if check_schedule.is_due(s.id)]
+            # Upstreams first, so their result is known when their dependents come up
+            services = graph.order(services)
+
+            agent_votes = await load_agent_votes(db, [s.id for s in services])
+            ongoing = await load_ongoing_incidents(db)
+            results = await probe_services(services, graph, agent_votes, ongoing)
+            checks = []
+            resolved_roots = []
 
-            for service in services:
-                check = await perform_health_check(service)
+            for service, check in zip(services, results):
+                interval = check_schedule.record(service.id, check.status)
+                # How long this result stands for until the next probe, so uptime
+                # and SLO rates stay time-weighted when intervals vary
+                check.interval_seconds = interval if settings.ADAPTIVE_SCHEDULING else settings.CHECK_INTERVAL
                 db.add(check)
-                await handle_incident(db, service, check.status)
+                checks.append(check)
+
+                failures, failed_since = record_failure_streak(service.id, check)
+                correlated_since = (failed_since or check.timestamp) - timedelta(seconds=settings.INCIDENT_CORRELATION_WINDOW)
+                root_incident = graph.root_incident(service.id, ongoing, correlated_since)
+                incident = await handle_incident(
+                    db,
+                    service,
+                    check.status,
+                    confirmed=failures >= settings.CONFIRM_CONSECUTIVE_FAILURES,
+                    failed_since=failed_since,
+                    root_incident=root_incident
+                )
+                if incident is not None and incident.status == "ongoing":
+                    ongoing[service.id] = incident
+                elif incident is not None:
+                    ongoing.pop(service.id, None)
+                    if incident.root_incident_id is None:
+                        resolved_roots.append((incident, service))
+
+                current = ongoing.get(service.id)
+                linked = (current is not None and current.root_incident_id is not None) or \
+                    (check.status == "down" and root_incident is not None)
+                events = slo_evaluator.record(
+                    service.id,
+                    service.name,
+                    check.status,
+                    service.slo_target,
+                    weight=check.interval_seconds
+                )
+                await record_slo_alerts(db, events, linked)
 
                 logger.info(f"Health check for {service.name}: {check.status} ({check.response_time}ms)")
 
+            # After every result is in, so outages that ended in this sweep too aren't promoted
+            for root, root_service in resolved_roots:
+                await promote_linked_incidents(db, root, root_service)
+
+            await record_latencies(db, [(c.service_id, c.timestamp, c.response_time) for c in checks])
+            await bump_data_versions(db, [c.service_id for c in checks])
             await db.commit()
+            data_versions.invalidate()
+            # Delivery runs in the sinks' own tasks; the sweep never waits on it
+            notification_dispatcher.wake()
         except Exception as e:
             logger.error(f"Error during health checks: {str(e)}")
             await db.rollback()
 
-async def cleanup_old_checks(days: int = 30):
+async def delete_expired_records(db: AsyncSession, cutoff: datetime) -> Dict[str, int]:
+    """Delete bookkeeping rows older than cutoff, in the caller's transaction.
+
+    Notifications still pending delivery are kept whatever their age, and so
+    is each service's latest alert per SLO rule: restore_slo_state and the
+    resolve notification read it to know whether the alert is still firing.
+    """
+    latest_alerts = (
+        select(func.max(SloAlert.id))
+        .group_by(SloAlert.service_id, SloAlert.rule)
+        .scalar_subquery()
+    )
+    statements = {
+        "notifications": delete(NotificationOutbox).where(
+            NotificationOutbox.status.in_(("sent", "failed")),
+            NotificationOutbox.created_at < cutoff
+        ),
+        "slo_alerts": delete(SloAlert).where(SloAlert.timestamp < cutoff, SloAlert.id.not_in(latest_alerts)),
+        "ingest_batches": delete(IngestBatch).where(IngestBatch.received_at < cutoff),
+        "agent_reports": delete(AgentReport).where(AgentReport.timestamp < cutoff),
+    }
+    deleted = {}
+    for name, statement in statements.items():
+        result = await db.execute(statement)
+        deleted[name] = result.rowcount
+    return deleted
+
+async def cleanup_old_checks(days: Optional[int] = None):
+    """Apply DATA_RETENTION_DAYS (or ``days``) to every table that grows with time"""
+    days = settings.DATA_RETENTION_DAYS if days is None else days
     async with AsyncSessionLocal() as db:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            result = await db.execute(
-                select(HealthCheck).where(HealthCheck.timestamp < cutoff_date)
+
+            # Services losing history get a new data version, so cached
+            # responses (ETags) over the expired checks are not revalidated
+            affected = await db.execute(
+                select(Service.id).where(
+                    select(HealthCheck.id)
+                    .where(HealthCheck.service_id == Service.id, HealthCheck.timestamp < cutoff_date)
+                    .exists()
+                )
             )
-            old_checks = result.scalars().all()
+            affected_ids = affected.scalars().all()
+
+            # On PostgreSQL whole months go by dropping their partition; the
+            # DELETE then only touches the partition straddling the cutoff
+            conn = await db.connection()
+            dropped = await conn.run_sync(drop_expired_partitions, cutoff_date)
+            await conn.run_sync(ensure_partitions)
 
-            for check in old_checks:
-                await db.delete(check)
+            result = await db.execute(
+                delete(HealthCheck).where(HealthCheck.timestamp < cutoff_date)
+            )
+            await delete_old_sketches(db, cutoff_date)
+            expired = await delete_expired_records(db, cutoff_date)
+            await bump_data_versions(db, affected_ids)
 
             await db.commit()
-            logger.info(f"Cleaned up {len(old_checks)} old health checks")
+            data_versions.invalidate()
+            logger.info(f"Cleaned up {result.rowcount} old health checks")
+            if any(expired.values()):
+                logger.info(f"Cleaned up expired records: {', '.join(f'{count} {name}' for name, count in expired.items())}")
+            if dropped:
+                logger.info(f"Dropped expired partitions: {', '.join(dropped)}")
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
             await db.rollback()
@@ -0,0 +1,310 @@
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Set
+import asyncio
+import json
+import shlex
+import smtplib
+import logging
+
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import NotificationOutbox, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class NotificationConfigError(ValueError):
+    pass
+
+class Sink:
+    """Delivers a batch of events somewhere; raise to have the batch retried"""
+
+    def __init__(self, name: str, min_interval: float = 0):
+        self.name = name
+        # Minimum seconds between two sends, on top of coalescing
+        self.min_interval = min_interval
+
+    async def send(self, events: List[dict]):
+        raise NotImplementedError
+
+def summarize(events: List[dict]) -> str:
+    return "\n".join(event.get("message", event.get("kind", "event")) for event in events)
+
+class WebhookSink(Sink):
+    """POSTs {"events": [...]} as JSON; any non-2xx response is a failure"""
+
+    def __init__(self, name: str, url: str, transport: Optional[httpx.AsyncBaseTransport] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.transport = transport
+
+    async def send(self, events: List[dict]):
+        async with httpx.AsyncClient(transport=self.transport, timeout=settings.NOTIFY_SEND_TIMEOUT) as client:
+            response = await client.post(self.url, json={"events": events, "text": summarize(events)})
+            response.raise_for_status()
+
+class SmtpSink(Sink):
+    """Sends one email per batch; smtplib runs in a worker thread"""
+
+    def __init__(
+        self,
+        name: str,
+        host: str,
+        sender: str,
+        recipients: List[str],
+        port: int = 25,
+        username: str = "",
+        password: str = "",
+        starttls: bool = False,
+        **kwargs
+    ):
+        super().__init__(name, **kwargs)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def build_message(self, events: List[dict]) -> EmailMessage:
+        message = EmailMessage()
+        first = events[0].get("message", "Status change")
+        message["Subject"] = first if len(events) == 1 else f"{first} (+{len(events) - 1} more)"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(summarize(events))
+        return message
+
+    def _send(self, message: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=settings.NOTIFY_SEND_TIMEOUT) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+    async def send(self, events: List[dict]):
+        await asyncio.to_thread(self._send, self.build_message(events))
+
+class ScriptSink(Sink):
+    """Runs a command with {"events": [...]} on stdin; a non-zero exit is a failure"""
+
+    def __init__(self, name: str, command: str, **kwargs):
+        super().__init__(name, **kwargs)
+        self.args = shlex.split(command)
+
+    async def send(self, events: List[dict]):
+        process = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(
+                process.communicate(json.dumps({"events": events}).encode()),
+                timeout=settings.NOTIFY_SEND_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            raise RuntimeError(f"exit status {process.returncode}: {stderr.decode(errors='replace').strip()[:200]}")
+
+def build_sink(config: Dict[str, str]) -> Sink:
+    try:
+        name, sink_type = config["name"], config["type"]
+        options = {"min_interval": float(config.get("min_interval") or 0)}
+        if sink_type == "webhook":
+            return WebhookSink(name, config["url"], **options)
+        if sink_type == "smtp":
+            return SmtpSink(
+                name,
+                host=config["host"],
+                port=int(config.get("port") or 25),
+                sender=config["sender"],
+                recipients=[r.strip() for r in config["recipients"].split(",") if r.strip()],
+                username=config.get("username", ""),
+                password=config.get("password", ""),
+                starttls=str(config.get("starttls", "")).lower() in ("1", "true", "yes"),
+                **options
+            )
+        if sink_type == "script":
+            return ScriptSink(name, config["command"], **options)
+    except KeyError as e:
+        raise NotificationConfigError(f"Notification sink {config.get('name')!r} is missing {e}")
+    except ValueError as e:
+        raise NotificationConfigError(f"Notification sink {config.get('name')!r}: {e}")
+    raise NotificationConfigError(f"Unknown notification sink type {config.get('type')!r}")
+
+def enqueue_notification(db: AsyncSession, event: dict, sinks: Optional[List[str]] = None):
+    """Add an event to the outbox for every sink, in the caller's transaction"""
+    sinks = dispatcher.sink_names if sinks is None else sinks
+    now = datetime.utcnow()
+    payload = json.dumps({**event, "timestamp": now.isoformat()}, default=str)
+    db.add_all([
+        NotificationOutbox(sink=sink, created_at=now, event=payload, status="pending", attempts=0, next_attempt_at=now)
+        for sink in sinks
+    ])
+
+def retry_delay(attempts: int) -> float:
+    return min(settings.NOTIFY_RETRY_MAX, settings.NOTIFY_RETRY_BASE * 2 ** (attempts - 1))
+
+class NotificationDispatcher:
+    """Delivers outbox rows through per-sink queues and worker tasks.
+
+    ``poll`` loads due rows and hands them to the sink's queue; it never waits
+    on a sink, so calling it after a sweep can't stall the sweep. Each sink's
+    worker gathers whatever arrives within the coalescing window into one
+    send, drops duplicate events, and records the outcome: sent, or a retry at
+    an exponentially growing delay until NOTIFY_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, sinks: List[Sink], session_factory=AsyncSessionLocal):
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.session_factory = session_factory
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._in_flight: Set[int] = set()
+        self._poll_lock = asyncio.Lock()
+        # Polls started by wake(); held so they aren't garbage-collected mid-run
+        self._wake_tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls) -> "NotificationDispatcher":
+        return cls([build_sink(config) for config in settings.NOTIFY_SINKS])
+
+    @property
+    def sink_names(self) -> List[str]:
+        return list(self.sinks)
+
+    def _queue(self, sink_name: str) -> asyncio.Queue:
+        if sink_name not in self._queues:
+            self._queues[sink_name] = asyncio.Queue()
+        worker = self._workers.get(sink_name)
+        if worker is None or worker.done():
+            self._workers[sink_name] = asyncio.create_task(self._work(self.sinks[sink_name]))
+        return self._queues[sink_name]
+
+    async def poll(self) -> int:
+        """Queue every due outbox row that isn't already being delivered"""
+        if not self.sinks:
+            return 0
+
+        async with self._poll_lock:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(NotificationOutbox.id, NotificationOutbox.sink, NotificationOutbox.event)
+                    .where(
+                        NotificationOutbox.status == "pending",
+                        NotificationOutbox.next_attempt_at <= datetime.utcnow()
+                    )
+                    .order_by(NotificationOutbox.id)
+                    .limit(1000)
+                )
+                rows = result.all()
+
+            queued = 0
+            for row_id, sink_name, event in rows:
+                if row_id in self._in_flight:
+                    continue
+                if sink_name not in self.sinks:
+                    continue
+                self._in_flight.add(row_id)
+                self._queue(sink_name).put_nowait((row_id, json.loads(event)))
+                queued += 1
+            return queued
+
+    def wake(self):
+        """Deliver newly committed events soon, without waiting for them here"""
+        if self.sinks:
+            task = asyncio.create_task(self.poll())
+            self._wake_tasks.add(task)
+            task.add_done_callback(self._wake_done)
+
+    def _wake_done(self, task: asyncio.Task):
+        self._wake_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Notification outbox poll failed: {task.exception()}")
+
+    async def _work(self, sink: Sink):
+        queue = self._queues[sink.name]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + settings.NOTIFY_COALESCE_SECONDS
+            while len(batch) < settings.NOTIFY_MAX_BATCH:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            started = loop.time()
+            try:
+                await self._deliver(sink, batch)
+            except Exception as e:
+                logger.error(f"Notification sink {sink.name} bookkeeping failed: {e}")
+            finally:
+                self._in_flight.difference_update(row_id for row_id, _ in batch)
+
+            wait = sink.min_interval - (loop.time() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def _deliver(self, sink: Sink, batch: List[tuple[int, dict]]):
+        events = []
+        seen = set()
+        for _, event in batch:
+            key = event.get("dedup_key")
+            if key is not None and key in seen:
+                continue
+            seen.add(key)
+            events.append(event)
+
+        ids = [row_id for row_id, _ in batch]
+        error = None
+        try:
+            await asyncio.wait_for(sink.send(events), timeout=settings.NOTIFY_SEND_TIMEOUT * 2)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            if error is None:
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id.in_(ids))
+                    .values(status="sent", sent_at=now, attempts=NotificationOutbox.attempts + 1, last_error=None)
+                )
+                logger.info(f"Sent {len(events)} notification(s) to {sink.name}")
+            else:
+                result = await db.execute(select(NotificationOutbox).where(NotificationOutbox.id.in_(ids)))
+                for row in result.scalars().all():
+                    row.attempts += 1
+                    row.last_error = error[:1000]
+                    if row.attempts >= settings.NOTIFY_MAX_ATTEMPTS:
+                        row.status = "failed"
+                    else:
+                        row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts))
+                logger.warning(f"Notification sink {sink.name} failed ({error}); will retry {len(ids)} event(s)")
+            await db.commit()
+
+    async def stop(self):
+        tasks = list(self._wake_tasks) + list(self._workers.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._wake_tasks.clear()
+        self._workers.clear()
+        self._queues.clear()
+        self._in_flight.clear()
+
+dispatcher = NotificationDispatcher.from_settings()
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+
+from fastapi import Request, Response
+
+MAX_PAGE_SIZE = 1000
+
+class CursorError(ValueError):
+    pass
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque cursor for the keyset position (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise CursorError(f"Invalid cursor: {e}")
+
+def set_next_page(request: Request, response: Response, next_cursor: Optional[str]):
+    """Advertise the next page in X-Next-Cursor and a Link header; the body stays a plain list"""
+    if next_cursor is None:
+        return
+    response.headers["X-Next-Cursor"] = next_cursor
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
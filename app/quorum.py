@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from sqlalchemy import select, and_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AgentReport, HealthCheck
+
+logger = logging.getLogger(__name__)
+
+def quorum_status(
+    local_status: str,
+    votes: Iterable[tuple[str, str]],
+    required: int,
+    local_name: str = "local"
+) -> tuple[str, Optional[str]]:
+    """Combine this probe's status with the agents' votes.
+
+    votes is (agent, status) for every fresh remote report. Returns the status
+    to record and an explanation when the agents changed the outcome: down
+    needs `required` down votes (a majority when `required` is 0), fewer than
+    that is reported as degraded.
+    """
+    votes = [(local_name, local_status)] + list(votes)
+    down = [agent for agent, status in votes if status == "down"]
+    if required <= 0:
+        required = len(votes) // 2 + 1
+
+    if not down:
+        return local_status, None
+
+    summary = f"Down from {len(down)}/{len(votes)} probes: {', '.join(down)}"
+    if len(down) >= required:
+        return "down", summary if len(votes) > 1 else None
+
+    return "degraded", summary
+
+async def load_agent_votes(db: AsyncSession, service_ids: List[int]) -> Dict[int, List[tuple[str, str]]]:
+    """Fresh agent statuses for the given services, in one query"""
+    if not service_ids:
+        return {}
+
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.AGENT_REPORT_MAX_AGE)
+    result = await db.execute(
+        select(AgentReport.service_id, AgentReport.agent, AgentReport.status)
+        .where(
+            and_(
+                AgentReport.service_id.in_(service_ids),
+                AgentReport.timestamp >= cutoff,
+                AgentReport.agent != settings.AGENT_NAME
+            )
+        )
+    )
+
+    votes: Dict[int, List[tuple[str, str]]] = {}
+    for service_id, agent, status in result.all():
+        votes.setdefault(service_id, []).append((agent, status))
+    return votes
+
+def apply_quorum(check: HealthCheck, votes: List[tuple[str, str]]) -> HealthCheck:
+    status, summary = quorum_status(check.status, votes, settings.QUORUM_DOWN, settings.AGENT_NAME)
+
+    if status != check.status:
+        logger.info(f"Quorum changed service {check.service_id} from {check.status} to {status}: {summary}")
+        check.status = status
+    if summary:
+        check.error_message = f"{check.error_message}; {summary}" if check.error_message else summary
+
+    return check
+
+async def record_agent_results(db: AsyncSession, agent: str, results: List[dict]) -> int:
+    """Store the latest result per service for an agent; returns how many were applied.
+
+    Older results than the stored one are ignored, so retried or reordered
+    batches can't move a service's vote backwards.
+    """
+    latest: Dict[int, dict] = {}
+    for item in results:
+        current = latest.get(item["service_id"])
+        if current is None or item["timestamp"] > current["timestamp"]:
+            latest[item["service_id"]] = item
+
+    if not latest:
+        return 0
+
+    result = await db.execute(
+        select(AgentReport).where(
+            tuple_(AgentReport.service_id, AgentReport.agent).in_(
+                [(service_id, agent) for service_id in latest]
+            )
+        )
+    )
+    existing = {report.service_id: report for report in result.scalars().all()}
+
+    applied = 0
+    for service_id, item in latest.items():
+        report = existing.get(service_id)
+        if report is None:
+            report = AgentReport(service_id=service_id, agent=agent)
+            db.add(report)
+        elif report.timestamp >= item["timestamp"]:
+            continue
+
+        report.timestamp = item["timestamp"]
+        report.status = item["status"]
+        report.response_time = item.get("response_time")
+        report.status_code = item.get("status_code")
+        report.error_message = item.get("error_message")
+        applied += 1
+
+    return applied
@@ -0,0 +1,217 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import os
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import Service
+from adaptive_schedule import check_schedule
+from slo import slo_evaluator
+from domain_index import sync_service_domains
+from dependencies import DependencyError, resolve_upstreams
+from data_version import bump_data_versions, data_versions
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("name", "url", "check_type", "expected_status")
+
+def parse_max_body_bytes(service_config: dict):
+    value = service_config.get("max_body_bytes")
+    return int(value) if value not in (None, "") else None
+
+def parse_slo_target(service_config: dict):
+    value = service_config.get("slo_target")
+    return float(value) if value not in (None, "") else None
+
+# Service column -> how to read it from a config entry
+SERVICE_FIELDS = {
+    "name": lambda c: c["name"],
+    "check_type": lambda c: c["check_type"],
+    "expected_status": lambda c: c["expected_status"],
+    "domains": lambda c: c.get("domains"),
+    "probe_mode": lambda c: c.get("probe_mode"),
+    "max_body_bytes": parse_max_body_bytes,
+    "slo_target": parse_slo_target,
+    "group_name": lambda c: c.get("group"),
+    "depends_on": lambda c: c.get("depends_on"),
+}
+
+class ServiceConfigError(ValueError):
+    pass
+
+def load_service_config() -> List[dict]:
+    """Configured services: SERVICES_FILE (JSON list) if set, else settings.SERVICES"""
+    if settings.SERVICES_FILE:
+        try:
+            configs = json.loads(Path(settings.SERVICES_FILE).read_text())
+        except (OSError, ValueError) as e:
+            raise ServiceConfigError(f"Could not read {settings.SERVICES_FILE}: {e}")
+    else:
+        configs = settings.SERVICES
+
+    if not isinstance(configs, list):
+        raise ServiceConfigError("Service config must be a list")
+
+    urls = set()
+    names = set()
+    for config in configs:
+        missing = [field for field in REQUIRED_FIELDS if not isinstance(config, dict) or field not in config]
+        if missing:
+            raise ServiceConfigError(f"Service config {config!r} is missing {', '.join(missing)}")
+        if config["url"] in urls:
+            raise ServiceConfigError(f"Duplicate service URL {config['url']}")
+        urls.add(config["url"])
+        if config["name"] in names:
+            raise ServiceConfigError(f"Duplicate service name {config['name']}")
+        names.add(config["name"])
+
+        try:
+            slo_target = parse_slo_target(config)
+        except ValueError:
+            slo_target = -1
+        if slo_target is not None and not 0 < slo_target < 100:
+            raise ServiceConfigError(f"slo_target for {config['url']} must be a percentage between 0 and 100")
+
+    try:
+        resolve_upstreams((c["url"], c["name"], c["url"], c.get("depends_on")) for c in configs)
+    except DependencyError as e:
+        raise ServiceConfigError(str(e))
+
+    return configs
+
+def diff_services(existing: List[Service], configs: List[dict]) -> tuple[List[dict], List[tuple[Service, Dict]], List[Service]]:
+    """Compare DB services to config, matched by URL, then by name.
+
+    A config entry whose URL matches no service takes over the unmatched
+    service with its name, so changing a service's URL updates it in place
+    instead of inserting a second row with the same (unique) name.
+
+    Returns (configs to add, [(service, {column: new value})] to update,
+    services to disable). Re-enabling a service counts as an update.
+    """
+    by_url = {service.url: service for service in existing}
+
+    matched = []
+    unmatched = []
+    for config in configs:
+        service = by_url.pop(config["url"], None)
+        if service is None:
+            unmatched.append(config)
+        else:
+            matched.append((config, service))
+
+    by_name = {service.name: service for service in by_url.values()}
+    to_add = []
+    for config in unmatched:
+        service = by_name.pop(config["name"], None)
+        if service is None:
+            to_add.append(config)
+        else:
+            del by_url[service.url]
+            matched.append((config, service))
+
+    to_update = []
+    for config, service in matched:
+        changes = {}
+        if service.url != config["url"]:
+            changes["url"] = config["url"]
+        for column, read in SERVICE_FIELDS.items():
+            value = read(config)
+            if getattr(service, column) != value:
+                changes[column] = value
+        if not service.enabled:
+            changes["enabled"] = True
+        if changes:
+            to_update.append((service, changes))
+
+    to_disable = [service for service in by_url.values() if service.enabled]
+
+    return to_add, to_update, to_disable
+
+async def reconcile_services(db: AsyncSession, configs: Optional[List[dict]] = None) -> Dict[str, int]:
+    """Apply the configured service set to the database in one transaction.
+
+    Loads every service with a single query, then applies the diff. Services
+    keep their ids across updates, so the adaptive schedule and history carry
+    over and a running sweep simply sees the new set on its next tick.
+    """
+    if configs is None:
+        configs = load_service_config()
+
+    result = await db.execute(select(Service))
+    to_add, to_update, to_disable = diff_services(result.scalars().all(), configs)
+
+    db.add_all([
+        Service(
+            url=config["url"],
+            enabled=True,
+            **{column: read(config) for column, read in SERVICE_FIELDS.items()}
+        )
+        for config in to_add
+    ])
+
+    for service, changes in to_update:
+        if "name" in changes:
+            logger.info(f"Updated service name: '{service.name}' -> '{changes['name']}'")
+        for column, value in changes.items():
+            setattr(service, column, value)
+        logger.info(f"Updated service: {service.name} ({', '.join(changes)})")
+
+    for service in to_disable:
+        service.enabled = False
+        check_schedule.forget(service.id)
+        slo_evaluator.forget(service.id)
+        logger.info(f"Disabled service no longer in config: {service.name}")
+
+    for config in to_add:
+        logger.info(f"Added service: {config['name']}")
+
+    await db.flush()
+    await sync_service_domains(db)
+    await bump_data_versions(db, [service.id for service, _ in to_update] + [service.id for service in to_disable])
+    await db.commit()
+    data_versions.invalidate()
+
+    return {"added": len(to_add), "updated": len(to_update), "disabled": len(to_disable)}
+
+class ServicesFileWatcher:
+    """Reconciles when SERVICES_FILE's modification time changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._last_mtime: Optional[float] = None
+
+    def changed(self) -> Optional[float]:
+        """The file's new modification time, or None if unchanged"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        if mtime == self._last_mtime:
+            return None
+        return mtime
+
+    async def check(self, session_factory):
+        mtime = self.changed()
+        if mtime is None:
+            return None
+
+        # The mtime is only recorded once the reload is applied, so a failed
+        # one is retried on the next check rather than silently dropped
+        try:
+            async with session_factory() as db:
+                summary = await reconcile_services(db)
+        except ServiceConfigError as e:
+            logger.error(f"Not reloading services: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error reloading services from {self.path}: {e}")
+            return None
+
+        self._last_mtime = mtime
+        logger.info(f"Reloaded services from {self.path}: {summary}")
+        return summary
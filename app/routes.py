@@ -1,11 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, func, and_, desc
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from sqlalchemy import select, func, and_, or_, desc, case, insert, tuple_
+from sqlalchemy.orm import aliased
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Literal, Optional
 from pydantic import BaseModel
-
-from database import get_db, Service, HealthCheck, Incident
+import secrets
+
+from config import settings
+from database import get_db, Service, HealthCheck, Incident, IngestBatch, SloAlert
+from ingest import decode_batch, validate_batch, IngestFormatError, UnsupportedFormatError
+from domain_index import domain_index
+from quorum import record_agent_results
+from reconcile import reconcile_services, ServiceConfigError
+from fast_json import fast_response
+from pagination import MAX_PAGE_SIZE, CursorError, decode_cursor, encode_cursor, set_next_page
+from data_version import bump_data_versions, data_versions, etag_matches
+from incident_rollup import IncidentWindow
+from latency_sketch import load_latency_sketch, parse_percentiles, record_latencies
 
 router = APIRouter()
 
@@ -24,6 +37,12 @@ class ServiceStatus(BaseModel):
     class Config:
         from_attributes = True
 
+SERVICE_STATUS_COLUMNS = tuple(ServiceStatus.model_fields)
+
+# "model" validates through the response models; "fast" encodes plain rows;
+# "columnar" encodes parallel arrays, one per field
+ResponseFormat = Literal["model", "fast", "columnar"]
+
 class HealthCheckResponse(BaseModel):
     id: int
     service_id: int
@@ -36,6 +55,8 @@ class HealthCheckResponse(BaseModel):
     class Config:
         from_attributes = True
 
+HEALTH_CHECK_COLUMNS = tuple(HealthCheckResponse.model_fields)
+
 class IncidentResponse(BaseModel):
     id: int
     service_id: int
@@ -45,6 +66,8 @@ class IncidentResponse(BaseModel):
     duration: Optional[int]
     status: str
     description: Optional[str]
+    # The incident this outage was rolled into, when an upstream or group peer failed first
+    root_incident_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -56,210 +79,662 @@ class UptimeStats(BaseModel):
     successful_checks: int
     failed_checks: int
     average_response_time: Optional[float]
+    # "p50" -> response time in ms, from the latency sketches
+    percentiles: Dict[str, Optional[float]] = {}
 
-async def calculate_uptime(db: AsyncSession, service_id: int, hours: int) -> float:
-    start_time = datetime.utcnow() - timedelta(hours=hours)
+class ReliabilityStats(BaseModel):
+    period: str
+    incidents: int
+    resolved: int
+    downtime_seconds: int
+    mttr_seconds: Optional[float]
+    mtbf_seconds: Optional[float]
+
+class DowntimeDay(BaseModel):
+    date: date
+    downtime_minutes: float
+    incidents: int
+
+class SlaBudget(BaseModel):
+    period: str
+    target: float
+    budget_seconds: float
+    downtime_seconds: int
+    budget_remaining_seconds: float
+    budget_consumed_pct: Optional[float]
+    burn_rate: Optional[float]
 
-    result = await db.execute(
-        select(func.count(HealthCheck.id))
-        .where(
-            and_(
-                HealthCheck.service_id == service_id,
-                HealthCheck.timestamp >= start_time
-            )
-        )
-    )
-    total_checks = result.scalar_one()
+MAX_ROLLUP_DAYS = 366
+
+class SloAlertResponse(BaseModel):
+    id: int
+    service_id: int
+    timestamp: datetime
+    severity: str
+    rule: str
+    state: str
+    burn_rate: float
+    threshold: float
+    slo_target: float
 
-    if total_checks == 0:
-        return 100.0
+    class Config:
+        from_attributes = True
 
+class ServiceStats(BaseModel):
+    service_id: int
+    # "24h" -> stats for that window
+    windows: Dict[str, UptimeStats]
+
+MAX_BATCH_WINDOWS = 10
+
+def count_covered_checks(
+    check_times: List[datetime],
+    intervals: List[tuple[datetime, datetime]],
+    weights: Optional[List[float]] = None
+) -> float:
+    """Count (check, interval) pairs where the check falls inside the closed interval.
+
+    Both inputs must be sorted (intervals by start). A check covered by two
+    overlapping intervals counts twice, matching a per-interval COUNT. With
+    weights, each pair adds its check's weight instead of 1. Runs as a single
+    merge over checks, starts and ends.
+    """
+    starts = [start for start, _ in intervals]
+    ends = sorted(end for _, end in intervals)
+
+    covered = 0
+    started = 0
+    ended = 0
+    for i, timestamp in enumerate(check_times):
+        while started < len(starts) and starts[started] <= timestamp:
+            started += 1
+        while ended < len(ends) and ends[ended] < timestamp:
+            ended += 1
+        covered += (started - ended) * (1 if weights is None else weights[i])
+
+    return covered
+
+def check_seconds():
+    """How long each check's result stands for, for time-weighted uptime.
+
+    A check covers the interval until the next scheduled probe. With adaptive
+    scheduling a failing service is probed more often than a healthy one, so
+    counting checks would weigh failures more than the time they lasted.
+    """
+    return func.coalesce(HealthCheck.interval_seconds, settings.CHECK_INTERVAL)
+
+class AgentServiceDefinition(BaseModel):
+    id: int
+    name: str
+    url: str
+    check_type: str
+    expected_status: str
+    probe_mode: Optional[str]
+    max_body_bytes: Optional[int]
+
+    class Config:
+        from_attributes = True
+
+class AgentResult(BaseModel):
+    service_id: int
+    timestamp: datetime
+    status: Literal["up", "degraded", "down"]
+    response_time: Optional[float] = None
+    status_code: Optional[int] = None
+    error_message: Optional[str] = None
+
+class AgentResultBatch(BaseModel):
+    results: List[AgentResult]
+
+class AgentIngestResponse(BaseModel):
+    accepted: int
+    applied: int
+
+class IngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    duplicate: bool = False
+    errors: List[dict] = []
+
+async def require_agent_token(x_agent_token: Optional[str] = Header(default=None)):
+    if not settings.AGENT_TOKEN:
+        raise HTTPException(status_code=403, detail="Agent ingest is disabled")
+    if not x_agent_token or not secrets.compare_digest(x_agent_token, settings.AGENT_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+async def calculate_uptimes(
+    db: AsyncSession,
+    service_ids: List[int],
+    windows: List[int]
+) -> Dict[tuple[int, int], float]:
+    """(service_id, hours) -> time-weighted uptime %, with outages under a minute forgiven.
+
+    Three queries whatever the number of services and windows: one grouped
+    aggregate over the checks, then the short incidents and the failed checks
+    they cover. Services without checks in a window are 100% up.
+    """
+    now = datetime.utcnow()
+    starts = {hours: now - timedelta(hours=hours) for hours in windows}
+    earliest = min(starts.values())
+    seconds = check_seconds()
+
+    columns = []
+    for start in starts.values():
+        in_window = HealthCheck.timestamp >= start
+        columns += [
+            func.count(case((in_window, 1))),
+            func.sum(case((in_window, seconds), else_=0)),
+            func.sum(case((and_(in_window, HealthCheck.status == "up"), seconds), else_=0))
+        ]
     result = await db.execute(
-        select(func.count(HealthCheck.id))
+        select(HealthCheck.service_id, *columns)
         .where(
             and_(
-                HealthCheck.service_id == service_id,
-                HealthCheck.timestamp >= start_time,
-                HealthCheck.status == "up"
+                HealthCheck.service_id.in_(service_ids),
+                HealthCheck.timestamp >= earliest
             )
         )
+        .group_by(HealthCheck.service_id)
     )
-    up_checks = result.scalar_one()
+    totals = {row[0]: row[1:] for row in result.all()}
 
+    # Outages shorter than a minute don't count against uptime
     result = await db.execute(
-        select(Incident)
+        select(Incident.service_id, Incident.started_at, Incident.ended_at)
         .where(
             and_(
-                Incident.service_id == service_id,
-                Incident.started_at >= start_time,
+                Incident.service_id.in_(list(totals)),
+                Incident.started_at >= earliest,
                 Incident.status == "resolved",
                 Incident.duration.isnot(None),
-                Incident.duration < 60
+                Incident.duration < 60,
+                Incident.ended_at.isnot(None)
             )
         )
+        .order_by(Incident.service_id, Incident.started_at)
     )
-    short_incidents = result.scalars().all()
-
-    short_outage_checks = 0
-    for incident in short_incidents:
-        if incident.ended_at:
-            result = await db.execute(
-                select(func.count(HealthCheck.id))
-                .where(
-                    and_(
-                        HealthCheck.service_id == service_id,
-                        HealthCheck.timestamp >= incident.started_at,
-                        HealthCheck.timestamp <= incident.ended_at,
-                        HealthCheck.status != "up"
-                    )
+    short_incidents: Dict[int, list] = {}
+    for service_id, started_at, ended_at in result.all():
+        short_incidents.setdefault(service_id, []).append((started_at, ended_at))
+
+    outage_checks: Dict[int, list] = {}
+    if short_incidents:
+        result = await db.execute(
+            select(HealthCheck.service_id, HealthCheck.timestamp, seconds)
+            .where(
+                and_(
+                    HealthCheck.status != "up",
+                    or_(*(
+                        and_(
+                            HealthCheck.service_id == service_id,
+                            HealthCheck.timestamp >= incidents[0][0],
+                            HealthCheck.timestamp <= max(ended_at for _, ended_at in incidents)
+                        )
+                        for service_id, incidents in short_incidents.items()
+                    ))
                 )
             )
-            short_outage_checks += result.scalar_one()
+            .order_by(HealthCheck.service_id, HealthCheck.timestamp)
+        )
+        for service_id, timestamp, weight in result.all():
+            outage_checks.setdefault(service_id, []).append((timestamp, weight))
+
+    uptimes = {}
+    for service_id in service_ids:
+        row = totals.get(service_id)
+        for i, (hours, start) in enumerate(starts.items()):
+            total_checks, total_seconds, up_seconds = row[i * 3:i * 3 + 3] if row else (0, 0, 0)
+            if total_checks == 0 or not total_seconds:
+                uptimes[(service_id, hours)] = 100.0
+                continue
 
-    adjusted_up_checks = up_checks + short_outage_checks
+            short_outage_seconds = 0
+            incidents = [incident for incident in short_incidents.get(service_id, []) if incident[0] >= start]
+            if incidents:
+                checks = outage_checks.get(service_id, [])
+                short_outage_seconds = count_covered_checks(
+                    [timestamp for timestamp, _ in checks],
+                    incidents,
+                    [weight for _, weight in checks]
+                )
+            uptimes[(service_id, hours)] = (up_seconds + short_outage_seconds) / total_seconds * 100
+    return uptimes
 
-    return (adjusted_up_checks / total_checks) * 100 if total_checks > 0 else 100.0
+async def calculate_uptime(db: AsyncSession, service_id: int, hours: int) -> float:
+    uptimes = await calculate_uptimes(db, [service_id], [hours])
+    return uptimes[(service_id, hours)]
+
+async def window_check_stats(
+    db: AsyncSession,
+    service_ids: List[int],
+    windows: List[int]
+) -> Dict[tuple[int, int], tuple[int, int, Optional[float]]]:
+    """(service_id, hours) -> (total checks, up checks, average response time, uptime %).
+
+    One query for every service and window: rows are scanned once back to the
+    widest window and each window is a conditional aggregate over them. Uptime
+    is time-weighted (see check_seconds); it is None when there are no checks.
+    """
+    now = datetime.utcnow()
+    starts = {hours: now - timedelta(hours=hours) for hours in windows}
+    seconds = check_seconds()
+
+    columns = []
+    for hours, start in starts.items():
+        in_window = HealthCheck.timestamp >= start
+        columns += [
+            func.count(case((in_window, 1))),
+            func.count(case((and_(in_window, HealthCheck.status == "up"), 1))),
+            func.avg(case((in_window, HealthCheck.response_time))),
+            func.sum(case((in_window, seconds), else_=0)),
+            func.sum(case((and_(in_window, HealthCheck.status == "up"), seconds), else_=0))
+        ]
 
-@router.get("/services", response_model=List[ServiceStatus])
-async def get_services(domain: Optional[str] = None, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Service))
-    services = result.scalars().all()
-
-    service_statuses = []
-    for service in services:
-        if domain and service.domains:
-            service_domains = [d.strip() for d in service.domains.split(',')]
-            if domain not in service_domains:
+    result = await db.execute(
+        select(HealthCheck.service_id, *columns)
+        .where(
+            and_(
+                HealthCheck.service_id.in_(service_ids),
+                HealthCheck.timestamp >= min(starts.values())
+            )
+        )
+        .group_by(HealthCheck.service_id)
+    )
+    rows = {row[0]: row[1:] for row in result.all()}
+
+    stats = {}
+    for service_id in service_ids:
+        row = rows.get(service_id)
+        for i, hours in enumerate(starts):
+            if row is None:
+                stats[(service_id, hours)] = (0, 0, None, None)
+            else:
+                total, up, avg, total_seconds, up_seconds = row[i * 5:i * 5 + 5]
+                uptime = up_seconds / total_seconds * 100 if total_seconds else None
+                stats[(service_id, hours)] = (total, up, avg, uptime)
+    return stats
+
+def uptime_stats(
+    hours: int,
+    total_checks: int,
+    successful_checks: int,
+    average_response_time: Optional[float],
+    uptime_percentage: Optional[float] = None,
+    percentiles: Optional[Dict[str, Optional[float]]] = None
+) -> UptimeStats:
+    if uptime_percentage is None:
+        uptime_percentage = (successful_checks / total_checks * 100) if total_checks > 0 else 100.0
+    return UptimeStats(
+        period=f"{hours}h",
+        uptime_percentage=uptime_percentage,
+        total_checks=total_checks,
+        successful_checks=successful_checks,
+        failed_checks=total_checks - successful_checks,
+        average_response_time=average_response_time,
+        percentiles=percentiles or {}
+    )
+
+def accepted_encodings(accept_encoding: Optional[str]) -> str:
+    """The response compressions (br, gzip) an Accept-Encoding header allows, e.g. "br,gzip" """
+    accepted = set()
+    for coding in (accept_encoding or "").lower().split(","):
+        name, _, params = coding.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if quality and float(quality) == 0:
                 continue
+        except ValueError:
+            pass
+        accepted.add(name.strip())
+    return ",".join(coding for coding in ("br", "gzip") if coding in accepted or "*" in accepted)
+
+async def check_etag(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    service_ids: Optional[Iterable[int]] = None
+) -> Optional[Response]:
+    """Tag the response with the data version of ``service_ids`` (all when None).
+
+    Returns a 304 to send instead when If-None-Match already has that tag; the
+    tag comes from the in-memory version map, so this runs no query. The
+    compression middleware encodes the body per Accept-Encoding, so the
+    accepted encodings are part of the tag: a gzip and a brotli body never
+    share one strong ETag.
+    """
+    key = f"{request.url.path}?{request.url.query}#{accepted_encodings(request.headers.get('accept-encoding'))}"
+    etag = await data_versions.etag(db, key, service_ids)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
-        latest_check_result = await db.execute(
-            select(HealthCheck)
-            .where(HealthCheck.service_id == service.id)
-            .order_by(desc(HealthCheck.timestamp))
-            .limit(1)
+@router.get("/services", response_model=List[ServiceStatus])
+async def get_services(
+    request: Request,
+    response: Response,
+    domain: Optional[str] = None,
+    format: ResponseFormat = "model",
+    db: AsyncSession = Depends(get_db)
+):
+    domain_service_ids = await domain_index.service_ids(db, domain) if domain else None
+    not_modified = await check_etag(request, response, db, domain_service_ids)
+    if not_modified:
+        return not_modified
+
+    # The newest check of each service, found through its (service_id, timestamp, id) index
+    latest = aliased(HealthCheck)
+    latest_check_id = (
+        select(latest.id)
+        .where(latest.service_id == Service.id)
+        .order_by(desc(latest.timestamp), desc(latest.id))
+        .limit(1)
+        .correlate(Service)
+        .scalar_subquery()
+    )
+    # Services removed from the config are disabled, not deleted; keep them off the list
+    query = (
+        select(
+            Service.id,
+            Service.name,
+            Service.domains,
+            HealthCheck.status,
+            HealthCheck.response_time,
+            HealthCheck.timestamp
         )
-        latest_check = latest_check_result.scalar_one_or_none()
+        .outerjoin(HealthCheck, HealthCheck.id == latest_check_id)
+        .where(Service.enabled == True)
+    )
+    if domain:
+        query = query.where(Service.id.in_(domain_service_ids))
+    result = await db.execute(query.order_by(Service.id))
+    services = result.all()
+    service_ids = [service.id for service in services]
 
-        incident_result = await db.execute(
-            select(Incident)
-            .where(
-                and_(
-                    Incident.service_id == service.id,
-                    Incident.status == "ongoing"
-                )
+    result = await db.execute(
+        select(Incident.service_id, Incident.id, Incident.started_at, Incident.description)
+        .where(
+            and_(
+                Incident.service_id.in_(service_ids),
+                Incident.status == "ongoing"
             )
-            .order_by(desc(Incident.started_at))
-            .limit(1)
         )
-        current_incident = incident_result.scalar_one_or_none()
-
-        uptime_24h = await calculate_uptime(db, service.id, 24)
-        uptime_7d = await calculate_uptime(db, service.id, 168)
-        uptime_30d = await calculate_uptime(db, service.id, 720)
-
-        service_status = ServiceStatus(
-            id=service.id,
-            name=service.name,
-            status=latest_check.status if latest_check else "unknown",
-            response_time=latest_check.response_time if latest_check else None,
-            uptime_24h=uptime_24h,
-            uptime_7d=uptime_7d,
-            uptime_30d=uptime_30d,
-            last_check=latest_check.timestamp if latest_check else None,
-            current_incident={
-                "id": current_incident.id,
-                "started_at": current_incident.started_at.isoformat(),
-                "description": current_incident.description
-            } if current_incident else None,
-            domains=service.domains
+        .order_by(Incident.started_at)
+    )
+    # Later rows win, so each service keeps its most recent ongoing incident
+    current_incidents = {
+        service_id: {"id": incident_id, "started_at": started_at.isoformat(), "description": description}
+        for service_id, incident_id, started_at, description in result.all()
+    }
+
+    uptimes = await calculate_uptimes(db, service_ids, [24, 168, 720]) if service_ids else {}
+
+    rows = [
+        (
+            service_id,
+            name,
+            status or "unknown",
+            response_time,
+            uptimes[(service_id, 24)],
+            uptimes[(service_id, 168)],
+            uptimes[(service_id, 720)],
+            last_check,
+            current_incidents.get(service_id),
+            domains
         )
-        service_statuses.append(service_status)
-
-    return service_statuses
+        for service_id, name, domains, status, response_time, last_check in services
+    ]
+
+    if format != "model":
+        return fast_response(
+            SERVICE_STATUS_COLUMNS,
+            rows,
+            columnar=format == "columnar",
+            headers=response.headers
+        )
+    return [ServiceStatus(**dict(zip(SERVICE_STATUS_COLUMNS, row))) for row in rows]
 
 @router.get("/services/{service_id}/history", response_model=List[HealthCheckResponse])
 async def get_service_history(
+    request: Request,
+    response: Response,
     service_id: int,
     hours: int = 24,
+    format: ResponseFormat = "model",
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
+    """Checks newest first. With ``limit``, pages are walked by passing back
+    the X-Next-Cursor header as ``cursor``; each page is one index range scan."""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    not_modified = await check_etag(request, response, db, [service_id])
+    if not_modified:
+        return not_modified
+
     start_time = datetime.utcnow() - timedelta(hours=hours)
 
-    result = await db.execute(
-        select(HealthCheck)
-        .where(
-            and_(
-                HealthCheck.service_id == service_id,
-                HealthCheck.timestamp >= start_time
-            )
-        )
-        .order_by(desc(HealthCheck.timestamp))
-    )
-    checks = result.scalars().all()
+    conditions = [
+        HealthCheck.service_id == service_id,
+        HealthCheck.timestamp >= start_time
+    ]
+    if after:
+        conditions.append(tuple_(HealthCheck.timestamp, HealthCheck.id) < after)
+
+    if format != "model":
+        # Plain column tuples straight to JSON bytes: no ORM objects, no model validation
+        query = select(*(getattr(HealthCheck, column) for column in HEALTH_CHECK_COLUMNS))
+    else:
+        query = select(HealthCheck)
+    query = query.where(and_(*conditions)).order_by(desc(HealthCheck.timestamp), desc(HealthCheck.id))
+    if limit:
+        query = query.limit(limit + 1)
 
+    result = await db.execute(query)
+    checks = result.all() if format != "model" else result.scalars().all()
+
+    next_cursor = None
+    if limit and len(checks) > limit:
+        checks = checks[:limit]
+        next_cursor = encode_cursor(checks[-1].timestamp, checks[-1].id)
+    set_next_page(request, response, next_cursor)
+
+    if format != "model":
+        return fast_response(
+            HEALTH_CHECK_COLUMNS,
+            checks,
+            columnar=format == "columnar",
+            headers=response.headers
+        )
     return checks
 
 @router.get("/services/{service_id}/stats", response_model=UptimeStats)
 async def get_service_stats(
+    request: Request,
+    response: Response,
     service_id: int,
     hours: int = 24,
+    percentiles: str = "50,95,99",
     db: AsyncSession = Depends(get_db)
 ):
+    try:
+        quantiles = parse_percentiles(percentiles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    not_modified = await check_etag(request, response, db, [service_id])
+    if not_modified:
+        return not_modified
+
     start_time = datetime.utcnow() - timedelta(hours=hours)
 
-    result = await db.execute(
-        select(func.count(HealthCheck.id))
-        .where(
-            and_(
-                HealthCheck.service_id == service_id,
-                HealthCheck.timestamp >= start_time
-            )
-        )
-    )
-    total_checks = result.scalar_one()
+    stats = await window_check_stats(db, [service_id], [hours])
 
-    result = await db.execute(
-        select(func.count(HealthCheck.id))
-        .where(
-            and_(
-                HealthCheck.service_id == service_id,
-                HealthCheck.timestamp >= start_time,
-                HealthCheck.status == "up"
-            )
-        )
+    # Merges one sketch per bucket rather than scanning the window's rows; the
+    # window is widened to the start of its first bucket
+    sketch = await load_latency_sketch(db, service_id, start_time)
+
+    return uptime_stats(
+        hours,
+        *stats[(service_id, hours)],
+        percentiles={f"p{q:g}": sketch.quantile(q / 100) for q in quantiles}
     )
-    successful_checks = result.scalar_one()
 
-    result = await db.execute(
-        select(func.avg(HealthCheck.response_time))
-        .where(
-            and_(
-                HealthCheck.service_id == service_id,
-                HealthCheck.timestamp >= start_time,
-                HealthCheck.response_time.isnot(None)
-            )
+@router.get("/stats", response_model=List[ServiceStats])
+async def get_batch_stats(
+    request: Request,
+    response: Response,
+    ids: Optional[str] = None,
+    hours: List[int] = Query(default=[24]),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stats for many services and windows from one grouped query.
+
+    ``ids`` is a comma-separated list (all services when omitted); repeat
+    ``hours`` for more windows, e.g. ``?ids=1,2&hours=24&hours=168``.
+    """
+    if not 0 < len(hours) <= MAX_BATCH_WINDOWS or any(h <= 0 for h in hours):
+        raise HTTPException(status_code=400, detail=f"Give 1-{MAX_BATCH_WINDOWS} positive hours windows")
+    windows = list(dict.fromkeys(hours))
+
+    if ids:
+        try:
+            service_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    else:
+        service_ids = None
+
+    not_modified = await check_etag(request, response, db, service_ids)
+    if not_modified:
+        return not_modified
+
+    if service_ids is None:
+        result = await db.execute(select(Service.id).where(Service.enabled == True).order_by(Service.id))
+        service_ids = result.scalars().all()
+
+    if not service_ids:
+        return []
+
+    stats = await window_check_stats(db, service_ids, windows)
+
+    return [
+        ServiceStats(
+            service_id=service_id,
+            windows={f"{window}h": uptime_stats(window, *stats[(service_id, window)]) for window in windows}
         )
-    )
-    avg_response_time = result.scalar_one()
+        for service_id in service_ids
+    ]
 
-    uptime_percentage = (successful_checks / total_checks * 100) if total_checks > 0 else 100.0
+async def load_incident_window(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    service_id: int,
+    days: int
+):
+    """Rollups for the analytics endpoints; a 304 response when the client's copy is current"""
+    if not 0 < days <= MAX_ROLLUP_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_ROLLUP_DAYS}")
+
+    not_modified = await check_etag(request, response, db, [service_id])
+    if not_modified:
+        return not_modified
+    return await IncidentWindow.load(db, service_id, days)
+
+@router.get("/services/{service_id}/reliability", response_model=ReliabilityStats)
+async def get_service_reliability(
+    request: Request,
+    response: Response,
+    service_id: int,
+    days: int = 30,
+    db: AsyncSession = Depends(get_db)
+):
+    """MTTR and MTBF from the daily incident rollups"""
+    window = await load_incident_window(request, response, db, service_id, days)
+    if isinstance(window, Response):
+        return window
+    return ReliabilityStats(**window.reliability())
+
+@router.get("/services/{service_id}/downtime-calendar", response_model=List[DowntimeDay])
+async def get_downtime_calendar(
+    request: Request,
+    response: Response,
+    service_id: int,
+    days: int = 90,
+    db: AsyncSession = Depends(get_db)
+):
+    """Downtime minutes and incidents per UTC day, oldest first"""
+    window = await load_incident_window(request, response, db, service_id, days)
+    if isinstance(window, Response):
+        return window
+    return [DowntimeDay(**day) for day in window.calendar()]
+
+@router.get("/services/{service_id}/sla-budget", response_model=SlaBudget)
+async def get_sla_budget(
+    request: Request,
+    response: Response,
+    service_id: int,
+    days: int = 30,
+    target: float = Query(default=99.9, gt=0, lt=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Error budget spent against an availability target over the window"""
+    window = await load_incident_window(request, response, db, service_id, days)
+    if isinstance(window, Response):
+        return window
+    return SlaBudget(**window.sla_budget(target))
+
+@router.get("/slo/alerts", response_model=List[SloAlertResponse])
+async def get_slo_alerts(
+    request: Request,
+    response: Response,
+    service_id: Optional[int] = None,
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """Burn-rate alerts starting ("firing") and stopping ("resolved"), newest first"""
+    not_modified = await check_etag(request, response, db, [service_id] if service_id else None)
+    if not_modified:
+        return not_modified
 
-    return UptimeStats(
-        period=f"{hours}h",
-        uptime_percentage=uptime_percentage,
-        total_checks=total_checks,
-        successful_checks=successful_checks,
-        failed_checks=total_checks - successful_checks,
-        average_response_time=avg_response_time
-    )
+    query = select(SloAlert)
+    if service_id:
+        query = query.where(SloAlert.service_id == service_id)
+    result = await db.execute(query.order_by(desc(SloAlert.timestamp), desc(SloAlert.id)).limit(limit))
+    return result.scalars().all()
 
 @router.get("/incidents", response_model=List[IncidentResponse])
 async def get_incidents(
-    limit: int = 50,
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
     ongoing_only: bool = False,
+    roots_only: bool = False,
     days: int = 30,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    not_modified = await check_etag(request, response, db)
+    if not_modified:
+        return not_modified
+
     start_time = datetime.utcnow() - timedelta(days=days)
 
     query = select(Incident, Service.name).join(Service)
@@ -267,13 +742,26 @@ async def get_incidents(
     if ongoing_only:
         query = query.where(Incident.status == "ongoing")
 
+    if roots_only:
+        query = query.where(Incident.root_incident_id.is_(None))
+
     query = query.where(Incident.started_at >= start_time)
 
-    query = query.order_by(desc(Incident.started_at)).limit(limit)
+    if after:
+        query = query.where(tuple_(Incident.started_at, Incident.id) < after)
+
+    query = query.order_by(desc(Incident.started_at), desc(Incident.id)).limit(limit + 1)
 
     result = await db.execute(query)
     incidents_with_names = result.all()
 
+    next_cursor = None
+    if len(incidents_with_names) > limit:
+        incidents_with_names = incidents_with_names[:limit]
+        last = incidents_with_names[-1].Incident
+        next_cursor = encode_cursor(last.started_at, last.id)
+    set_next_page(request, response, next_cursor)
+
     return [
         IncidentResponse(
             id=incident.id,
@@ -283,7 +771,106 @@ async def get_incidents(
             ended_at=incident.ended_at,
             duration=incident.duration,
             status=incident.status,
-            description=incident.description
+            description=incident.description,
+            root_incident_id=incident.root_incident_id
         )
         for incident, service_name in incidents_with_names
-    ]
\ No newline at end of file
+    ]
+
+@router.get(
+    "/agents/services",
+    response_model=List[AgentServiceDefinition],
+    dependencies=[Depends(require_agent_token)]
+)
+async def get_agent_services(db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Service).where(Service.enabled == True))
+    return result.scalars().all()
+
+@router.post(
+    "/agents/{agent}/results",
+    response_model=AgentIngestResponse,
+    dependencies=[Depends(require_agent_token)]
+)
+async def post_agent_results(agent: str, batch: AgentResultBatch, db: AsyncSession = Depends(get_db)):
+    if agent == settings.AGENT_NAME:
+        raise HTTPException(status_code=400, detail=f"Agent name '{agent}' is reserved for this instance")
+
+    result = await db.execute(select(Service.id).where(Service.enabled == True))
+    known_ids = set(result.scalars().all())
+
+    results = []
+    for item in batch.results:
+        if item.service_id not in known_ids:
+            continue
+        data = item.model_dump()
+        if item.timestamp.tzinfo is not None:
+            data["timestamp"] = item.timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        results.append(data)
+
+    applied = await record_agent_results(db, agent, results)
+    await db.commit()
+
+    return AgentIngestResponse(accepted=len(results), applied=applied)
+
+@router.post(
+    "/ingest/checks",
+    response_model=IngestResponse,
+    dependencies=[Depends(require_agent_token)]
+)
+async def ingest_checks(
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_db)
+):
+    if idempotency_key:
+        previous = await db.get(IngestBatch, idempotency_key)
+        if previous:
+            return IngestResponse(accepted=previous.accepted, rejected=previous.rejected, duplicate=True)
+
+    result = await db.execute(select(Service.id))
+    service_ids = set(result.scalars().all())
+
+    body = await request.body()
+    try:
+        rows, rejected, errors = validate_batch(
+            decode_batch(body, request.headers.get("content-type")),
+            service_ids,
+            settings.INGEST_MAX_ROWS
+        )
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except IngestFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Core executemany insert: one statement and one transaction for the whole batch
+    if rows:
+        await db.execute(insert(HealthCheck.__table__), rows)
+        await record_latencies(db, [(row["service_id"], row["timestamp"], row["response_time"]) for row in rows])
+        await bump_data_versions(db, {row["service_id"] for row in rows})
+    if idempotency_key:
+        db.add(IngestBatch(
+            key=idempotency_key,
+            received_at=datetime.utcnow(),
+            accepted=len(rows),
+            rejected=rejected
+        ))
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request with the same key won the race
+        await db.rollback()
+        previous = await db.get(IngestBatch, idempotency_key)
+        if not previous:
+            raise
+        return IngestResponse(accepted=previous.accepted, rejected=previous.rejected, duplicate=True)
+
+    data_versions.invalidate()
+    return IngestResponse(accepted=len(rows), rejected=rejected, errors=errors)
+
+@router.post("/admin/reload-services", dependencies=[Depends(require_admin_token)])
+async def reload_services(db: AsyncSession = Depends(get_db)):
+    try:
+        return await reconcile_services(db)
+    except ServiceConfigError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,246 @@
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+import time
+import logging
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import SloAlert
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class BurnRateRule:
+    """Fire when the error budget burns faster than ``burn_rate`` over both windows.
+
+    The long window makes the alert significant, the short one makes it reset
+    soon after the service recovers.
+    """
+    severity: str
+    long_window: int
+    short_window: int
+    burn_rate: float
+
+    @property
+    def name(self) -> str:
+        return f"{_format_window(self.long_window)}/{_format_window(self.short_window)}"
+
+def _format_window(seconds: int) -> str:
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400}d"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    return f"{seconds // 60}m"
+
+# Multi-window, multi-burn-rate rules for a 30 day SLO: a 14.4x burn spends 2%
+# of the monthly budget in an hour, 6x spends 5% in six hours, 3x and 1x spend
+# 10% over one and three days
+BURN_RATE_RULES = (
+    BurnRateRule("page", 3600, 300, 14.4),
+    BurnRateRule("page", 6 * 3600, 1800, 6),
+    BurnRateRule("ticket", 86400, 2 * 3600, 3),
+    BurnRateRule("ticket", 3 * 86400, 6 * 3600, 1),
+)
+
+# Each rolling window keeps this many buckets, so its error rate is current to
+# within 1/WINDOW_BUCKETS of its length
+WINDOW_BUCKETS = 60
+
+class RollingCounter:
+    """Check counts and their time-weighted error rate over a sliding window.
+
+    Each check adds its weight (the seconds it stands for until the next
+    probe) to the window's total, and to its bad total when it failed, so
+    checks probed more often while failing don't outweigh the time they cover.
+    Counts go into ``WINDOW_BUCKETS`` fixed buckets; running totals are
+    updated as buckets are added and expire, so recording and reading are
+    O(1) amortized and the window never has to be recounted.
+    """
+
+    __slots__ = ("window", "bucket_seconds", "buckets", "total", "seconds", "bad_seconds")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.bucket_seconds = max(1.0, window / WINDOW_BUCKETS)
+        # [bucket index, checks, seconds, bad seconds]
+        self.buckets = deque()
+        self.total = 0
+        self.seconds = 0.0
+        self.bad_seconds = 0.0
+
+    def _expire(self, now: float):
+        oldest = int(now // self.bucket_seconds) - WINDOW_BUCKETS
+        while self.buckets and self.buckets[0][0] <= oldest:
+            _, total, seconds, bad_seconds = self.buckets.popleft()
+            self.total -= total
+            self.seconds -= seconds
+            self.bad_seconds -= bad_seconds
+
+    def add(self, now: float, bad: bool, weight: float = 1.0):
+        self._expire(now)
+        index = int(now // self.bucket_seconds)
+        if not self.buckets or self.buckets[-1][0] != index:
+            self.buckets.append([index, 0, 0.0, 0.0])
+        bucket = self.buckets[-1]
+        bucket[1] += 1
+        bucket[2] += weight
+        self.total += 1
+        self.seconds += weight
+        if bad:
+            bucket[3] += weight
+            self.bad_seconds += weight
+
+    def error_rate(self, now: float) -> Optional[float]:
+        self._expire(now)
+        if not self.total or self.seconds <= 0:
+            return None
+        return max(0.0, min(1.0, self.bad_seconds / self.seconds))
+
+@dataclass
+class SloEvent:
+    service_id: int
+    service_name: str
+    severity: str
+    rule: str
+    state: str  # "firing" or "resolved"
+    burn_rate: float
+    threshold: float
+    slo_target: float
+    timestamp: datetime
+
+class SloEvaluator:
+    """Per-service rolling error rates and burn-rate alert state.
+
+    Call ``record`` with each check result; it returns the alerts that started
+    or stopped firing. The work per call is fixed by the number of rules, not
+    by how much history there is.
+    """
+
+    def __init__(
+        self,
+        rules=BURN_RATE_RULES,
+        min_checks: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rules = rules
+        self.min_checks = min_checks
+        self.windows = sorted({window for rule in rules for window in (rule.long_window, rule.short_window)})
+        self.clock = clock
+        self._counters: Dict[int, Dict[int, RollingCounter]] = {}
+        self._firing: Dict[int, set] = {}
+
+    def _counters_for(self, service_id: int) -> Dict[int, RollingCounter]:
+        counters = self._counters.get(service_id)
+        if counters is None:
+            counters = {window: RollingCounter(window) for window in self.windows}
+            self._counters[service_id] = counters
+        return counters
+
+    def burn_rates(self, service_id: int, slo_target: float, now: Optional[float] = None) -> Dict[int, Optional[float]]:
+        """Window seconds -> error rate divided by the error budget (1.0 spends it exactly)"""
+        now = self.clock() if now is None else now
+        budget = 1 - slo_target / 100
+        rates = {}
+        for window, counter in self._counters_for(service_id).items():
+            error_rate = counter.error_rate(now)
+            rates[window] = error_rate / budget if error_rate is not None and budget > 0 else None
+        return rates
+
+    def record(
+        self,
+        service_id: int,
+        service_name: str,
+        status: str,
+        slo_target: Optional[float] = None,
+        now: Optional[float] = None,
+        weight: Optional[float] = None
+    ) -> List[SloEvent]:
+        """Record a check, weighted by the seconds it stands for (CHECK_INTERVAL by default)"""
+        now = self.clock() if now is None else now
+        slo_target = settings.SLO_TARGET if slo_target is None else slo_target
+        weight = settings.CHECK_INTERVAL if weight is None else weight
+
+        counters = self._counters_for(service_id)
+        for counter in counters.values():
+            counter.add(now, status != "up", weight)
+
+        min_checks = settings.SLO_MIN_CHECKS if self.min_checks is None else self.min_checks
+        rates = self.burn_rates(service_id, slo_target, now)
+        firing = self._firing.setdefault(service_id, set())
+        events = []
+        for rule in self.rules:
+            long_rate, short_rate = rates[rule.long_window], rates[rule.short_window]
+            # Too few checks (e.g. just after a restart) make any failure look like a
+            # huge burn and any success like a recovery, so the state stays as it is
+            if counters[rule.long_window].total < min_checks:
+                continue
+            is_firing = long_rate is not None and short_rate is not None and \
+                long_rate >= rule.burn_rate and short_rate >= rule.burn_rate
+
+            if is_firing == (rule in firing):
+                continue
+
+            if is_firing:
+                firing.add(rule)
+            else:
+                firing.discard(rule)
+
+            events.append(SloEvent(
+                service_id=service_id,
+                service_name=service_name,
+                severity=rule.severity,
+                rule=rule.name,
+                state="firing" if is_firing else "resolved",
+                burn_rate=round(long_rate or 0.0, 2),
+                threshold=rule.burn_rate,
+                slo_target=slo_target,
+                timestamp=datetime.utcnow()
+            ))
+
+        for event in events:
+            log = logger.warning if event.state == "firing" else logger.info
+            log(
+                f"SLO burn-rate {event.severity} alert {event.state} for {service_name}: "
+                f"{event.burn_rate}x over {event.rule} (threshold {event.threshold}x, target {slo_target}%)"
+            )
+        return events
+
+    def forget(self, service_id: int):
+        self._counters.pop(service_id, None)
+        self._firing.pop(service_id, None)
+
+    def restore_firing(self, firing: Iterable[tuple[int, str]]):
+        """Replace the firing state with (service id, rule name) pairs, e.g. as last recorded"""
+        rules = {rule.name: rule for rule in self.rules}
+        self._firing = {}
+        for service_id, rule_name in firing:
+            if rule_name in rules:
+                self._firing.setdefault(service_id, set()).add(rules[rule_name])
+
+slo_evaluator = SloEvaluator()
+
+async def restore_slo_state(db: AsyncSession, evaluator: SloEvaluator = slo_evaluator) -> int:
+    """Seed the firing state from each service and rule's latest recorded alert.
+
+    Firing state lives in memory, so without this an alert that was firing
+    before a restart or leader failover would never be recorded or notified
+    as resolved. Returns how many alerts are firing.
+    """
+    latest = (
+        select(func.max(SloAlert.id))
+        .group_by(SloAlert.service_id, SloAlert.rule)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(SloAlert.service_id, SloAlert.rule)
+        .where(SloAlert.id.in_(latest), SloAlert.state == "firing")
+    )
+    firing = result.all()
+    evaluator.restore_firing(firing)
+    if firing:
+        logger.info(f"Restored {len(firing)} firing SLO alert(s)")
+    return len(firing)
@@ -0,0 +1,101 @@
+from functools import lru_cache
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches the historical behaviour: any 2xx or 3xx response counts as up
+DEFAULT_STATUS_RULE = "200-399"
+
+_NO_MATCH = -1.0
+_NO_THRESHOLD = None
+
+class StatusRuleError(ValueError):
+    pass
+
+class StatusMatcher:
+    """Classifies a response from a precompiled status-code lookup table.
+
+    Each slot of the table holds either _NO_MATCH, _NO_THRESHOLD (the status is
+    expected with no latency limit) or a latency threshold in milliseconds above
+    which the service is reported as degraded.
+    """
+
+    __slots__ = ("rule", "_table")
+
+    def __init__(self, rule: str, table: tuple):
+        self.rule = rule
+        self._table = table
+
+    def classify(self, status_code: int, response_time: Optional[float]) -> tuple[str, Optional[str]]:
+        if 0 <= status_code < len(self._table):
+            threshold = self._table[status_code]
+        else:
+            threshold = _NO_MATCH
+
+        if threshold == _NO_MATCH:
+            return "degraded", f"HTTP {status_code}"
+
+        if threshold is not _NO_THRESHOLD and response_time is not None and response_time > threshold:
+            return "degraded", f"Slow response: {response_time:.0f}ms > {threshold:.0f}ms"
+
+        return "up", None
+
+def _parse_threshold(value: str) -> float:
+    value = value.strip().lower()
+    if value.endswith("ms"):
+        value = value[:-2]
+    elif value.endswith("s"):
+        return float(value[:-1]) * 1000
+    return float(value)
+
+def _parse_codes(spec: str) -> range:
+    spec = spec.strip().lower()
+    if len(spec) == 3 and spec.endswith("xx") and spec[0].isdigit():
+        base = int(spec[0]) * 100
+        return range(base, base + 100)
+    if "-" in spec:
+        low, high = spec.split("-", 1)
+        return range(int(low), int(high) + 1)
+    code = int(spec)
+    return range(code, code + 1)
+
+def parse_status_rule(rule: str) -> tuple:
+    """Parse a rule such as "200,301-302,4xx:1500ms" into a lookup table.
+
+    Tokens are comma separated; each one is a status code, an inclusive range or
+    an "Nxx" class, optionally followed by ":<threshold>" (ms, or "s" suffix).
+    Later tokens override earlier ones for the same code.
+    """
+    table = [_NO_MATCH] * 600
+
+    for token in rule.split(","):
+        token = token.strip()
+        if not token:
+            continue
+
+        spec, _, threshold_spec = token.partition(":")
+        try:
+            codes = _parse_codes(spec)
+            threshold = _parse_threshold(threshold_spec) if threshold_spec else _NO_THRESHOLD
+        except ValueError:
+            raise StatusRuleError(f"Invalid status rule token '{token}'")
+
+        if not codes or codes.start < 100 or codes.stop > 600:
+            raise StatusRuleError(f"Status codes out of range in '{token}'")
+
+        for code in codes:
+            table[code] = threshold
+
+    return tuple(table)
+
+@lru_cache(maxsize=256)
+def compile_status_rule(rule: Optional[str]) -> StatusMatcher:
+    """Compile a Service.expected_status value, cached per distinct rule string"""
+    rule = (rule or "").strip() or DEFAULT_STATUS_RULE
+
+    try:
+        return StatusMatcher(rule, parse_status_rule(rule))
+    except StatusRuleError as e:
+        logger.warning(f"{e}; falling back to '{DEFAULT_STATUS_RULE}'")
+        return StatusMatcher(DEFAULT_STATUS_RULE, parse_status_rule(DEFAULT_STATUS_RULE))
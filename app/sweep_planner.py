@@ -0,0 +1,73 @@
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from urllib.parse import urlsplit, urlunsplit
+import asyncio
+
+from config import settings
+
+T = TypeVar("T")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def probe_host(url: str) -> str:
+    return (urlsplit(url).hostname or url).lower()
+
+def probe_target(url: str) -> str:
+    """``url`` as the request it sends, so spellings of one target share a probe.
+
+    Scheme and host are lowercased, a default port, a trailing slash and the
+    fragment (never sent to the server) are dropped: "HTTPS://Example.com:443/"
+    and "https://example.com#status" are both "https://example.com".
+    """
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname.lower()
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{parts.port}"
+    if "@" in parts.netloc:
+        netloc = parts.netloc.rsplit("@", 1)[0] + "@" + netloc
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), parts.query, ""))
+
+class SweepPlanner:
+    """Shares identical probes within one sweep and caps requests per host.
+
+    Every probe is identified by a key (normalized target, check type, probe
+    options, timeout and confirmation attempt). The first request for a key sends the probe; every other request
+    for it, whether made while the probe is in flight or after it finished,
+    gets the same result. At most ``host_limit`` probes run against one host
+    at a time, so several services on one server don't all hit it at once.
+    Create one per sweep: results are never reused across sweeps.
+    """
+
+    def __init__(self, host_limit: Optional[int] = None):
+        self.host_limit = settings.PROBE_HOST_CONCURRENCY if host_limit is None else host_limit
+        self._results: Dict[Hashable, asyncio.Future] = {}
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self.requested = 0
+        self.sent = 0
+
+    def _host_slot(self, host: str) -> asyncio.Semaphore:
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(max(1, self.host_limit))
+        return self._hosts[host]
+
+    async def _send(self, host: str, probe: Callable[[], Awaitable[T]]) -> T:
+        async with self._host_slot(host):
+            self.sent += 1
+            return await probe()
+
+    async def run(self, key: Hashable, host: str, probe: Callable[[], Awaitable[T]]) -> T:
+        self.requested += 1
+        future = self._results.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._send(host, probe))
+            self._results[key] = future
+        # One waiter being cancelled mustn't cancel the probe the others share
+        return await asyncio.shield(future)
+
+    @property
+    def shared(self) -> int:
+        return self.requested - self.sent
@@ -1,6 +1,7 @@
 import pytest
 import asyncio
 from pathlib import Path
+from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from datetime import datetime
 
@@ -14,6 +15,23 @@ def event_loop():
     yield loop
     loop.close()
 
+@pytest.fixture(autouse=True)
+def monitor_state(monkeypatch):
+    from config import settings
+    from monitor import failure_streaks
+    from domain_index import domain_index
+    from data_version import data_versions
+    from slo import slo_evaluator
+
+    monkeypatch.setattr(settings, "CONFIRM_RETRY_DELAY", 0)
+    failure_streaks.clear()
+    domain_index.invalidate()
+    data_versions.invalidate()
+    monkeypatch.setattr(slo_evaluator, "_counters", {})
+    monkeypatch.setattr(slo_evaluator, "_firing", {})
+    yield
+    failure_streaks.clear()
+
 @pytest.fixture
 async def test_engine():
     if TEST_DB_PATH.exists():
@@ -46,6 +64,32 @@ async def test_db(test_engine):
         yield session
         await session.rollback()
 
+@pytest.fixture
+def api_app(test_db):
+    """The API router on a bare app, with every request using test_db"""
+    from fastapi import FastAPI
+    from routes import router
+    from config import settings
+    from database import get_db
+
+    app = FastAPI()
+    app.include_router(router, prefix=settings.API_PREFIX)
+
+    async def override_get_db():
+        yield test_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+@pytest.fixture
+def api_transport(api_app):
+    return ASGITransport(app=api_app)
+
+@pytest.fixture
+async def api_client(api_transport):
+    async with AsyncClient(transport=api_transport, base_url="http://test") as client:
+        yield client
+
 @pytest.fixture
 async def test_service(test_db):
     service = Service(
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+from sqlalchemy import select
+
+from adaptive_schedule import AdaptiveScheduler
+from database import HealthCheck
+from monitor import run_health_checks
+
+def make_scheduler():
+    return AdaptiveScheduler(
+        min_interval=10,
+        base_interval=60,
+        max_interval=300,
+        stable_checks=3,
+        flap_window=2,
+        clock=lambda: 0.0
+    )
+
+def test_unknown_service_is_due():
+    scheduler = make_scheduler()
+    assert scheduler.is_due(1, now=0.0)
+
+def test_failure_uses_min_interval():
+    scheduler = make_scheduler()
+
+    assert scheduler.record(1, "down", now=0.0) == 10
+    assert not scheduler.is_due(1, now=4.0)
+    assert scheduler.is_due(1, now=10.0)
+
+def test_recovery_stays_fast_until_flap_window_clears():
+    scheduler = make_scheduler()
+
+    scheduler.record(1, "down", now=0.0)
+    assert scheduler.record(1, "up", now=10.0) == 10
+    assert scheduler.record(1, "up", now=20.0) == 60
+
+def test_sustained_success_backs_off_to_max():
+    scheduler = make_scheduler()
+
+    intervals = [scheduler.record(1, "up", now=float(i)) for i in range(8)]
+
+    assert intervals[:3] == [60, 60, 60]
+    assert intervals[3:6] == [120, 240, 300]
+    assert intervals[-1] == 300
+
+    assert scheduler.record(1, "degraded", now=10.0) == 10
+
+@pytest.mark.asyncio
+async def test_run_health_checks_due_only_skips_scheduled_services(test_db, test_service):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+
+    scheduler = make_scheduler()
+    scheduler.record(test_service.id, "up", now=0.0)
+
+    with patch('monitor.check_schedule', scheduler):
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+            with patch('monitor.AsyncSessionLocal') as mock_session:
+                mock_session.return_value.__aenter__.return_value = test_db
+
+                await run_health_checks(due_only=True)
+
+                result = await test_db.execute(
+                    select(HealthCheck).where(HealthCheck.service_id == test_service.id)
+                )
+                assert len(result.scalars().all()) == 0
+
+                await run_health_checks()
+
+                result = await test_db.execute(
+                    select(HealthCheck).where(HealthCheck.service_id == test_service.id)
+                )
+                assert len(result.scalars().all()) == 1
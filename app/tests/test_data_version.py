@@ -0,0 +1,91 @@
+import pytest
+from datetime import datetime
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+
+from database import Service, HealthCheck
+from data_version import DataVersions, bump_data_versions, etag_matches
+
+def test_accepted_encodings():
+    from routes import accepted_encodings
+
+    assert accepted_encodings("gzip, deflate, br") == "br,gzip"
+    assert accepted_encodings("GZIP;q=0.5, br;q=0") == "gzip"
+    assert accepted_encodings("*") == "br,gzip"
+    assert accepted_encodings(None) == ""
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+@pytest.mark.asyncio
+async def test_etag_changes_only_for_bumped_services(test_db, test_service, test_service_down):
+    versions = DataVersions(ttl=60)
+    first = await versions.etag(test_db, "/history", [test_service.id])
+    other = await versions.etag(test_db, "/history", [test_service_down.id])
+    assert first == await versions.etag(test_db, "/history", [test_service.id])
+    assert first != await versions.etag(test_db, "/stats", [test_service.id])
+
+    await bump_data_versions(test_db, [test_service.id])
+    await test_db.commit()
+    # Cached until invalidated (or the TTL runs out)
+    assert await versions.etag(test_db, "/history", [test_service.id]) == first
+
+    versions.invalidate()
+    assert await versions.etag(test_db, "/history", [test_service.id]) != first
+    assert await versions.etag(test_db, "/history", [test_service_down.id]) == other
+
+    result = await test_db.execute(select(Service.data_version).where(Service.id == test_service.id))
+    assert result.scalar_one() == 1
+
+@pytest.mark.asyncio
+async def test_conditional_get_and_compression(test_db, test_service):
+    from main import app
+    from database import get_db
+
+    for i in range(50):
+        test_db.add(HealthCheck(service_id=test_service.id, timestamp=datetime.utcnow(), status="up", response_time=float(i)))
+    await test_db.commit()
+
+    async def override_get_db():
+        yield test_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            path = f"/api/services/{test_service.id}/history"
+            response = await client.get(path, headers={"Accept-Encoding": "gzip"})
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == "gzip"
+            assert "Accept-Encoding" in response.headers["vary"]
+            etag = response.headers["etag"]
+
+            # Each encoding is a different body, so it gets its own tag
+            response = await client.get(path, headers={"Accept-Encoding": "identity"})
+            assert "content-encoding" not in response.headers
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert response.headers["etag"] != etag
+            response = await client.get(path, headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+            assert response.status_code == 200
+
+            for params in ({}, {"format": "fast"}):
+                response = await client.get(path, params=params)
+                assert response.headers["etag"]
+                response = await client.get(path, params=params, headers={"If-None-Match": response.headers["etag"]})
+                assert response.status_code == 304
+                assert response.content == b""
+
+            # A new check bumps the version and the old tag stops matching
+            from data_version import bump_data_versions, data_versions
+            await bump_data_versions(test_db, [test_service.id])
+            await test_db.commit()
+            data_versions.invalidate()
+
+            response = await client.get(path, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["etag"] != etag
+    finally:
+        app.dependency_overrides.clear()
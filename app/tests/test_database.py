@@ -114,3 +114,133 @@ async def test_cascade_delete_service(test_db, test_service, test_health_check,
         select(Incident).where(Incident.service_id == service_id)
     )
     assert result.scalar_one_or_none() is None
+
+def test_read_database_url(monkeypatch):
+    from config import settings
+    from database import read_database_url
+
+    monkeypatch.setattr(settings, "USE_READ_ENGINE", True)
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", "")
+
+    assert read_database_url("sqlite+aiosqlite:////data/status.db") == \
+        "sqlite+aiosqlite:///file:/data/status.db?mode=ro&uri=true"
+    assert read_database_url("sqlite+aiosqlite://") is None
+    assert read_database_url("postgresql+asyncpg://db/status") is None
+
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", "postgresql+asyncpg://replica/status")
+    assert read_database_url("postgresql+asyncpg://db/status") == "postgresql+asyncpg://replica/status"
+
+    monkeypatch.setattr(settings, "USE_READ_ENGINE", False)
+    assert read_database_url("sqlite+aiosqlite:////data/status.db") is None
+
+@pytest.mark.asyncio
+async def test_sqlite_read_engine_is_read_only(tmp_path, monkeypatch):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from config import settings
+    from database import read_database_url, enable_sqlite_wal
+
+    monkeypatch.setattr(settings, "USE_READ_ENGINE", True)
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", "")
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'status.db'}"
+    writer = create_async_engine(url)
+    enable_sqlite_wal(writer)
+    reader = create_async_engine(read_database_url(url))
+
+    try:
+        async with writer.begin() as conn:
+            await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            await conn.execute(text("INSERT INTO t VALUES (1)"))
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar_one() == "wal"
+
+        async with reader.connect() as conn:
+            assert (await conn.execute(text("SELECT x FROM t"))).scalar_one() == 1
+            with pytest.raises(OperationalError):
+                await conn.execute(text("INSERT INTO t VALUES (2)"))
+    finally:
+        await reader.dispose()
+        await writer.dispose()
+
+@pytest.mark.asyncio
+async def test_get_db_routes_reads_to_read_engine(monkeypatch):
+    from types import SimpleNamespace
+    import database
+
+    sessions = []
+
+    class FakeSession:
+        def __init__(self, kind):
+            self.kind = kind
+        async def __aenter__(self):
+            sessions.append(self.kind)
+            return self
+        async def __aexit__(self, *args):
+            pass
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(database, "ReadSessionLocal", lambda: FakeSession("read"))
+    monkeypatch.setattr(database, "AsyncSessionLocal", lambda: FakeSession("write"))
+
+    for method in ("GET", "POST"):
+        async for _ in database.get_db(SimpleNamespace(method=method)):
+            pass
+
+    assert sessions == ["read", "write"]
+
+@pytest.mark.asyncio
+async def test_migration_adds_keyset_indexes(tmp_path):
+    from sqlalchemy import text, inspect
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from database import create_schema
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    try:
+        async with engine.begin() as conn:
+            await create_schema(conn)
+            # A database created before the indexes existed
+            await conn.execute(text("DROP INDEX ix_health_checks_service_timestamp_id"))
+            await conn.execute(text("DROP INDEX ix_incidents_started_at_id"))
+
+        async with engine.begin() as conn:
+            await create_schema(conn)
+            indexes = await conn.run_sync(
+                lambda sync_conn: {
+                    index["name"]
+                    for table in ("health_checks", "incidents")
+                    for index in inspect(sync_conn).get_indexes(table)
+                }
+            )
+
+        assert {"ix_health_checks_service_timestamp_id", "ix_incidents_started_at_id"} <= indexes
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_migration_adds_root_incident_column(tmp_path):
+    from sqlalchemy import text, inspect
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from database import create_schema
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    try:
+        async with engine.begin() as conn:
+            await create_schema(conn)
+            await conn.execute(text("DROP INDEX ix_incidents_root_incident_id"))
+            await conn.execute(text("ALTER TABLE incidents DROP COLUMN root_incident_id"))
+
+        async with engine.begin() as conn:
+            await create_schema(conn)
+            columns, indexes = await conn.run_sync(
+                lambda sync_conn: (
+                    {column["name"] for column in inspect(sync_conn).get_columns("incidents")},
+                    {index["name"] for index in inspect(sync_conn).get_indexes("incidents")}
+                )
+            )
+
+        assert "root_incident_id" in columns
+        assert "ix_incidents_root_incident_id" in indexes
+    finally:
+        await engine.dispose()
@@ -0,0 +1,178 @@
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import select
+
+from database import Service, Incident, HealthCheck
+from dependencies import DependencyError, DependencyGraph, resolve_upstreams
+
+def service(service_id, name, depends_on=None, group_name=None):
+    return SimpleNamespace(
+        id=service_id, name=name, url=f"https://{name}.test", depends_on=depends_on, group_name=group_name
+    )
+
+def test_resolve_upstreams_by_name_or_url():
+    upstreams = resolve_upstreams([
+        (1, "db", "https://db.test", None),
+        (2, "api", "https://api.test", "db"),
+        (3, "web", "https://web.test", "https://api.test, db"),
+    ])
+    assert upstreams == {1: [], 2: [1], 3: [2, 1]}
+
+def test_resolve_upstreams_rejects_bad_graphs():
+    with pytest.raises(DependencyError, match="unknown service"):
+        resolve_upstreams([(1, "web", "https://web.test", "api")])
+    with pytest.raises(DependencyError, match="cycle"):
+        resolve_upstreams([
+            (1, "a", "https://a.test", "c"),
+            (2, "b", "https://b.test", "a"),
+            (3, "c", "https://c.test", "b"),
+        ])
+    # Not strict: a reference to a service that isn't loaded is ignored
+    assert resolve_upstreams([(1, "web", "https://web.test", "api")], strict=False) == {1: []}
+
+def test_order_puts_upstreams_first():
+    services = [service(1, "web", "api"), service(2, "api", "db"), service(3, "db"), service(4, "other")]
+    graph = DependencyGraph(services)
+    assert [s.name for s in graph.order(services)] == ["db", "api", "web", "other"]
+    assert graph.all_upstreams(1) == [2, 3]
+
+def test_root_incident_is_earliest_related_outage():
+    now = datetime.utcnow()
+    graph = DependencyGraph([
+        service(1, "git-a", group_name="git"),
+        service(2, "git-b", group_name="git"),
+        service(3, "git-c", group_name="git"),
+        service(4, "web")
+    ])
+    first = SimpleNamespace(id=10, started_at=now - timedelta(minutes=5))
+    second = SimpleNamespace(id=11, started_at=now)
+    assert graph.root_incident(3, {1: second, 2: first}) is first
+    assert graph.root_incident(4, {1: first}) is None
+    assert graph.peer_down(2, {1: "down"}) and not graph.peer_down(4, {1: "down"})
+
+@pytest.fixture
+async def linked_services(test_db):
+    services = [
+        Service(name="api", url="https://api.test", check_type="http", expected_status="200", enabled=True),
+        Service(name="web", url="https://web.test", check_type="http", expected_status="200", enabled=True, depends_on="api"),
+        Service(name="git-a", url="https://git-a.test", check_type="http", expected_status="200", enabled=True, group_name="git"),
+        Service(name="git-b", url="https://git-b.test", check_type="http", expected_status="200", enabled=True, group_name="git"),
+    ]
+    test_db.add_all(services)
+    await test_db.commit()
+    return services
+
+async def sweep(test_db, down_urls):
+    from monitor import run_health_checks
+
+    probed = []
+
+    async def probe(url, *args):
+        probed.append(url)
+        if url in down_urls:
+            return "down", None, None, "Connection refused"
+        return "up", 50.0, 200, None
+
+    with patch('monitor.check_http_service', side_effect=probe), \
+            patch('monitor.enqueue_notification') as notify, \
+            patch('monitor.notification_dispatcher'), \
+            patch('monitor.AsyncSessionLocal') as mock_session:
+        mock_session.return_value.__aenter__.return_value = test_db
+        await run_health_checks()
+    return probed, notify
+
+@pytest.mark.asyncio
+async def test_dependent_of_down_upstream_is_not_probed(test_db, linked_services):
+    api, web = linked_services[:2]
+    probed, notify = await sweep(test_db, {"https://api.test"})
+
+    # api plus its two re-probes; web is never requested
+    assert probed.count("https://api.test") == 3
+    assert "https://web.test" not in probed
+
+    result = await test_db.execute(select(HealthCheck).where(HealthCheck.service_id == web.id))
+    assert result.scalar_one().error_message == "Upstream api is down"
+
+    result = await test_db.execute(select(Incident).order_by(Incident.id))
+    root, linked = result.scalars().all()
+    assert (root.service_id, root.root_incident_id) == (api.id, None)
+    assert (linked.service_id, linked.root_incident_id) == (web.id, root.id)
+    # Only the root outage is notified
+    assert [call.args[1]["service_name"] for call in notify.call_args_list] == ["api"]
+
+    probed, notify = await sweep(test_db, set())
+    assert "https://web.test" in probed
+    result = await test_db.execute(select(Incident.status))
+    assert set(result.scalars().all()) == {"resolved"}
+    assert [call.args[1]["service_name"] for call in notify.call_args_list] == ["api"]
+
+@pytest.mark.asyncio
+async def test_linked_outage_does_not_page_for_slo(test_db, linked_services, monkeypatch):
+    from config import settings
+    from database import SloAlert
+
+    monkeypatch.setattr(settings, "SLO_MIN_CHECKS", 1)
+    _, notify = await sweep(test_db, {"https://api.test"})
+
+    # api's incident and SLO alerts are sent, web's burn-rate alerts are only recorded
+    assert {call.args[1]["service_name"] for call in notify.call_args_list} == {"api"}
+    assert {call.args[1]["kind"] for call in notify.call_args_list} == {"incident", "slo_alert"}
+    result = await test_db.execute(select(Service.name, SloAlert.notified).join(SloAlert, SloAlert.service_id == Service.id))
+    assert set(result.all()) == {("api", True), ("web", False)}
+
+@pytest.mark.asyncio
+async def test_group_failures_roll_into_one_incident(test_db, linked_services):
+    git_a, git_b = linked_services[2:]
+    probed, notify = await sweep(test_db, {"https://git-a.test", "https://git-b.test"})
+
+    # The second member's failure is trusted without re-probes
+    assert probed.count("https://git-a.test") == 3
+    assert probed.count("https://git-b.test") == 1
+
+    result = await test_db.execute(select(Incident).order_by(Incident.id))
+    root, linked = result.scalars().all()
+    assert root.service_id == git_a.id and linked.root_incident_id == root.id
+    assert len(notify.call_args_list) == 1
+
+@pytest.mark.asyncio
+async def test_old_outage_is_not_a_root(test_db, linked_services):
+    git_a, git_b = linked_services[2:]
+    test_db.add(Incident(service_id=git_a.id, started_at=datetime.utcnow() - timedelta(days=2), status="ongoing"))
+    await test_db.commit()
+
+    _, notify = await sweep(test_db, {"https://git-a.test", "https://git-b.test"})
+
+    result = await test_db.execute(select(Incident).where(Incident.service_id == git_b.id))
+    assert result.scalar_one().root_incident_id is None
+    assert [call.args[1]["service_name"] for call in notify.call_args_list] == ["git-b"]
+
+@pytest.mark.asyncio
+async def test_linked_outage_is_promoted_when_root_recovers(test_db, linked_services):
+    api, web = linked_services[:2]
+    await sweep(test_db, {"https://api.test"})
+
+    _, notify = await sweep(test_db, {"https://web.test"})
+
+    result = await test_db.execute(select(Incident).where(Incident.service_id == web.id))
+    incident = result.scalar_one()
+    assert (incident.status, incident.root_incident_id) == ("ongoing", None)
+    sent = [call.args[1] for call in notify.call_args_list]
+    assert [(e["service_name"], e["state"]) for e in sent] == [("api", "resolved"), ("web", "opened")]
+    assert sent[1]["message"] == "web is still down after api recovered"
+
+    # Now a root itself, its recovery is announced too
+    _, notify = await sweep(test_db, set())
+    assert [(c.args[1]["service_name"], c.args[1]["state"]) for c in notify.call_args_list] == [("web", "resolved")]
+
+@pytest.mark.asyncio
+async def test_roots_only_incidents(test_db, api_client, linked_services):
+    await sweep(test_db, {"https://api.test"})
+
+    everything = (await api_client.get("/api/incidents")).json()
+    roots = (await api_client.get("/api/incidents", params={"roots_only": True})).json()
+
+    assert sorted(i["service_name"] for i in everything) == ["api", "web"]
+    assert [i["service_name"] for i in roots] == ["api"]
+    assert next(i for i in everything if i["service_name"] == "web")["root_incident_id"] == roots[0]["id"]
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import select
+
+from database import Service, ServiceDomain
+from domain_index import sync_service_domains, parse_domains, DomainIndex, domain_index
+
+def test_parse_domains():
+    assert parse_domains(None) == set()
+    assert parse_domains("a.com, b.com,,") == {"a.com", "b.com"}
+
+@pytest.fixture
+async def domain_services(test_db):
+    services = [
+        Service(name="A", url="https://a.example.com", check_type="http", expected_status="200", domains="a.com,b.com"),
+        Service(name="B", url="https://b.example.com", check_type="http", expected_status="200", domains="b.com"),
+        Service(name="Everywhere", url="https://c.example.com", check_type="http", expected_status="200"),
+    ]
+    test_db.add_all(services)
+    await test_db.commit()
+    await sync_service_domains(test_db)
+    await test_db.commit()
+    domain_index.invalidate()
+    return services
+
+@pytest.mark.asyncio
+async def test_sync_service_domains_applies_diff(test_db, domain_services):
+    a, b, _ = domain_services
+
+    assert await sync_service_domains(test_db) == (0, 0)
+
+    a.domains = "a.com,c.com"
+    await test_db.flush()
+    assert await sync_service_domains(test_db) == (1, 1)
+    await test_db.commit()
+
+    result = await test_db.execute(
+        select(ServiceDomain.domain).where(ServiceDomain.service_id == a.id)
+    )
+    assert set(result.scalars().all()) == {"a.com", "c.com"}
+
+@pytest.mark.asyncio
+async def test_domain_index_lookup(test_db, domain_services):
+    a, b, everywhere = domain_services
+    index = DomainIndex(ttl=60)
+
+    assert await index.service_ids(test_db, "b.com") == {a.id, b.id, everywhere.id}
+    assert await index.service_ids(test_db, "a.com") == {a.id, everywhere.id}
+    assert await index.service_ids(test_db, "unknown.com") == {everywhere.id}
+
+@pytest.mark.asyncio
+async def test_get_services_filters_by_domain(test_db, api_client, domain_services):
+    response = await api_client.get("/api/services?domain=a.com")
+    assert response.status_code == 200
+    assert [s["name"] for s in response.json()] == ["A", "Everywhere"]
+
+    response = await api_client.get("/api/services")
+    assert len(response.json()) == 3
@@ -0,0 +1,24 @@
+import json
+from datetime import datetime
+
+import fast_json
+from fast_json import dumps, rows_to_columns, rows_to_records
+
+COLUMNS = ("id", "timestamp", "response_time")
+ROWS = [(1, datetime(2024, 1, 2, 3, 4, 5, 600000), 12.5), (2, datetime(2024, 1, 2, 3, 5), None)]
+
+def test_records_and_columns():
+    assert rows_to_records(COLUMNS, ROWS)[1] == {"id": 2, "timestamp": datetime(2024, 1, 2, 3, 5), "response_time": None}
+
+    columns = rows_to_columns(COLUMNS, ROWS)
+    assert columns["id"] == [1, 2]
+    assert columns["response_time"] == [12.5, None]
+    assert rows_to_columns(COLUMNS, []) == {"id": [], "timestamp": [], "response_time": []}
+
+def test_stdlib_fallback_matches(monkeypatch):
+    content = rows_to_records(COLUMNS, ROWS)
+    encoded = dumps(content)
+
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert json.loads(dumps(content)) == json.loads(encoded)
+    assert json.loads(dumps(content))[0]["timestamp"] == "2024-01-02T03:04:05.600000"
@@ -0,0 +1,192 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+
+from health import HealthState, health_state
+
+@pytest.fixture
+def fresh_health_state(monkeypatch):
+    for attr, value in vars(HealthState()).items():
+        monkeypatch.setattr(health_state, attr, value)
+    return health_state
+
+def test_sweep_progress():
+    state = HealthState()
+    state.initial_sweep = "pending"
+
+    state.sweep_started()
+    assert state.initial_sweep == "running"
+
+    state.sweep_finished()
+    assert state.initial_sweep == "complete"
+    assert state.last_sweep_completed is not None
+
+@pytest.mark.asyncio
+async def test_start_monitor_does_not_wait_for_first_sweep(fresh_health_state):
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from worker import start_monitor
+
+    release = asyncio.Event()
+
+    async def slow_sweep(*args, **kwargs):
+        await release.wait()
+
+    lease = MagicMock(ttl=30, is_leader=True)
+    lease.renew = AsyncMock(return_value=True)
+    scheduler = AsyncIOScheduler()
+
+    with patch('worker.run_health_checks', side_effect=slow_sweep) as sweep:
+        await asyncio.wait_for(start_monitor(scheduler, lease), timeout=1)
+        assert fresh_health_state.initial_sweep == "pending"
+
+        for _ in range(50):
+            if sweep.called:
+                break
+            await asyncio.sleep(0.01)
+        assert sweep.called
+
+        release.set()
+        scheduler.shutdown(wait=False)
+
+@pytest.mark.asyncio
+async def test_overlapping_ticks_are_skipped():
+    from monitor import run_health_checks, sweep_lock
+
+    with patch('monitor._run_health_checks', AsyncMock()) as sweep:
+        async with sweep_lock:
+            await run_health_checks(due_only=True)
+        sweep.assert_not_awaited()
+
+        await run_health_checks(due_only=True)
+        sweep.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_readiness_endpoint(fresh_health_state, test_engine):
+    from main import app
+    from health import probe_database
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/health/ready")
+        assert response.status_code == 503
+
+        fresh_health_state.db_ready = True
+        await probe_database(test_engine, fresh_health_state)
+        response = await client.get("/api/health/ready")
+        assert response.status_code == 200
+        assert response.json()["database"]["latency_ms"] is not None
+
+        response = await client.get("/api/health/live")
+        assert response.status_code == 200
+
+        response = await client.get("/api/health")
+        assert response.json()["status"] == "healthy"
+        assert response.json()["ready"] is True
+
+@pytest.mark.asyncio
+async def test_connections_in_use_are_tracked_on_sqlite(test_engine):
+    from health import track_connections
+
+    # SQLite's pools have no checkedout(), so the count comes from pool events
+    assert getattr(test_engine.pool, "checkedout", None) is None
+    state = HealthState()
+    track_connections(test_engine, state)
+    assert state.pool_checked_out == 0
+
+    async with test_engine.connect() as first:
+        await first.execute(text("SELECT 1"))
+        async with test_engine.connect() as second:
+            await second.execute(text("SELECT 1"))
+            assert state.pool_checked_out == 2
+        assert state.pool_checked_out == 1
+    assert state.pool_checked_out == 0
+
+    _, detail = state.db_check(0)
+    assert detail["pool_checked_out"] == 0
+
+@pytest.mark.asyncio
+async def test_database_probe_failure_fails_readiness():
+    from health import probe_database
+
+    state = HealthState()
+    state.db_ready = True
+
+    engine = MagicMock()
+    engine.connect.side_effect = RuntimeError("database is locked")
+    await probe_database(engine, state)
+
+    ready, detail = state.readiness()
+    assert not ready
+    assert detail["database"]["error"] == "database is locked"
+
+def test_liveness_detects_stalled_scheduler(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "ADAPTIVE_SCHEDULING", False)
+    monkeypatch.setattr(settings, "CHECK_INTERVAL", 60)
+    monkeypatch.setattr(settings, "HEALTH_SWEEP_STALE_FACTOR", 3)
+
+    state = HealthState()
+    assert state.liveness()[0]
+
+    state.initial_sweep = "complete"
+    state.last_sweep_finished_at = 1000.0
+    assert state.scheduler_check(1000.0 + 170)[0]
+    assert not state.scheduler_check(1000.0 + 190)[0]
+
+    state.sweep_started()
+    state.last_sweep_started_at = 1000.0
+    assert not state.scheduler_check(1000.0 + settings.HEALTH_MAX_SWEEP_SECONDS + 1)[0]
+
+def test_liveness_follows_leadership(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "ADAPTIVE_SCHEDULING", False)
+    monkeypatch.setattr(settings, "CHECK_INTERVAL", 60)
+    monkeypatch.setattr(settings, "HEALTH_SWEEP_STALE_FACTOR", 3)
+
+    state = HealthState()
+    state.lease = MagicMock(is_leader=True)
+    state.initial_sweep = "complete"
+    state.last_sweep_finished_at = 1000.0
+
+    # Lost the lease: no longer expected to sweep
+    state.lease.is_leader = False
+    assert state.scheduler_check(1000.0 + 500) == (True, {"state": "standby"})
+
+    # Took it over again: judged from the takeover, then on its sweeps
+    state.lease.is_leader = True
+    state.leader_since = 1400.0
+    assert state.scheduler_check(1000.0 + 500)[0]
+    assert not state.scheduler_check(1400.0 + 190)[0]
+
+@pytest.mark.asyncio
+async def test_standby_that_takes_over_is_checked(fresh_health_state):
+    from worker import initial_sweep, renew_leadership
+
+    lease = MagicMock(ttl=30, is_leader=False)
+    lease.renew = AsyncMock(return_value=False)
+    fresh_health_state.lease = lease
+
+    await initial_sweep(lease)
+    assert fresh_health_state.initial_sweep == "standby"
+    assert fresh_health_state.scheduler_check(10**9)[0]
+
+    lease.renew = AsyncMock(return_value=True)
+    await renew_leadership(lease)
+    lease.is_leader = True
+    assert fresh_health_state.leader_since is not None
+    assert not fresh_health_state.scheduler_check(fresh_health_state.leader_since + 10**6)[0]
+
+def test_liveness_detects_loop_lag(monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "HEALTH_MAX_LOOP_LAG_MS", 500)
+    state = HealthState()
+
+    state.loop_lag_ms = 20
+    assert state.liveness()[0]
+
+    state.loop_lag_ms = 900
+    assert not state.liveness()[0]
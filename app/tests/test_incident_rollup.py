@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime, date, timedelta
+from sqlalchemy import select
+
+from database import Incident, IncidentDaily
+from incident_rollup import split_by_day, incident_deltas, backfill_incident_rollups, IncidentWindow
+from monitor import handle_incident
+
+def resolved(service_id, started_at, minutes):
+    return Incident(
+        service_id=service_id,
+        started_at=started_at,
+        ended_at=started_at + timedelta(minutes=minutes),
+        duration=minutes * 60,
+        status="resolved"
+    )
+
+def test_split_by_day_across_midnight():
+    assert split_by_day(datetime(2024, 1, 1, 23, 30), datetime(2024, 1, 2, 0, 45)) == {
+        date(2024, 1, 1): 1800,
+        date(2024, 1, 2): 2700
+    }
+
+def test_short_incident_adds_no_downtime():
+    deltas = incident_deltas(resolved(1, datetime(2024, 1, 1, 12), 0.5))
+    assert deltas[date(2024, 1, 1)]["downtime_seconds"] == 0
+    assert deltas[date(2024, 1, 1)]["resolved"] == 1
+
+@pytest.mark.asyncio
+async def test_handle_incident_updates_rollup(test_db, test_service, test_incident):
+    await handle_incident(test_db, test_service, "up")
+    await test_db.commit()
+
+    result = await test_db.execute(select(IncidentDaily).where(IncidentDaily.service_id == test_service.id))
+    rows = result.scalars().all()
+    assert sum(row.resolved for row in rows) == 1
+    assert sum(row.repair_seconds for row in rows) == test_incident.duration
+
+@pytest.mark.asyncio
+async def test_window_statistics(test_db, test_service):
+    now = datetime(2024, 3, 10, 12, 0)
+    for incident in (
+        resolved(test_service.id, datetime(2024, 3, 8, 10), 30),
+        resolved(test_service.id, datetime(2024, 3, 9, 10), 90),
+        # Outside a 7 day window
+        resolved(test_service.id, datetime(2024, 2, 1, 10), 600),
+    ):
+        test_db.add(incident)
+    test_db.add(Incident(service_id=test_service.id, started_at=now - timedelta(minutes=15), status="ongoing"))
+    await test_db.commit()
+
+    assert await backfill_incident_rollups(test_db) == 3
+    assert await backfill_incident_rollups(test_db) == 0
+
+    window = await IncidentWindow.load(test_db, test_service.id, 7, now=now)
+    reliability = window.reliability()
+    assert reliability["incidents"] == 3
+    assert reliability["resolved"] == 2
+    assert reliability["mttr_seconds"] == 60 * 60
+    assert reliability["downtime_seconds"] == (30 + 90 + 15) * 60
+    assert reliability["mtbf_seconds"] == (window.window_seconds - (30 + 90 + 15) * 60) / 3
+
+    calendar = window.calendar()
+    assert len(calendar) == 7
+    assert calendar[-1] == {"date": date(2024, 3, 10), "downtime_minutes": 15.0, "incidents": 1}
+    assert calendar[-3]["downtime_minutes"] == 30.0
+
+    budget = window.sla_budget(99.0)
+    assert budget["budget_seconds"] == pytest.approx(7 * 86400 * 0.01)
+    assert budget["budget_remaining_seconds"] == pytest.approx(budget["budget_seconds"] - 135 * 60)
+
+@pytest.mark.asyncio
+async def test_analytics_endpoints(test_db, api_client, test_service):
+    test_db.add(resolved(test_service.id, datetime.utcnow() - timedelta(hours=3), 20))
+    await test_db.commit()
+    await backfill_incident_rollups(test_db)
+
+    base = f"/api/services/{test_service.id}"
+
+    reliability = (await api_client.get(f"{base}/reliability")).json()
+    assert reliability["resolved"] == 1
+    assert reliability["mttr_seconds"] == 1200
+
+    calendar = (await api_client.get(f"{base}/downtime-calendar", params={"days": 14})).json()
+    assert len(calendar) == 14
+    assert sum(day["downtime_minutes"] for day in calendar) == 20
+
+    budget = (await api_client.get(f"{base}/sla-budget", params={"target": 99.5})).json()
+    assert budget["downtime_seconds"] == 1200
+    assert budget["burn_rate"] > 0
+
+    assert (await api_client.get(f"{base}/reliability", params={"days": 0})).status_code == 400
+    assert (await api_client.get(f"{base}/sla-budget", params={"target": 100})).status_code == 422
@@ -0,0 +1,89 @@
+import pytest
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+
+from database import HealthCheck
+from ingest import decode_batch, validate_batch, IngestFormatError, UnsupportedFormatError
+
+def ndjson(records):
+    return "\n".join(json.dumps(record) for record in records).encode()
+
+def test_validate_batch_reports_bad_lines():
+    body = ndjson([
+        {"service_id": 1, "status": "up", "timestamp": "2024-01-01T00:00:00Z", "response_time": 12.5},
+        {"service_id": 2, "status": "up"},
+        {"service_id": 1, "status": "sideways"},
+    ]) + b"\nnot json\n"
+
+    rows, rejected, errors = validate_batch(decode_batch(body, "application/x-ndjson"), {1}, 100)
+
+    assert len(rows) == 1
+    assert rows[0]["timestamp"] == datetime(2024, 1, 1)
+    assert rejected == 3
+    assert [error["line"] for error in errors] == [2, 3, 4]
+
+def test_validate_batch_limits():
+    body = ndjson([{"service_id": 1, "status": "up"}] * 3)
+
+    with pytest.raises(IngestFormatError):
+        validate_batch(decode_batch(body, "application/x-ndjson"), {1}, 2)
+    with pytest.raises(UnsupportedFormatError):
+        decode_batch(body, "text/csv")
+
+def test_epoch_timestamps():
+    body = ndjson([{"service_id": 1, "status": "down", "timestamp": 1704067200}])
+    rows, _, _ = validate_batch(decode_batch(body, None), {1}, 10)
+    assert rows[0]["timestamp"] == datetime(2024, 1, 1)
+
+def test_out_of_range_values_are_rejected_not_raised():
+    body = b"\n".join([
+        b'{"service_id": 1, "status": "up", "timestamp": 1e20}',
+        b'{"service_id": 1, "status": "up", "timestamp": Infinity}',
+        b'{"service_id": 1, "status": "up", "response_time": NaN}',
+        b'{"service_id": 1, "status": "up", "response_time": -Infinity}',
+        b'{"service_id": 1, "status": "up", "status_code": 1180591620717411303424}',
+        b'{"service_id": 1, "status": "up", "status_code": 99}',
+    ])
+    rows, rejected, errors = validate_batch(decode_batch(body, None), {1}, 10)
+    assert (rows, rejected) == ([], 6)
+    assert "out of range" in errors[0]["error"]
+    assert errors[2]["error"] == "response_time must be finite"
+    assert errors[4]["error"] == errors[5]["error"] == "status_code must be between 100 and 599"
+
+@pytest.mark.asyncio
+async def test_ingest_endpoint_is_idempotent(test_db, api_client, test_service, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "AGENT_TOKEN", "secret")
+    now = datetime.utcnow()
+    body = ndjson([
+        {"service_id": test_service.id, "status": "up", "timestamp": (now - timedelta(seconds=i)).isoformat()}
+        for i in range(500)
+    ])
+    headers = {
+        "X-Agent-Token": "secret",
+        "Content-Type": "application/x-ndjson",
+        "Idempotency-Key": "batch-1"
+    }
+
+    response = await api_client.post("/api/ingest/checks", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 500
+    assert response.json()["duplicate"] is False
+
+    response = await api_client.post("/api/ingest/checks", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["duplicate"] is True
+
+    response = await api_client.post(
+        "/api/ingest/checks",
+        content=body,
+        headers={**headers, "Content-Type": "text/csv", "Idempotency-Key": "batch-2"}
+    )
+    assert response.status_code == 415
+
+    result = await test_db.execute(
+        select(func.count(HealthCheck.id)).where(HealthCheck.service_id == test_service.id)
+    )
+    assert result.scalar_one() == 500
@@ -0,0 +1,83 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+
+from database import HealthCheck
+from latency_sketch import (
+    DDSketch, bucket_start, parse_percentiles, record_latencies, load_latency_sketch, delete_old_sketches
+)
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(5000)]
+    sketch = DDSketch(0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.95, 0.99):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= expected * 0.011
+
+def test_merge_matches_single_sketch():
+    values = [float(v) for v in range(1, 1001)]
+    whole = DDSketch()
+    parts = [DDSketch() for _ in range(4)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 4].add(value)
+
+    merged = DDSketch()
+    for part in parts:
+        merged.merge(part)
+
+    assert merged.count == whole.count
+    assert merged.quantile(0.99) == whole.quantile(0.99)
+    assert merged.mean == pytest.approx(whole.mean)
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        DDSketch(0.01).merge(DDSketch(0.02))
+
+def test_json_round_trip():
+    sketch = DDSketch()
+    for value in (0.0, 12.5, 80.0, 2500.0):
+        sketch.add(value)
+
+    restored = DDSketch.from_json(sketch.to_json())
+    assert restored.count == 4
+    assert restored.min == 0.0
+    assert restored.max == 2500.0
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+
+def test_empty_sketch():
+    assert DDSketch().quantile(0.5) is None
+
+def test_bucket_start():
+    assert bucket_start(datetime(2024, 3, 1, 13, 47, 12)) == datetime(2024, 3, 1, 13, 0)
+
+def test_parse_percentiles():
+    assert parse_percentiles("50, p95,99.9") == [50.0, 95.0, 99.9]
+    with pytest.raises(ValueError):
+        parse_percentiles("150")
+    with pytest.raises(ValueError):
+        parse_percentiles("fast")
+
+@pytest.mark.asyncio
+async def test_record_and_load(test_db, test_service):
+    now = datetime.utcnow()
+    await record_latencies(test_db, [(test_service.id, now, float(v)) for v in range(1, 101)])
+    await test_db.commit()
+    # A second write into the same bucket merges with the stored sketch
+    await record_latencies(test_db, [(test_service.id, now, 1000.0), (test_service.id, now, None)])
+    await test_db.commit()
+
+    sketch = await load_latency_sketch(test_db, test_service.id, now - timedelta(hours=1))
+    assert sketch.count == 101
+    assert sketch.max == 1000.0
+    assert sketch.quantile(0.5) == pytest.approx(51, rel=0.02)
+
+    assert await delete_old_sketches(test_db, now + timedelta(days=1)) == 1
@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import AsyncMock
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from leader import LeaderLease, leader_only
+
+@pytest.fixture
+def session_factory(test_engine):
+    return async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+@pytest.mark.asyncio
+async def test_only_one_holder(session_factory):
+    first = LeaderLease(session_factory=session_factory, holder="first")
+    second = LeaderLease(session_factory=session_factory, holder="second")
+
+    assert await first.renew() is True
+    assert await second.renew() is False
+    assert first.is_leader
+    assert not second.is_leader
+
+    assert await first.renew() is True
+
+@pytest.mark.asyncio
+async def test_release_hands_over(session_factory):
+    first = LeaderLease(session_factory=session_factory, holder="first")
+    second = LeaderLease(session_factory=session_factory, holder="second")
+
+    await first.renew()
+    await first.release()
+
+    assert not first.is_leader
+    assert await second.renew() is True
+    assert await first.renew() is False
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_taken_over(session_factory):
+    first = LeaderLease(session_factory=session_factory, holder="first", ttl=0)
+    second = LeaderLease(session_factory=session_factory, holder="second")
+
+    assert await first.renew() is True
+    assert await second.renew() is True
+    assert await first.renew() is False
+
+@pytest.mark.asyncio
+async def test_leader_only_skips_when_not_leader(session_factory):
+    lease = LeaderLease(session_factory=session_factory, holder="only")
+    job = AsyncMock(__name__="job")
+    wrapped = leader_only(lease, job)
+
+    await wrapped()
+    job.assert_not_awaited()
+
+    await lease.renew()
+    await wrapped(due_only=True)
+    job.assert_awaited_once_with(due_only=True)
+
+@pytest.mark.asyncio
+async def test_one_shot_run_needs_the_lease(session_factory):
+    from unittest.mock import patch
+    from worker import run_once
+
+    leader = LeaderLease(session_factory=session_factory, holder="leader")
+    one_shot = LeaderLease(session_factory=session_factory, holder="one-shot")
+    initialize = AsyncMock()
+
+    await leader.renew()
+    with patch('worker.run_health_checks', AsyncMock()) as sweep:
+        assert await run_once(one_shot, initialize) is False
+        initialize.assert_not_awaited()
+        sweep.assert_not_awaited()
+
+        await leader.release()
+        assert await run_once(one_shot, initialize) is True
+        sweep.assert_awaited_once()
+
+    # Released afterwards, so the regular leader picks up again right away
+    assert await leader.renew() is True
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import pytest
+
+from loop_monitor import LoopMonitor
+
+def blocking_serializer():
+    time.sleep(0.3)
+
+def test_stats_percentiles():
+    monitor = LoopMonitor()
+    for lag in range(100):
+        monitor.record(float(lag))
+
+    stats = monitor.stats()
+    assert stats["samples"] == 100
+    assert stats["lag_p50_ms"] == 50
+    assert stats["lag_p99_ms"] == 99
+    assert stats["lag_max_ms"] == 99
+    assert stats["running"] is False
+
+def test_recent_max_ignores_old_samples():
+    monitor = LoopMonitor()
+    now = time.monotonic()
+    monitor.record(500.0, now=now - 60)
+    monitor.record(3.0, now=now)
+
+    assert monitor.recent_max_ms(5) == 3.0
+    assert LoopMonitor().recent_max_ms(5) is None
+
+@pytest.mark.asyncio
+async def test_samples_scheduling_delay():
+    monitor = LoopMonitor(interval=0.01, block_threshold=1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.1)
+    finally:
+        monitor.stop()
+
+    assert monitor.stats()["samples"] > 0
+    assert monitor.stalls == 0
+
+@pytest.mark.asyncio
+async def test_blocking_call_captured_with_stack(caplog):
+    monitor = LoopMonitor(interval=0.01, block_threshold=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        blocking_serializer()
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+
+    assert monitor.stalls == 1
+    snapshot = monitor.snapshots[0]
+    assert snapshot["blocked_ms"] >= 100
+    assert any("blocking_serializer" in frame for frame in snapshot["stack"])
+    assert "Event loop blocked" in caplog.text
+    # The sampler sees the same stall as scheduling delay
+    assert monitor.max_lag_ms >= 200
+
+@pytest.mark.asyncio
+async def test_sweep_warns_when_loop_blocked(caplog, monkeypatch):
+    import monitor as monitor_module
+
+    async def blocked_sweep(due_only):
+        monitor_module.loop_monitor.stalls += 1
+
+    monkeypatch.setattr(monitor_module, "_run_health_checks", blocked_sweep)
+    monkeypatch.setattr(monitor_module.loop_monitor, "stalls", 0)
+
+    await monitor_module.run_health_checks()
+
+    assert "may be inflated" in caplog.text
@@ -166,6 +166,13 @@ async def test_run_health_checks_integration(test_db, test_service):
 
             assert len(checks) > 0
 
+            from latency_sketch import load_latency_sketch
+            sketch = await load_latency_sketch(test_db, test_service.id, datetime.utcnow() - timedelta(hours=1))
+            assert sketch.count == 1
+
+            await test_db.refresh(test_service)
+            assert test_service.data_version == 1
+
 @pytest.mark.asyncio
 async def test_cleanup_old_checks(test_db, test_service):
     old_check = HealthCheck(
@@ -190,3 +197,245 @@ async def test_cleanup_old_checks(test_db, test_service):
         checks = result.scalars().all()
 
         assert len(checks) == 0
+
+        await test_db.refresh(test_service)
+        assert test_service.data_version == 1
+
+@pytest.mark.asyncio
+async def test_check_http_service_head_mode():
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+
+    with patch('httpx.AsyncClient') as mock_client:
+        client = mock_client.return_value.__aenter__.return_value
+        client.head = AsyncMock(return_value=mock_response)
+        client.get = AsyncMock()
+
+        status, response_time, status_code, error = await check_http_service(
+            "https://example.com", probe_mode="head"
+        )
+
+        assert status == "up"
+        assert status_code == 200
+        client.head.assert_awaited_once()
+        client.get.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_check_http_service_head_falls_back_to_stream():
+    head_response = MagicMock()
+    head_response.status_code = 405
+
+    stream_response = MagicMock()
+    stream_response.status_code = 200
+
+    with patch('httpx.AsyncClient') as mock_client:
+        client = mock_client.return_value.__aenter__.return_value
+        client.head = AsyncMock(return_value=head_response)
+        client.stream = MagicMock()
+        client.stream.return_value.__aenter__.return_value = stream_response
+
+        status, _, status_code, _ = await check_http_service(
+            "https://example.com", probe_mode="head"
+        )
+
+        assert status == "up"
+        assert status_code == 200
+        client.stream.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_check_http_service_stream_stops_at_body_cap():
+    chunks_read = []
+
+    async def aiter_raw():
+        for i in range(100):
+            chunks_read.append(i)
+            yield b"x" * 1024
+
+    stream_response = MagicMock()
+    stream_response.status_code = 200
+    stream_response.aiter_raw = aiter_raw
+
+    with patch('httpx.AsyncClient') as mock_client:
+        client = mock_client.return_value.__aenter__.return_value
+        client.stream = MagicMock()
+        client.stream.return_value.__aenter__.return_value = stream_response
+
+        status, _, status_code, _ = await check_http_service(
+            "https://example.com", probe_mode="stream", max_body_bytes=4096
+        )
+
+        assert status == "up"
+        assert status_code == 200
+        assert len(chunks_read) == 4
+
+def test_get_probe_options_defaults():
+    from monitor import get_probe_options
+
+    service = Service(name="Probe", url="https://example.com", check_type="http", expected_status="200")
+    assert get_probe_options(service) == ("get", 0)
+
+    service.probe_mode = "stream"
+    service.max_body_bytes = 1024
+    assert get_probe_options(service) == ("stream", 1024)
+
+    service.probe_mode = "bogus"
+    assert get_probe_options(service)[0] == "get"
+
+@pytest.mark.asyncio
+async def test_confirm_health_check_discards_transient_failure(test_service):
+    from monitor import confirm_health_check
+
+    failed = HealthCheck(service_id=test_service.id, timestamp=datetime.utcnow(), status="down")
+    recovered = HealthCheck(service_id=test_service.id, timestamp=datetime.utcnow(), status="up")
+
+    with patch('monitor.perform_health_check', AsyncMock(return_value=recovered)) as reprobe:
+        check = await confirm_health_check(test_service, failed)
+
+        assert check is recovered
+        reprobe.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_confirm_health_check_escalates_timeout(test_service):
+    from monitor import confirm_health_check
+    from config import settings
+
+    failed = HealthCheck(service_id=test_service.id, timestamp=datetime.utcnow(), status="down")
+
+    with patch('monitor.perform_health_check', AsyncMock(return_value=failed)) as reprobe:
+        check = await confirm_health_check(test_service, failed)
+
+        assert check.status == "down"
+        timeouts = [call.args[1] for call in reprobe.await_args_list]
+        assert len(timeouts) == settings.CONFIRM_RETRIES
+        assert timeouts == [settings.CONFIRM_TIMEOUT, settings.CONFIRM_TIMEOUT * settings.CONFIRM_TIMEOUT_ESCALATION]
+        assert max(timeouts) <= settings.TIMEOUT
+
+@pytest.mark.asyncio
+async def test_confirm_health_check_timeout_is_capped(test_service, monkeypatch):
+    from monitor import confirm_health_check
+    from config import settings
+
+    monkeypatch.setattr(settings, "CONFIRM_RETRIES", 4)
+    monkeypatch.setattr(settings, "CONFIRM_TIMEOUT", 4)
+    failed = HealthCheck(service_id=test_service.id, timestamp=datetime.utcnow(), status="down")
+
+    with patch('monitor.perform_health_check', AsyncMock(return_value=failed)) as reprobe:
+        await confirm_health_check(test_service, failed)
+
+    assert [call.args[1] for call in reprobe.await_args_list] == [4, 6, 9, settings.TIMEOUT]
+
+@pytest.mark.asyncio
+async def test_incident_waits_for_consecutive_failures(test_db, test_service, monkeypatch):
+    from config import settings
+    from sqlalchemy import select
+
+    monkeypatch.setattr(settings, "CONFIRM_CONSECUTIVE_FAILURES", 2)
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            side_effect=httpx.ConnectError("Connection failed")
+        )
+        with patch('monitor.AsyncSessionLocal') as mock_session:
+            mock_session.return_value.__aenter__.return_value = test_db
+
+            await run_health_checks()
+            result = await test_db.execute(
+                select(Incident).where(Incident.service_id == test_service.id)
+            )
+            assert result.scalar_one_or_none() is None
+
+            await run_health_checks()
+            result = await test_db.execute(
+                select(Incident).where(Incident.service_id == test_service.id)
+            )
+            incident = result.scalar_one()
+
+            result = await test_db.execute(
+                select(HealthCheck)
+                .where(HealthCheck.service_id == test_service.id)
+                .order_by(HealthCheck.timestamp)
+            )
+            first_check = result.scalars().first()
+
+            assert incident.status == "ongoing"
+            assert incident.started_at == first_check.timestamp
+
+@pytest.mark.asyncio
+async def test_cleanup_purges_expired_records(test_db, test_service):
+    from sqlalchemy import select
+    from database import SloAlert, NotificationOutbox, IngestBatch, AgentReport
+
+    now = datetime.utcnow()
+    old = now - timedelta(days=35)
+
+    def outbox(status, created_at):
+        return NotificationOutbox(sink="ops", created_at=created_at, event="{}", status=status, attempts=1, next_attempt_at=created_at)
+
+    def alert(timestamp, rule, state):
+        return SloAlert(
+            service_id=test_service.id, timestamp=timestamp, severity="page", rule=rule, state=state,
+            burn_rate=20.0, threshold=14.4, slo_target=99.9
+        )
+
+    test_db.add_all([
+        outbox("sent", old),
+        outbox("failed", old),
+        outbox("pending", old),
+        outbox("sent", now),
+        alert(old - timedelta(hours=1), "1h/5m", "firing"),
+        alert(old, "1h/5m", "resolved"),
+        alert(old, "6h/30m", "firing"),
+        IngestBatch(key="old", received_at=old, accepted=1, rejected=0),
+        IngestBatch(key="new", received_at=now, accepted=1, rejected=0),
+        AgentReport(service_id=test_service.id, agent="gone", timestamp=old, status="up"),
+        AgentReport(service_id=test_service.id, agent="eu", timestamp=now, status="up"),
+    ])
+    await test_db.commit()
+
+    with patch('monitor.AsyncSessionLocal') as mock_session:
+        mock_session.return_value.__aenter__.return_value = test_db
+        await cleanup_old_checks()
+
+    result = await test_db.execute(select(NotificationOutbox.status, NotificationOutbox.created_at).order_by(NotificationOutbox.id))
+    assert result.all() == [("pending", old), ("sent", now)]
+
+    # Each rule's latest alert survives, so a firing one can still resolve
+    result = await test_db.execute(select(SloAlert.rule, SloAlert.state).order_by(SloAlert.id))
+    assert result.all() == [("1h/5m", "resolved"), ("6h/30m", "firing")]
+
+    result = await test_db.execute(select(IngestBatch.key))
+    assert result.scalars().all() == ["new"]
+    result = await test_db.execute(select(AgentReport.agent))
+    assert result.scalars().all() == ["eu"]
+
+@pytest.mark.asyncio
+async def test_sweep_records_check_interval(test_db, test_service, test_service_down, monkeypatch):
+    from config import settings
+    from adaptive_schedule import AdaptiveScheduler
+    from sqlalchemy import select
+
+    monkeypatch.setattr(settings, "CONFIRM_RETRY_DELAY", 0)
+    monkeypatch.setattr("monitor.check_schedule", AdaptiveScheduler.from_settings())
+
+    async def probe(url, *args):
+        if url == test_service.url:
+            return "up", 50.0, 200, None
+        return "down", None, None, "Connection refused"
+
+    with patch('monitor.check_http_service', side_effect=probe), \
+            patch('monitor.notification_dispatcher'), \
+            patch('monitor.AsyncSessionLocal') as mock_session:
+        mock_session.return_value.__aenter__.return_value = test_db
+        monkeypatch.setattr(settings, "ADAPTIVE_SCHEDULING", True)
+        await run_health_checks()
+        monkeypatch.setattr(settings, "ADAPTIVE_SCHEDULING", False)
+        await run_health_checks()
+
+    result = await test_db.execute(select(HealthCheck.service_id, HealthCheck.interval_seconds).order_by(HealthCheck.id))
+    intervals = {}
+    for service_id, interval in result.all():
+        intervals.setdefault(service_id, []).append(interval)
+
+    # A failing service is due again at the fast interval, so its check covers only that long
+    assert intervals[test_service_down.id] == [settings.MIN_CHECK_INTERVAL, settings.CHECK_INTERVAL]
+    assert intervals[test_service.id] == [settings.CHECK_INTERVAL, settings.CHECK_INTERVAL]
@@ -0,0 +1,201 @@
+import asyncio
+from datetime import datetime
+import json
+import sys
+import pytest
+import httpx
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from config import settings
+from database import NotificationOutbox
+from notifications import (
+    Sink, WebhookSink, ScriptSink, SmtpSink, NotificationDispatcher, NotificationConfigError,
+    build_sink, enqueue_notification, retry_delay
+)
+
+class StubSink(Sink):
+    def __init__(self, name="stub", fail=0, delay=0):
+        super().__init__(name)
+        self.batches = []
+        self.fail = fail
+        self.delay = delay
+
+    async def send(self, events):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("sink unavailable")
+        self.batches.append(events)
+
+@pytest.fixture
+def fast_notify(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFY_COALESCE_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "NOTIFY_RETRY_BASE", 0)
+
+@pytest.fixture
+def session_factory(test_engine):
+    return async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def outbox(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(select(NotificationOutbox).order_by(NotificationOutbox.id))
+        return result.scalars().all()
+
+async def settle(dispatcher, rounds=20):
+    for _ in range(rounds):
+        await asyncio.sleep(0.02)
+        if not dispatcher._in_flight:
+            return
+
+def test_build_sink():
+    assert isinstance(build_sink({"name": "hook", "type": "webhook", "url": "http://x"}), WebhookSink)
+    smtp = build_sink({
+        "name": "mail", "type": "smtp", "host": "localhost", "sender": "a@x", "recipients": "b@x, c@x", "starttls": "true"
+    })
+    assert smtp.recipients == ["b@x", "c@x"] and smtp.starttls
+    with pytest.raises(NotificationConfigError):
+        build_sink({"name": "x", "type": "pigeon"})
+    with pytest.raises(NotificationConfigError):
+        build_sink({"name": "x", "type": "webhook"})
+
+def test_retry_delay_backs_off(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFY_RETRY_BASE", 5)
+    monkeypatch.setattr(settings, "NOTIFY_RETRY_MAX", 60)
+    assert [retry_delay(n) for n in (1, 2, 3, 5)] == [5, 10, 20, 60]
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_and_deduplicated(fast_notify, test_db, session_factory):
+    sink = StubSink()
+    dispatcher = NotificationDispatcher([sink], session_factory)
+
+    for service_id in range(5):
+        enqueue_notification(test_db, {"message": f"svc {service_id} down", "dedup_key": f"incident:{service_id}"}, ["stub"])
+    enqueue_notification(test_db, {"message": "svc 0 down", "dedup_key": "incident:0"}, ["stub"])
+    await test_db.commit()
+
+    assert await dispatcher.poll() == 6
+    # Already queued rows aren't queued twice
+    assert await dispatcher.poll() == 0
+    await settle(dispatcher)
+    await dispatcher.stop()
+
+    assert len(sink.batches) == 1
+    assert [event["message"] for event in sink.batches[0]] == [f"svc {i} down" for i in range(5)]
+    assert {row.status for row in await outbox(session_factory)} == {"sent"}
+
+@pytest.mark.asyncio
+async def test_failed_send_is_retried_then_given_up(fast_notify, monkeypatch, test_db, session_factory):
+    monkeypatch.setattr(settings, "NOTIFY_MAX_ATTEMPTS", 3)
+    sink = StubSink(fail=1)
+    dispatcher = NotificationDispatcher([sink], session_factory)
+
+    enqueue_notification(test_db, {"message": "down"}, ["stub"])
+    await test_db.commit()
+
+    await dispatcher.poll()
+    await settle(dispatcher)
+    row = (await outbox(session_factory))[0]
+    assert (row.status, row.attempts, row.last_error) == ("pending", 1, "sink unavailable")
+
+    await dispatcher.poll()
+    await settle(dispatcher)
+    row = (await outbox(session_factory))[0]
+    assert (row.status, row.attempts) == ("sent", 2)
+
+    sink.fail = 10
+    enqueue_notification(test_db, {"message": "again"}, ["stub"])
+    await test_db.commit()
+    for _ in range(3):
+        await dispatcher.poll()
+        await settle(dispatcher)
+    await dispatcher.stop()
+    assert (await outbox(session_factory))[1].status == "failed"
+
+@pytest.mark.asyncio
+async def test_wake_keeps_poll_task_until_done(fast_notify):
+    dispatcher = NotificationDispatcher([StubSink()])
+    dispatcher.poll = AsyncMock(side_effect=RuntimeError("database unavailable"))
+
+    with patch('notifications.logger') as log:
+        dispatcher.wake()
+        assert len(dispatcher._wake_tasks) == 1
+        await asyncio.sleep(0.01)
+
+    assert not dispatcher._wake_tasks
+    assert "database unavailable" in log.error.call_args.args[0]
+
+@pytest.mark.asyncio
+async def test_slo_recovery_is_only_sent_if_firing_was(test_db, test_service):
+    from monitor import record_slo_alerts
+    from slo import SloEvent
+
+    def event(state):
+        return SloEvent(test_service.id, test_service.name, "page", "1h/5m", state, 20.0, 14.4, 99.9, datetime.utcnow())
+
+    with patch('monitor.enqueue_notification') as notify:
+        await record_slo_alerts(test_db, [event("firing")], linked=True)
+        await record_slo_alerts(test_db, [event("resolved")], linked=False)
+        assert not notify.called
+
+        await record_slo_alerts(test_db, [event("firing")], linked=False)
+        await record_slo_alerts(test_db, [event("resolved")], linked=True)
+        assert [call.args[1]["state"] for call in notify.call_args_list] == ["firing", "resolved"]
+
+@pytest.mark.asyncio
+async def test_slow_sink_does_not_block_sweep(fast_notify, test_db, test_service, test_incident, session_factory):
+    from monitor import run_health_checks
+
+    sink = StubSink(delay=5)
+    dispatcher = NotificationDispatcher([sink], session_factory)
+    mock_response = MagicMock(status_code=200)
+
+    with patch('monitor.notification_dispatcher', dispatcher), patch('notifications.dispatcher', dispatcher):
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+            with patch('monitor.AsyncSessionLocal') as mock_session:
+                mock_session.return_value.__aenter__.return_value = test_db
+                await asyncio.wait_for(run_health_checks(), timeout=2)
+
+        await asyncio.sleep(0.1)
+        assert dispatcher._in_flight
+
+    await dispatcher.stop()
+    events = [json.loads(row.event) for row in await outbox(session_factory)]
+    assert [(event["kind"], event["state"]) for event in events] == [("incident", "resolved")]
+
+@pytest.mark.asyncio
+async def test_webhook_sink_posts_batch():
+    received = []
+
+    def handler(request):
+        received.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    sink = WebhookSink("hook", "http://hooks.test/x", transport=httpx.MockTransport(handler))
+    await sink.send([{"message": "a is down"}, {"message": "b is down"}])
+    assert len(received[0]["events"]) == 2
+    assert received[0]["text"] == "a is down\nb is down"
+
+    failing = WebhookSink("hook", "http://hooks.test/x", transport=httpx.MockTransport(lambda r: httpx.Response(500)))
+    with pytest.raises(httpx.HTTPStatusError):
+        await failing.send([{"message": "x"}])
+
+@pytest.mark.asyncio
+async def test_script_sink(tmp_path):
+    output = tmp_path / "events.json"
+    script = f"import sys; open({str(output)!r}, 'w').write(sys.stdin.read())"
+    sink = ScriptSink("script", f"{sys.executable} -c {json.dumps(script)}")
+    await sink.send([{"message": "down"}])
+    assert json.loads(output.read_text())["events"] == [{"message": "down"}]
+
+    with pytest.raises(RuntimeError):
+        await ScriptSink("fail", f"{sys.executable} -c 'import sys; sys.exit(3)'").send([{}])
+
+def test_smtp_message():
+    sink = SmtpSink("mail", host="localhost", sender="status@x", recipients=["ops@x"])
+    message = sink.build_message([{"message": "a is down"}, {"message": "b is down"}])
+    assert message["Subject"] == "a is down (+1 more)"
+    assert "b is down" in message.get_content()
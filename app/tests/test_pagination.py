@@ -0,0 +1,89 @@
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient, ASGITransport
+
+from database import HealthCheck, Incident, get_db
+from pagination import encode_cursor, decode_cursor, CursorError
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor")
+
+async def walk(client, path, **params):
+    pages = []
+    cursor = None
+    while True:
+        response = await client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+        assert 'rel="next"' in response.headers["link"]
+
+@pytest.mark.asyncio
+async def test_history_pages_cover_every_check(api_client, test_db, test_service):
+    now = datetime.utcnow().replace(microsecond=0)
+    for i in range(25):
+        # Pairs share a timestamp so the id tie-breaker matters
+        test_db.add(HealthCheck(service_id=test_service.id, timestamp=now - timedelta(minutes=i // 2), status="up"))
+    await test_db.commit()
+
+    path = f"/api/services/{test_service.id}/history"
+    everything = (await api_client.get(path)).json()
+
+    for response_format in ("model", "fast"):
+        pages = await walk(api_client, path, limit=10, format=response_format)
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert [row["id"] for page in pages for row in page] == [row["id"] for row in everything]
+
+@pytest.mark.asyncio
+async def test_incident_pages(api_client, test_db, test_service):
+    now = datetime.utcnow()
+    for i in range(7):
+        test_db.add(Incident(
+            service_id=test_service.id,
+            started_at=now - timedelta(hours=i),
+            status="resolved"
+        ))
+    await test_db.commit()
+
+    pages = await walk(api_client, "/api/incidents", limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    started = [incident["started_at"] for page in pages for incident in page]
+    assert started == sorted(started, reverse=True)
+
+@pytest.mark.asyncio
+async def test_invalid_cursor(api_client, test_service):
+    response = await api_client.get("/api/incidents", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_cursor_headers_are_exposed_cross_origin(test_db, test_service):
+    from main import app
+
+    for i in range(3):
+        test_db.add(HealthCheck(service_id=test_service.id, timestamp=datetime.utcnow() - timedelta(minutes=i), status="up"))
+    await test_db.commit()
+
+    async def override_get_db():
+        yield test_db
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(
+                f"/api/services/{test_service.id}/history",
+                params={"limit": 2},
+                headers={"Origin": "https://status.kadenbilyeu.com"}
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.headers["access-control-allow-origin"] == "https://status.kadenbilyeu.com"
+    exposed = {header.strip().lower() for header in response.headers["access-control-expose-headers"].split(",")}
+    assert {"x-next-cursor", "link", "etag"} <= exposed
+    assert response.headers["x-next-cursor"]
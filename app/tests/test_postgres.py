@@ -0,0 +1,123 @@
+"""PostgreSQL backend tests.
+
+Uses TEST_POSTGRES_URL when set, otherwise starts a throwaway cluster with the
+local initdb/pg_ctl binaries. Skipped when neither is available.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from database import (
+    Service,
+    HealthCheck,
+    create_schema,
+    ensure_partitions,
+    drop_expired_partitions,
+    engine_options
+)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def postgres_url(tmp_path_factory):
+    pytest.importorskip("asyncpg")
+
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+
+    initdb = shutil.which("initdb")
+    pg_ctl = shutil.which("pg_ctl")
+    if not initdb or not pg_ctl:
+        pytest.skip("PostgreSQL binaries not available and TEST_POSTGRES_URL not set")
+
+    data_dir = tmp_path_factory.mktemp("postgres")
+    port = _free_port()
+    subprocess.run(
+        [initdb, "-D", str(data_dir), "-U", "postgres", "-A", "trust"],
+        check=True,
+        capture_output=True
+    )
+    subprocess.run(
+        [
+            pg_ctl, "-D", str(data_dir), "-l", str(data_dir / "server.log"), "-w",
+            "-o", f"-p {port} -h 127.0.0.1 -k {data_dir}", "start"
+        ],
+        check=True,
+        capture_output=True
+    )
+
+    yield f"postgresql+asyncpg://postgres@127.0.0.1:{port}/postgres"
+
+    subprocess.run([pg_ctl, "-D", str(data_dir), "-m", "fast", "stop"], capture_output=True)
+
+@pytest.fixture
+async def pg_engine(postgres_url):
+    engine = create_async_engine(postgres_url, **engine_options(postgres_url))
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+        await create_schema(conn)
+
+    yield engine
+
+    await engine.dispose()
+
+def test_engine_options_only_pool_server_databases():
+    assert engine_options("sqlite+aiosqlite:///./status.db") == {}
+
+    options = engine_options("postgresql+asyncpg://localhost/status")
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] > 0
+
+@pytest.mark.asyncio
+async def test_health_checks_is_partitioned(pg_engine):
+    async with pg_engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT partstrat FROM pg_partitioned_table "
+            "JOIN pg_class ON pg_class.oid = partrelid WHERE relname = 'health_checks'"
+        ))
+        assert result.scalar_one() == "r"
+
+        now = datetime.utcnow()
+        result = await conn.execute(text(
+            "SELECT count(*) FROM pg_class WHERE relname = :name"
+        ), {"name": f"health_checks_p{now:%Y%m}"})
+        assert result.scalar_one() == 1
+
+@pytest.mark.asyncio
+async def test_orm_roundtrip_and_partition_drop(pg_engine):
+    session_factory = async_sessionmaker(pg_engine, class_=AsyncSession, expire_on_commit=False)
+    old_month = datetime(2020, 1, 15)
+
+    async with pg_engine.begin() as conn:
+        await conn.run_sync(ensure_partitions, old_month, 0)
+
+    async with session_factory() as db:
+        service = Service(name="PG", url="https://pg.example.com", check_type="http", expected_status="200")
+        db.add(service)
+        await db.commit()
+
+        db.add_all([
+            HealthCheck(service_id=service.id, timestamp=old_month, status="up"),
+            HealthCheck(service_id=service.id, timestamp=datetime.utcnow(), status="up"),
+        ])
+        await db.commit()
+
+    async with pg_engine.begin() as conn:
+        dropped = await conn.run_sync(drop_expired_partitions, datetime.utcnow() - timedelta(days=30))
+        assert dropped == ["health_checks_p202001"]
+
+    async with session_factory() as db:
+        result = await db.execute(select(func.count(HealthCheck.id)))
+        assert result.scalar_one() == 1
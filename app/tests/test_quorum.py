@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+from datetime import datetime, timedelta
+from sqlalchemy import select
+import httpx
+
+from database import AgentReport, HealthCheck, Incident
+from quorum import quorum_status, record_agent_results, load_agent_votes
+from monitor import run_health_checks
+
+def test_quorum_status_single_probe_unchanged():
+    assert quorum_status("up", [], 1) == ("up", None)
+    assert quorum_status("down", [], 1) == ("down", None)
+    assert quorum_status("degraded", [], 1) == ("degraded", None)
+
+def test_quorum_status_requires_agreement():
+    votes = [("agent-1", "up"), ("agent-2", "up")]
+    status, summary = quorum_status("down", votes, 2)
+    assert status == "degraded"
+    assert summary == "Down from 1/3 probes: local"
+
+    votes = [("agent-1", "down"), ("agent-2", "up")]
+    status, summary = quorum_status("down", votes, 2)
+    assert status == "down"
+    assert "2/3" in summary
+
+    status, _ = quorum_status("up", [("agent-1", "down"), ("agent-2", "down")], 2)
+    assert status == "down"
+
+def test_quorum_status_defaults_to_majority():
+    # One remote down vote can't override the local up
+    assert quorum_status("up", [("agent-1", "down")], 0)[0] == "degraded"
+    assert quorum_status("down", [("agent-1", "down")], 0)[0] == "down"
+    assert quorum_status("down", [("agent-1", "up"), ("agent-2", "up")], 0)[0] == "degraded"
+    assert quorum_status("up", [("agent-1", "down"), ("agent-2", "down")], 0)[0] == "down"
+    assert quorum_status("down", [], 0) == ("down", None)
+
+@pytest.mark.asyncio
+async def test_record_agent_results_keeps_latest(test_db, test_service):
+    now = datetime.utcnow()
+    results = [
+        {"service_id": test_service.id, "timestamp": now - timedelta(seconds=30), "status": "up"},
+        {"service_id": test_service.id, "timestamp": now, "status": "down"},
+    ]
+
+    assert await record_agent_results(test_db, "agent-1", results) == 1
+    await test_db.commit()
+
+    stale = [{"service_id": test_service.id, "timestamp": now - timedelta(seconds=60), "status": "up"}]
+    assert await record_agent_results(test_db, "agent-1", stale) == 0
+    await test_db.commit()
+
+    votes = await load_agent_votes(test_db, [test_service.id])
+    assert votes == {test_service.id: [("agent-1", "down")]}
+
+@pytest.mark.asyncio
+async def test_agent_ingest_requires_token(api_client, test_service, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "AGENT_TOKEN", "secret")
+
+    response = await api_client.post("/api/agents/a1/results", json={"results": []})
+    assert response.status_code == 401
+
+    response = await api_client.post(
+        "/api/agents/a1/results",
+        json={"results": []},
+        headers={"X-Agent-Token": "secret"}
+    )
+    assert response.status_code == 200
+
+async def report_from_agents(transport, service_id, statuses):
+    from agent import ProbeAgent
+
+    for i, status in enumerate(statuses):
+        agent = ProbeAgent("http://central", f"agent-{i}", "secret", transport=transport)
+        check = HealthCheck(service_id=service_id, timestamp=datetime.utcnow(), status=status)
+        with patch('agent.perform_health_check', AsyncMock(return_value=check)):
+            await agent.run_once()
+        assert not agent.pending
+        await agent.close()
+
+async def run_local_sweep_down(test_db):
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.__aenter__.return_value.get = AsyncMock(
+            side_effect=httpx.ConnectError("Connection failed")
+        )
+        with patch('monitor.AsyncSessionLocal') as mock_session:
+            mock_session.return_value.__aenter__.return_value = test_db
+
+            await run_health_checks()
+
+@pytest.mark.asyncio
+async def test_agents_reach_quorum(test_db, api_transport, test_service, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "AGENT_TOKEN", "secret")
+    monkeypatch.setattr(settings, "QUORUM_DOWN", 2)
+
+    # Only this instance sees the service down: not enough for an incident
+    await report_from_agents(api_transport, test_service.id, ["up", "up", "up"])
+    await run_local_sweep_down(test_db)
+
+    result = await test_db.execute(select(HealthCheck).where(HealthCheck.service_id == test_service.id))
+    check = result.scalars().all()[-1]
+    assert check.status == "degraded"
+    assert check.error_message.endswith("Down from 1/4 probes: local")
+
+    result = await test_db.execute(select(Incident).where(Incident.service_id == test_service.id))
+    assert result.scalar_one_or_none() is None
+
+    # A second probe agrees
+    await report_from_agents(api_transport, test_service.id, ["down", "up", "up"])
+    await run_local_sweep_down(test_db)
+
+    result = await test_db.execute(select(Incident).where(Incident.service_id == test_service.id))
+    assert result.scalar_one().status == "ongoing"
@@ -0,0 +1,174 @@
+import json
+import os
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database import Service, ServiceDomain
+from reconcile import (
+    diff_services,
+    reconcile_services,
+    load_service_config,
+    ServiceConfigError,
+    ServicesFileWatcher
+)
+
+def config(name, url, **extra):
+    return {"name": name, "url": url, "check_type": "http", "expected_status": "200", **extra}
+
+def test_diff_services():
+    existing = [
+        Service(id=1, name="Same", url="https://same", check_type="http", expected_status="200", enabled=True),
+        Service(id=2, name="Old name", url="https://renamed", check_type="http", expected_status="200", enabled=True),
+        Service(id=3, name="Gone", url="https://gone", check_type="http", expected_status="200", enabled=True),
+    ]
+    configs = [
+        config("Same", "https://same"),
+        config("New name", "https://renamed", domains="a.com"),
+        config("Added", "https://added"),
+    ]
+
+    to_add, to_update, to_disable = diff_services(existing, configs)
+
+    assert [c["url"] for c in to_add] == ["https://added"]
+    assert [(s.id, changes) for s, changes in to_update] == [(2, {"name": "New name", "domains": "a.com"})]
+    assert [s.id for s in to_disable] == [3]
+
+@pytest.mark.asyncio
+async def test_reconcile_services_updates_url_in_place(test_db, test_service):
+    service_id = test_service.id
+
+    summary = await reconcile_services(test_db, [config(test_service.name, "https://moved.example.com")])
+    assert summary == {"added": 0, "updated": 1, "disabled": 0}
+
+    result = await test_db.execute(select(Service))
+    services = result.scalars().all()
+    assert [(s.id, s.url, s.enabled) for s in services] == [(service_id, "https://moved.example.com", True)]
+
+@pytest.mark.asyncio
+async def test_reconcile_services_applies_diff(test_db, test_service):
+    summary = await reconcile_services(test_db, [
+        config("Added", "https://added.example.com", domains="a.com"),
+    ])
+    assert summary == {"added": 1, "updated": 0, "disabled": 1}
+
+    await test_db.refresh(test_service)
+    assert test_service.enabled is False
+
+    result = await test_db.execute(select(ServiceDomain.domain))
+    assert result.scalars().all() == ["a.com"]
+
+    # Back in config: same row is re-enabled, so history and ids carry over
+    summary = await reconcile_services(test_db, [
+        config("Added", "https://added.example.com", domains="a.com"),
+        config(test_service.name, test_service.url),
+    ])
+    assert summary == {"added": 0, "updated": 1, "disabled": 0}
+    await test_db.refresh(test_service)
+    assert test_service.enabled is True
+
+    assert await reconcile_services(test_db, [
+        config("Added", "https://added.example.com", domains="a.com"),
+        config(test_service.name, test_service.url),
+    ]) == {"added": 0, "updated": 0, "disabled": 0}
+
+def test_load_service_config_validates(tmp_path, monkeypatch):
+    from config import settings
+
+    path = tmp_path / "services.json"
+    monkeypatch.setattr(settings, "SERVICES_FILE", str(path))
+
+    path.write_text(json.dumps([{"name": "No URL"}]))
+    with pytest.raises(ServiceConfigError):
+        load_service_config()
+
+    path.write_text(json.dumps([config("A", "https://a"), config("B", "https://a")]))
+    with pytest.raises(ServiceConfigError):
+        load_service_config()
+
+    path.write_text(json.dumps([config("A", "https://a"), config("A", "https://b")]))
+    with pytest.raises(ServiceConfigError, match="Duplicate service name"):
+        load_service_config()
+
+    path.write_text(json.dumps([config("A", "https://a")]))
+    assert load_service_config()[0]["name"] == "A"
+
+    path.write_text(json.dumps([config("A", "https://a", depends_on="B")]))
+    with pytest.raises(ServiceConfigError, match="unknown service"):
+        load_service_config()
+
+    path.write_text(json.dumps([config("A", "https://a", depends_on="B"), config("B", "https://b", depends_on="https://a")]))
+    with pytest.raises(ServiceConfigError, match="cycle"):
+        load_service_config()
+
+@pytest.mark.asyncio
+async def test_services_file_watcher_reloads_on_change(tmp_path, monkeypatch, test_engine):
+    from config import settings
+
+    path = tmp_path / "services.json"
+    path.write_text(json.dumps([config("A", "https://a.example.com")]))
+    monkeypatch.setattr(settings, "SERVICES_FILE", str(path))
+
+    session_factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    watcher = ServicesFileWatcher(str(path))
+
+    assert await watcher.check(session_factory) == {"added": 1, "updated": 0, "disabled": 0}
+    assert await watcher.check(session_factory) is None
+
+    path.write_text(json.dumps([config("A renamed", "https://a.example.com")]))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert await watcher.check(session_factory) == {"added": 0, "updated": 1, "disabled": 0}
+
+@pytest.mark.asyncio
+async def test_services_file_watcher_retries_failed_reload(tmp_path, monkeypatch, test_engine):
+    from config import settings
+
+    path = tmp_path / "services.json"
+    path.write_text("not json")
+    monkeypatch.setattr(settings, "SERVICES_FILE", str(path))
+
+    session_factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    watcher = ServicesFileWatcher(str(path))
+
+    assert await watcher.check(session_factory) is None
+
+    # Fixed without the mtime changing (e.g. within its resolution)
+    stat = os.stat(path)
+    path.write_text(json.dumps([config("A", "https://a.example.com")]))
+    os.utime(path, (stat.st_atime, stat.st_mtime))
+
+    assert await watcher.check(session_factory) == {"added": 1, "updated": 0, "disabled": 0}
+    assert await watcher.check(session_factory) is None
+
+@pytest.mark.asyncio
+async def test_admin_reload_endpoint(test_db, api_client, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin")
+    monkeypatch.setattr(settings, "SERVICES", [config("Only", "https://only.example.com")])
+
+    response = await api_client.post("/api/admin/reload-services")
+    assert response.status_code == 401
+
+    response = await api_client.post("/api/admin/reload-services", headers={"X-Admin-Token": "admin"})
+    assert response.status_code == 200
+    assert response.json() == {"added": 1, "updated": 0, "disabled": 0}
+
+@pytest.mark.asyncio
+async def test_reload_drops_removed_services_from_listings(test_db, api_client, test_service, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin")
+    monkeypatch.setattr(settings, "SERVICES", [config("Only", "https://only.example.com")])
+
+    response = await api_client.post("/api/admin/reload-services", headers={"X-Admin-Token": "admin"})
+    assert response.json() == {"added": 1, "updated": 0, "disabled": 1}
+
+    for params in ({}, {"format": "fast"}):
+        response = await api_client.get("/api/services", params=params)
+        assert [service["name"] for service in response.json()] == ["Only"]
+
+    response = await api_client.get("/api/stats")
+    assert test_service.id not in [stats["service_id"] for stats in response.json()]
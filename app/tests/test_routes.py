@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, patch
 from sqlalchemy import select
 
-from routes import calculate_uptime, router
+from routes import calculate_uptime, window_check_stats, router
 from database import Service, HealthCheck, Incident
 
 @pytest.mark.asyncio
@@ -39,6 +39,25 @@ async def test_calculate_uptime_partial(test_db, test_service):
     uptime = await calculate_uptime(test_db, test_service.id, 24)
     assert 40.0 <= uptime <= 60.0
 
+@pytest.mark.asyncio
+async def test_uptime_is_weighted_by_check_interval(test_db, test_service):
+    # Adaptive scheduling: six down checks 10s apart, then a healthy hour at 300s
+    now = datetime.utcnow()
+    for i in range(6):
+        test_db.add(HealthCheck(service_id=test_service.id, timestamp=now - timedelta(minutes=70, seconds=-10 * i), status="down", interval_seconds=10))
+    for i in range(12):
+        test_db.add(HealthCheck(service_id=test_service.id, timestamp=now - timedelta(minutes=5 * i), status="up", response_time=50.0, interval_seconds=300))
+    await test_db.commit()
+
+    # 60s down out of 3660s, not 6 checks out of 18
+    expected = 3600 / 3660 * 100
+    assert await calculate_uptime(test_db, test_service.id, 24) == pytest.approx(expected)
+
+    stats = await window_check_stats(test_db, [test_service.id], [24])
+    total, up, _, uptime = stats[(test_service.id, 24)]
+    assert (total, up) == (18, 12)
+    assert uptime == pytest.approx(expected)
+
 @pytest.mark.asyncio
 async def test_calculate_uptime_no_data(test_db, test_service):
     uptime = await calculate_uptime(test_db, test_service.id, 24)
@@ -140,6 +159,81 @@ async def test_get_service_stats(test_db, test_service):
         assert data["failed_checks"] == 2
         assert data["uptime_percentage"] == 80.0
 
+@pytest.mark.asyncio
+async def test_get_service_stats_percentiles(test_db, api_client, test_service):
+    from latency_sketch import record_latencies
+
+    now = datetime.utcnow()
+    await record_latencies(test_db, [(test_service.id, now, float(ms)) for ms in range(1, 101)])
+    await test_db.commit()
+
+    response = await api_client.get(f"/api/services/{test_service.id}/stats?percentiles=50,99.9")
+    assert response.status_code == 200
+    percentiles = response.json()["percentiles"]
+    assert set(percentiles) == {"p50", "p99.9"}
+    assert percentiles["p50"] == pytest.approx(50, rel=0.02)
+
+    response = await api_client.get(f"/api/services/{test_service.id}/stats?percentiles=101")
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_batch_stats(test_db, api_client, test_service, test_service_down):
+    now = datetime.utcnow()
+    for i in range(10):
+        # One check per 6 hours: 4 fall in the last day, all 10 in the last week
+        test_db.add(HealthCheck(
+            service_id=test_service.id,
+            timestamp=now - timedelta(hours=6 * i, minutes=1),
+            status="up" if i % 2 == 0 else "down",
+            response_time=100.0 if i % 2 == 0 else None
+        ))
+    await test_db.commit()
+
+    response = await api_client.get(
+        f"/api/stats?ids={test_service.id},{test_service_down.id}&hours=24&hours=168"
+    )
+    assert response.status_code == 200
+    data = {entry["service_id"]: entry["windows"] for entry in response.json()}
+
+    day = data[test_service.id]["24h"]
+    assert day["total_checks"] == 4
+    assert day["successful_checks"] == 2
+    assert day["average_response_time"] == 100.0
+
+    week = data[test_service.id]["168h"]
+    assert week["total_checks"] == 10
+    assert week["uptime_percentage"] == 50.0
+
+    assert data[test_service_down.id]["24h"]["total_checks"] == 0
+
+    response = await api_client.get("/api/stats?hours=24")
+    assert {entry["service_id"] for entry in response.json()} == {test_service.id, test_service_down.id}
+
+    assert (await api_client.get("/api/stats?ids=1,x")).status_code == 400
+    assert (await api_client.get("/api/stats?hours=0")).status_code == 400
+
+@pytest.mark.asyncio
+async def test_fast_formats_match_model(test_db, api_client, test_service, test_health_check, test_incident):
+    test_db.add(HealthCheck(
+        service_id=test_service.id,
+        timestamp=datetime.utcnow() - timedelta(minutes=5),
+        status="down",
+        error_message="Connection refused"
+    ))
+    await test_db.commit()
+
+    for path in (f"/api/services/{test_service.id}/history", "/api/services"):
+        model = (await api_client.get(path)).json()
+        fast = (await api_client.get(path, params={"format": "fast"})).json()
+        assert fast == model
+
+        columnar = (await api_client.get(path, params={"format": "columnar"})).json()
+        assert columnar["id"] == [row["id"] for row in model]
+        assert columnar["status"] == [row["status"] for row in model]
+
+    response = await api_client.get("/api/services", params={"format": "xml"})
+    assert response.status_code == 422
+
 @pytest.mark.asyncio
 async def test_get_incidents(test_db, test_service, test_incident):
     from httpx import AsyncClient, ASGITransport
@@ -206,3 +300,114 @@ async def test_get_incidents_ongoing_only(test_db, test_service):
         data = response.json()
         assert len(data) == 1
         assert data[0]["status"] == "ongoing"
+
+def test_count_covered_checks():
+    from routes import count_covered_checks
+
+    base = datetime(2024, 1, 1)
+    at = lambda s: base + timedelta(seconds=s)
+
+    checks = [at(0), at(10), at(20), at(30), at(45)]
+    intervals = [(at(5), at(20)), (at(15), at(30)), (at(40), at(50))]
+
+    # at(20) is inside both overlapping intervals, boundaries are inclusive
+    assert count_covered_checks(checks, intervals) == 5
+    assert count_covered_checks(checks, []) == 0
+    assert count_covered_checks([], intervals) == 0
+
+@pytest.mark.asyncio
+async def test_calculate_uptime_matches_per_incident_counting(test_db, test_service):
+    import random
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    for i in range(300):
+        test_db.add(HealthCheck(
+            service_id=test_service.id,
+            timestamp=now - timedelta(seconds=i * 20),
+            status="up" if rng.random() > 0.3 else "down"
+        ))
+
+    incidents = []
+    for i in range(40):
+        started_at = now - timedelta(seconds=rng.randint(0, 6000))
+        duration = rng.randint(5, 90)
+        incident = Incident(
+            service_id=test_service.id,
+            started_at=started_at,
+            ended_at=started_at + timedelta(seconds=duration),
+            duration=duration,
+            status="resolved"
+        )
+        test_db.add(incident)
+        incidents.append(incident)
+    await test_db.commit()
+
+    checks = (await test_db.execute(
+        select(HealthCheck).where(HealthCheck.service_id == test_service.id)
+    )).scalars().all()
+
+    expected_adjustment = sum(
+        1
+        for incident in incidents if incident.duration < 60
+        for check in checks
+        if check.status != "up" and incident.started_at <= check.timestamp <= incident.ended_at
+    )
+    up_checks = sum(1 for check in checks if check.status == "up")
+    expected = (up_checks + expected_adjustment) / len(checks) * 100
+
+    assert expected_adjustment > 0
+    assert await calculate_uptime(test_db, test_service.id, 24) == pytest.approx(expected)
+
+@pytest.mark.asyncio
+async def test_get_services_runs_a_fixed_number_of_queries(test_db, api_client, test_engine):
+    from sqlalchemy import event
+
+    now = datetime.utcnow()
+    for n in range(6):
+        service = Service(name=f"svc-{n}", url=f"https://svc-{n}.test", check_type="http", expected_status="200", enabled=True)
+        test_db.add(service)
+        await test_db.flush()
+        for i in range(10):
+            test_db.add(HealthCheck(
+                service_id=service.id,
+                timestamp=now - timedelta(minutes=i),
+                status="down" if n % 2 and i in (3, 4) else "up",
+                response_time=float(n * 10 + i)
+            ))
+        if n % 2:
+            # A short outage, forgiven in uptime
+            test_db.add(Incident(
+                service_id=service.id,
+                started_at=now - timedelta(minutes=4, seconds=30),
+                ended_at=now - timedelta(minutes=2, seconds=50),
+                duration=40,
+                status="resolved"
+            ))
+        if n == 2:
+            test_db.add(Incident(service_id=service.id, started_at=now - timedelta(minutes=1), status="ongoing", description="Down"))
+    await test_db.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        model = (await api_client.get("/api/services")).json()
+        queries = len(statements)
+        fast = (await api_client.get("/api/services", params={"format": "fast"})).json()
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+
+    # Services, incidents, uptime totals, short incidents and their checks; not one per service
+    assert queries <= 6
+    assert fast == model
+    assert [service["response_time"] for service in model] == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    assert model[2]["current_incident"]["description"] == "Down"
+    assert [service["current_incident"] for service in model].count(None) == 5
+    for service in model:
+        assert service["uptime_24h"] == pytest.approx(await calculate_uptime(test_db, service["id"], 24))
+        assert service["uptime_24h"] == 100.0
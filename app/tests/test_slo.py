@@ -0,0 +1,124 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import select
+
+from database import SloAlert
+from monitor import run_health_checks
+from slo import RollingCounter, SloEvaluator, BurnRateRule, BURN_RATE_RULES
+
+def test_rolling_counter_expires_old_buckets():
+    counter = RollingCounter(600)
+    counter.add(0, bad=True)
+    counter.add(300, bad=False)
+    assert counter.error_rate(300) == 0.5
+
+    # The first bucket has slid out of the 10 minute window
+    assert counter.error_rate(620) == 0.0
+    assert counter.error_rate(5000) is None
+
+def test_rolling_counter_weights_checks_by_interval():
+    counter = RollingCounter(3600)
+    # Probed every 10s while failing, every 300s once healthy again
+    for i in range(6):
+        counter.add(i * 10, bad=True, weight=10)
+    for i in range(10):
+        counter.add(60 + i * 300, bad=False, weight=300)
+
+    assert counter.total == 16
+    assert counter.error_rate(2900) == pytest.approx(60 / 3060)
+
+def test_rule_names():
+    assert [rule.name for rule in BURN_RATE_RULES] == ["1h/5m", "6h/30m", "1d/2h", "3d/6h"]
+
+def test_fires_and_resolves_on_both_windows():
+    rule = BurnRateRule("page", 3600, 300, 14.4)
+    evaluator = SloEvaluator(rules=(rule,), min_checks=1)
+    now = 0
+
+    # An hour of healthy minutely checks
+    for _ in range(60):
+        assert evaluator.record(1, "svc", "up", 99.0, now=now) == []
+        now += 60
+
+    # 99% target: 14.4x burn means a 14.4% error rate over both windows
+    events = []
+    for _ in range(12):
+        events += evaluator.record(1, "svc", "down", 99.0, now=now)
+        now += 60
+    assert [(e.state, e.severity, e.rule) for e in events] == [("firing", "page", "1h/5m")]
+
+    events = []
+    for _ in range(10):
+        events += evaluator.record(1, "svc", "up", 99.0, now=now)
+        now += 60
+    # The short window clears first even though the hour still holds the outage
+    assert [e.state for e in events] == ["resolved"]
+    assert evaluator.burn_rates(1, 99.0, now=now)[3600] > 14.4
+
+def test_needs_min_checks():
+    evaluator = SloEvaluator(rules=(BurnRateRule("page", 3600, 300, 14.4),), min_checks=5)
+    events = []
+    for i in range(5):
+        events += evaluator.record(1, "svc", "down", 99.9, now=i * 60)
+        assert bool(events) == (i == 4)
+
+def test_per_service_target():
+    evaluator = SloEvaluator(rules=(BurnRateRule("page", 3600, 300, 14.4),), min_checks=1)
+    for i in range(20):
+        status = "down" if i >= 18 else "up"
+        evaluator.record(1, "strict", status, 99.9, now=i * 60)
+        evaluator.record(2, "loose", status, 50.0, now=i * 60)
+
+    assert evaluator._firing[1]
+    assert not evaluator._firing[2]
+
+@pytest.mark.asyncio
+async def test_sweep_writes_alert_events(test_db, test_service, monkeypatch):
+    from config import settings
+    monkeypatch.setattr(settings, "SLO_MIN_CHECKS", 1)
+
+    test_service.slo_target = 99.0
+    await test_db.commit()
+
+    mock_response = MagicMock()
+    mock_response.status_code = 500
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+        with patch('monitor.AsyncSessionLocal') as mock_session:
+            mock_session.return_value.__aenter__.return_value = test_db
+            await run_health_checks()
+
+    result = await test_db.execute(select(SloAlert).where(SloAlert.service_id == test_service.id))
+    alerts = result.scalars().all()
+    # A first failing check burns every window at 100x
+    assert {alert.rule for alert in alerts} == {rule.name for rule in BURN_RATE_RULES}
+    assert all(alert.state == "firing" and alert.slo_target == 99.0 for alert in alerts)
+
+@pytest.mark.asyncio
+async def test_firing_state_survives_restart(test_db, test_service):
+    from datetime import datetime, timedelta
+    from slo import restore_slo_state
+
+    def alert(rule, state, minutes_ago):
+        return SloAlert(
+            service_id=test_service.id, timestamp=datetime.utcnow() - timedelta(minutes=minutes_ago),
+            severity="page", rule=rule, state=state, burn_rate=20.0, threshold=14.4, slo_target=99.9
+        )
+
+    test_db.add_all([
+        alert("1h/5m", "firing", 30),
+        alert("6h/30m", "firing", 20),
+        alert("6h/30m", "resolved", 10),
+    ])
+    await test_db.commit()
+
+    evaluator = SloEvaluator(min_checks=3)
+    assert await restore_slo_state(test_db, evaluator) == 1
+
+    # A fresh process has too few checks to judge, so nothing resolves yet
+    events = []
+    for i in range(3):
+        events += evaluator.record(test_service.id, test_service.name, "up", 99.9, now=i * 60)
+        assert bool(events) == (i == 2)
+    assert [(e.rule, e.state) for e in events] == [("1h/5m", "resolved")]
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from status_rules import (
+    compile_status_rule,
+    parse_status_rule,
+    StatusRuleError,
+    DEFAULT_STATUS_RULE
+)
+from monitor import perform_health_check
+
+def test_single_status():
+    matcher = compile_status_rule("200")
+
+    assert matcher.classify(200, 100.0) == ("up", None)
+    assert matcher.classify(301, 100.0) == ("degraded", "HTTP 301")
+    assert matcher.classify(503, 100.0) == ("degraded", "HTTP 503")
+
+def test_ranges_classes_and_lists():
+    matcher = compile_status_rule("200-204, 3xx, 418")
+
+    assert matcher.classify(204, None)[0] == "up"
+    assert matcher.classify(205, None)[0] == "degraded"
+    assert matcher.classify(399, None)[0] == "up"
+    assert matcher.classify(418, None)[0] == "up"
+
+def test_latency_threshold_marks_degraded():
+    matcher = compile_status_rule("200:500ms,301:2s")
+
+    assert matcher.classify(200, 499.0) == ("up", None)
+
+    status, error = matcher.classify(200, 750.0)
+    assert status == "degraded"
+    assert "750ms > 500ms" in error
+
+    assert matcher.classify(301, 1999.0)[0] == "up"
+    assert matcher.classify(301, 2001.0)[0] == "degraded"
+
+def test_empty_rule_uses_default():
+    matcher = compile_status_rule("")
+
+    assert matcher.rule == DEFAULT_STATUS_RULE
+    assert matcher.classify(302, None)[0] == "up"
+    assert matcher.classify(404, None)[0] == "degraded"
+
+def test_invalid_rule_falls_back_to_default():
+    with pytest.raises(StatusRuleError):
+        parse_status_rule("abc")
+    with pytest.raises(StatusRuleError):
+        parse_status_rule("700")
+
+    assert compile_status_rule("abc").rule == DEFAULT_STATUS_RULE
+
+def test_compiled_matchers_are_cached():
+    assert compile_status_rule("200,204") is compile_status_rule("200,204")
+    assert compile_status_rule("200,204") is not compile_status_rule("200")
+
+@pytest.mark.asyncio
+async def test_perform_health_check_honors_expected_status(test_service):
+    test_service.expected_status = "204"
+
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+
+        check = await perform_health_check(test_service)
+
+        assert check.status == "degraded"
+        assert check.error_message == "HTTP 200"
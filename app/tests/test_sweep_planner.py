@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select
+
+from database import Service, HealthCheck
+from sweep_planner import SweepPlanner, probe_host, probe_target
+
+def test_probe_host():
+    assert probe_host("https://Example.com:8443/health") == "example.com"
+
+def test_probe_target():
+    assert probe_target("HTTPS://Example.com:443/") == "https://example.com"
+    assert probe_target("https://example.com#status") == "https://example.com"
+    assert probe_target("https://example.com:8443/health/?full=1") == "https://example.com:8443/health?full=1"
+    assert probe_target("https://example.com/a") != probe_target("https://example.com/b")
+
+@pytest.mark.asyncio
+async def test_identical_probes_share_one_request():
+    planner = SweepPlanner(host_limit=2)
+    calls = []
+
+    async def probe():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(planner.run("key", "example.com", probe) for _ in range(5)))
+    # A later request in the same sweep reuses the finished result
+    results.append(await planner.run("key", "example.com", probe))
+
+    assert results == ["result"] * 6
+    assert len(calls) == 1
+    assert (planner.requested, planner.sent, planner.shared) == (6, 1, 5)
+
+@pytest.mark.asyncio
+async def test_host_limit():
+    planner = SweepPlanner(host_limit=2)
+    running = {"example.com": 0, "other.com": 0}
+    peak = {"example.com": 0, "other.com": 0}
+
+    def probe(host):
+        async def run():
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+            await asyncio.sleep(0.01)
+            running[host] -= 1
+        return run
+
+    await asyncio.gather(
+        *(planner.run(("a", i), "example.com", probe("example.com")) for i in range(6)),
+        *(planner.run(("b", i), "other.com", probe("other.com")) for i in range(6))
+    )
+
+    assert peak == {"example.com": 2, "other.com": 2}
+    assert planner.sent == 12
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_probe():
+    planner = SweepPlanner()
+    release = asyncio.Event()
+
+    async def probe():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(planner.run("key", "example.com", probe))
+    second = asyncio.create_task(planner.run("key", "example.com", probe))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+
+@pytest.mark.asyncio
+async def test_reprobes_are_not_answered_from_the_shared_result(test_service, monkeypatch):
+    from config import settings
+    from monitor import perform_health_check, confirm_health_check
+
+    monkeypatch.setattr(settings, "CONFIRM_TIMEOUT", settings.TIMEOUT)
+    monkeypatch.setattr(settings, "CONFIRM_TIMEOUT_ESCALATION", 1.0)
+    results = iter([("down", None, None, "Connection refused"), ("up", 40.0, 200, None)])
+    planner = SweepPlanner()
+
+    with patch('monitor.check_http_service', side_effect=lambda *args: next(results)) as probe:
+        check = await perform_health_check(test_service, planner=planner)
+        check = await confirm_health_check(test_service, check, planner=planner)
+
+    assert check.status == "up"
+    assert probe.call_count == planner.sent == 2
+
+@pytest.mark.asyncio
+async def test_sweep_probes_identical_targets_once(test_db, tmp_path, monkeypatch):
+    import json
+    from config import settings
+    from monitor import run_health_checks
+    from reconcile import load_service_config, reconcile_services
+
+    path = tmp_path / "services.json"
+    path.write_text(json.dumps([
+        {"name": "site", "url": "https://shared.test", "check_type": "http", "expected_status": "200"},
+        {"name": "site-alias", "url": "https://Shared.test/#alias", "check_type": "http", "expected_status": "404"},
+        {"name": "other", "url": "https://other.test", "check_type": "http", "expected_status": "200"},
+    ]))
+    monkeypatch.setattr(settings, "SERVICES_FILE", str(path))
+    await reconcile_services(test_db, load_service_config())
+
+    probed = []
+
+    async def probe(url, timeout, probe_mode, max_body_bytes, matcher):
+        probed.append(url)
+        await asyncio.sleep(0.01)
+        if url == "https://other.test":
+            return "down", None, None, "Connection refused"
+        status, error = matcher.classify(404, 50.0)
+        return status, 50.0, 404, error
+
+    with patch('monitor.check_http_service', side_effect=probe), \
+            patch('monitor.notification_dispatcher'), \
+            patch('monitor.AsyncSessionLocal') as mock_session:
+        mock_session.return_value.__aenter__.return_value = test_db
+        await run_health_checks()
+
+    # Both services are judged on one shared response, each by its own expected status
+    assert len([url for url in probed if "shared.test" in url.lower()]) == 1
+    # Each confirmation re-probe is a new request, never the first result again
+    assert probed.count("https://other.test") == 3
+
+    result = await test_db.execute(select(Service.name, HealthCheck.status).join(HealthCheck))
+    assert dict(result.all()) == {"site": "degraded", "site-alias": "up", "other": "down"}
@@ -0,0 +1,179 @@
+"""Monitor scheduler, usable inside the API process or on its own.
+
+Run it standalone (no API) with:
+
+    python worker.py
+"""
+import argparse
+import asyncio
+import signal
+import logging
+from typing import Awaitable, Callable, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from config import settings
+from database import init_db, AsyncSessionLocal
+from health import health_state
+from leader import LeaderLease, leader_only
+from loop_monitor import loop_monitor
+from monitor import run_health_checks, cleanup_old_checks
+from reconcile import ServicesFileWatcher
+from notifications import dispatcher as notification_dispatcher
+
+logger = logging.getLogger(__name__)
+
+async def renew_leadership(lease: LeaderLease, on_acquire: Optional[Callable[[], Awaitable]] = None):
+    was_leader = lease.is_leader
+    if await lease.renew() and not was_leader:
+        health_state.leadership_acquired()
+        if on_acquire:
+            await on_acquire()
+
+def configure_jobs(
+    scheduler: AsyncIOScheduler,
+    lease: LeaderLease,
+    on_acquire: Optional[Callable[[], Awaitable]] = None
+):
+    scheduler.add_job(
+        renew_leadership,
+        trigger=IntervalTrigger(seconds=max(1, lease.ttl // 3)),
+        args=[lease, on_acquire],
+        id="leader_lease",
+        replace_existing=True
+    )
+
+    if settings.ADAPTIVE_SCHEDULING:
+        # Tick at the fast interval; each service is only probed when it is due
+        scheduler.add_job(
+            leader_only(lease, run_health_checks),
+            trigger=IntervalTrigger(seconds=settings.MIN_CHECK_INTERVAL),
+            kwargs={"due_only": True},
+            id="health_checks",
+            replace_existing=True
+        )
+    else:
+        scheduler.add_job(
+            leader_only(lease, run_health_checks),
+            trigger=IntervalTrigger(seconds=settings.CHECK_INTERVAL),
+            id="health_checks",
+            replace_existing=True
+        )
+    scheduler.add_job(
+        leader_only(lease, cleanup_old_checks),
+        trigger=IntervalTrigger(days=1),
+        id="cleanup",
+        replace_existing=True
+    )
+
+    if notification_dispatcher.sinks:
+        # Picks up retries and anything left in the outbox by another leader
+        scheduler.add_job(
+            leader_only(lease, notification_dispatcher.poll),
+            trigger=IntervalTrigger(seconds=settings.NOTIFY_POLL_INTERVAL),
+            id="notifications",
+            replace_existing=True
+        )
+
+    if settings.SERVICES_FILE:
+        watcher = ServicesFileWatcher(settings.SERVICES_FILE)
+        scheduler.add_job(
+            leader_only(lease, watcher.check),
+            trigger=IntervalTrigger(seconds=settings.SERVICES_RELOAD_INTERVAL),
+            args=[AsyncSessionLocal],
+            id="services_reload",
+            replace_existing=True
+        )
+
+async def initial_sweep(lease: LeaderLease, on_acquire: Optional[Callable[[], Awaitable]] = None):
+    await renew_leadership(lease, on_acquire)
+
+    if lease.is_leader:
+        await run_health_checks()
+    else:
+        health_state.initial_sweep = "standby"
+        logger.info("Another process holds the monitor lease; standing by")
+
+async def start_monitor(
+    scheduler: AsyncIOScheduler,
+    lease: LeaderLease,
+    on_acquire: Optional[Callable[[], Awaitable]] = None
+):
+    """Schedule the jobs and start the first sweep in the background.
+
+    Returns right away: the API serves the last recorded state from the
+    database while the lease is taken, services are synced and probed.
+    """
+    health_state.initial_sweep = "pending"
+    health_state.lease = lease
+
+    configure_jobs(scheduler, lease, on_acquire)
+    scheduler.add_job(initial_sweep, args=[lease, on_acquire], id="initial_sweep", replace_existing=True)
+    scheduler.start()
+
+async def stop_monitor(scheduler: AsyncIOScheduler, lease: LeaderLease):
+    scheduler.shutdown()
+    await notification_dispatcher.stop()
+    await lease.release()
+
+async def _keep_lease(lease: LeaderLease):
+    while True:
+        await asyncio.sleep(max(1, lease.ttl // 3))
+        await lease.renew()
+
+async def run_once(lease: LeaderLease, initialize_services: Callable[[], Awaitable]) -> bool:
+    """One sync and sweep, under the monitor lease so it can't race a running leader"""
+    if not await lease.renew():
+        logger.error("Another process holds the monitor lease; not running a sweep alongside it")
+        return False
+
+    keepalive = asyncio.create_task(_keep_lease(lease))
+    try:
+        await initialize_services()
+        await run_health_checks()
+    finally:
+        keepalive.cancel()
+        await asyncio.gather(keepalive, return_exceptions=True)
+        await lease.release()
+    return True
+
+async def run_worker(once: bool = False) -> bool:
+    # Imported here: main builds the API app and imports this module
+    from main import initialize_services
+
+    await init_db()
+    lease = LeaderLease()
+
+    if once:
+        return await run_once(lease, initialize_services)
+
+    scheduler = AsyncIOScheduler()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    if settings.LOOP_MONITOR:
+        loop_monitor.start()
+
+    await start_monitor(scheduler, lease, initialize_services)
+    await stop.wait()
+
+    logger.info("Shutting down scheduler...")
+    await stop_monitor(scheduler, lease)
+    loop_monitor.stop()
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the homelab status monitor without the API")
+    parser.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not asyncio.run(run_worker(once=args.once)):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()